@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Start up a kiosk with a few hundred icons and animations: once by decoding and encoding every file like the
+img and anim commands do, and once by opening an asset pack built with `divo pack`. Reports the time until
+all packets are ready to send and the peak Python memory.
+
+Usage: poetry run python benchmarks/bench_asset_pack.py
+"""
+
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Tuple
+
+from PIL import Image
+
+from divo.asset_pack import AssetPack, encode_directory
+
+ICONS = 300
+ANIMATIONS = 30
+
+
+def make_assets(directory: str) -> None:
+    rng = random.Random(ICONS)
+
+    def random_image(size: int) -> Image.Image:
+        palette = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(16)]
+        image = Image.new("RGB", (size, size))
+        image.putdata([rng.choice(palette) for _ in range(size * size)])
+        return image
+
+    for i in range(ICONS):
+        random_image(rng.choice((16, 32, 64))).save(os.path.join(directory, f"icon{i}.png"))
+    for i in range(ANIMATIONS):
+        frames = [random_image(16) for _ in range(8)]
+        frames[0].save(os.path.join(directory, f"anim{i}.gif"), save_all=True, append_images=frames[1:], duration=100)
+
+
+def measure(fn: Callable[[], Any]) -> Tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "assets")
+        os.mkdir(source)
+        make_assets(source)
+        path = os.path.join(tmp, "assets.pack")
+        AssetPack.write(path, encode_directory(source))
+        print(f"{ICONS} icons, {ANIMATIONS} animations, pack: {os.path.getsize(path) / 1024:.0f} KiB")
+
+        def encode_all() -> int:
+            return sum(len(a.packets) for a in encode_directory(source))
+
+        def open_pack() -> int:
+            with AssetPack(path) as pack:
+                return sum(len(pack.packets(name)) for name in pack.entries)
+
+        assert encode_all() == open_pack()
+
+        print(f"{'':>16} {'ms':>8} {'peak KiB':>9}")
+        for name, fn in (("decode + encode", encode_all), ("asset pack", open_pack)):
+            elapsed, peak = measure(fn)
+            print(f"{name:>16} {elapsed * 1000:8.1f} {peak / 1024:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Compare the hex string based image encoder divo used to have with EvoEncoder.image_bytes.
+
+Usage: poetry run python benchmarks/bench_evo_encoder.py
+"""
+
+import binascii
+import math
+import random
+import timeit
+from collections import OrderedDict
+from typing import List
+
+from divo.evo_encoder import EvoEncoder
+
+
+def legacy_encode_colours(colour_array: List[int]) -> str:
+    colour_dict = OrderedDict()  # type: OrderedDict[int,int]
+    colour_order = []
+    for colour in colour_array:
+        if colour not in colour_dict:
+            colour_dict[colour] = len(colour_dict)
+        colour_order.append(colour_dict[colour])
+
+    bits_needed = int(math.ceil(math.log(len(colour_dict), 2)))
+    if bits_needed == 0:
+        bits_needed = 1
+    img_data = "{0:02x}".format(len(colour_dict) % 256)
+    for colour in colour_dict:
+        img_data += "{0:06x}".format(colour)
+
+    c_data = ""
+    for i in colour_order:
+        c_data += "{0:08b}".format(i)[-1::-1][:bits_needed]
+    for i in range(-1, len(c_data) - 1, 8):
+        if i == -1:
+            img_data += "{0:02x}".format(int(c_data[i + 8 :: -1], 2))
+            continue
+        img_data += "{0:02x}".format(int(c_data[i + 8 : i : -1], 2))
+    return img_data
+
+
+def legacy_image_bytes(colour_array: List[int]) -> bytes:
+    hex_data = "44000A0A04AA2D00000000" + legacy_encode_colours(colour_array)
+    payload = binascii.unhexlify(hex_data)
+    payload = EvoEncoder.length(payload) + payload
+    return b"\x01" + payload + EvoEncoder.crc(payload) + b"\x02"
+
+
+def make_pixels(colours: int) -> List[int]:
+    rng = random.Random(colours)
+    palette = [rng.randrange(0x1000000) for _ in range(colours)]
+    return palette + [rng.choice(palette) for _ in range(256 - colours)]
+
+
+def main() -> None:
+    number = 500
+    print(f"{'colours':>8} {'legacy frames/s':>16} {'current frames/s':>17} {'speedup':>8}")
+    for colours in (1, 2, 4, 8, 16, 32, 64, 256):
+        pixels = make_pixels(colours)
+        assert legacy_image_bytes(pixels) == EvoEncoder.image_bytes(pixels)
+
+        t_legacy = min(timeit.repeat(lambda: legacy_image_bytes(pixels), number=number, repeat=3))
+        t_current = min(timeit.repeat(lambda: EvoEncoder.image_bytes(pixels), number=number, repeat=3))
+        print(f"{colours:>8} {number / t_legacy:>16.0f} {number / t_current:>17.0f} {t_legacy / t_current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Compare the per-pixel alpha blending divo used to have with RawPixmap.decode_image for different source sizes,
+and drawing procedural frames on the old list based pixmap with the bytearray based RawPixmap.
+
+Usage: poetry run python benchmarks/bench_evo_pixmap.py
+"""
+
+import io
+import timeit
+from typing import List
+
+from PIL import Image
+
+from divo.evo_encoder import EvoEncoder
+from divo.evo_pixmap import RawPixmap, RGBColor
+
+
+def legacy_decode_image(rp: RawPixmap, image: Image.Image) -> List[RGBColor]:
+    w, h = 16, 16
+    image_mode = image.mode
+    target = Image.new("RGBA", (w, h), color="black")
+
+    source = image.convert("RGBA")
+    if source.size[0] != w or source.size[1] != h:
+        source.thumbnail((w, h), Image.BICUBIC)
+
+    if image_mode == "RGBA":
+        for y in range(source.size[1]):
+            for x in range(source.size[0]):
+                source.putpixel((x, y), rp.blend_rgba((0, 0, 0, 255), source.getpixel((x, y))))
+
+    offset = ((w - source.size[0]) // 2, (h - source.size[1]) // 2)
+    target.paste(source, offset)
+    return list(target.convert("RGB").getdata())
+
+
+class LegacyPixmap:
+    def __init__(self, width: int, height: int):
+        self._width = width
+        self._height = height
+        self._pixels: List[RGBColor] = [(0, 0, 0)] * width * height
+
+    def clear(self) -> None:
+        for i, _ in enumerate(self._pixels):
+            self._pixels[i] = RawPixmap.BLACK
+
+    def setPixel(self, x: int, y: int, color: RGBColor) -> None:
+        self._pixels[(x % self._width) + (y % self._height) * self._width] = color
+
+    def getPixel(self, x: int, y: int) -> RGBColor:
+        return self._pixels[(x % self._width) + (y % self._height) * self._width]
+
+    def get_pixel_data(self) -> List[int]:
+        return [(t[0] << 16) + (t[1] << 8) + t[2] for t in self._pixels]
+
+
+def legacy_graph_frame(rp: LegacyPixmap, value: int) -> bytes:
+    # scroll a bar graph to the left and add the new value on the right
+    for y in range(16):
+        for x in range(15):
+            rp.setPixel(x, y, rp.getPixel(x + 1, y))
+    for y in range(16):
+        rp.setPixel(15, y, RawPixmap.BLACK if y < 16 - value else RawPixmap.RED)
+    return EvoEncoder.image_bytes(rp.get_pixel_data())
+
+
+def graph_frame(rp: RawPixmap, value: int) -> bytes:
+    rp.scroll(-1, 0)
+    rp.vline(15, 16 - value, value, RawPixmap.RED)
+    return EvoEncoder.image_bytes_rgb(rp.rgb_buffer())
+
+
+def make_image(size: int) -> Image.Image:
+    return Image.merge("RGBA", [Image.effect_noise((size, size), 64 + 16 * i) for i in range(4)])
+
+
+def make_jpeg(size: int) -> bytes:
+    out = io.BytesIO()
+    make_image(size).convert("RGB").save(out, "JPEG")
+    return out.getvalue()
+
+
+def main() -> None:
+    rp = RawPixmap(16, 16)
+    print(f"{'source':>10} {'legacy ms':>10} {'current ms':>11} {'speedup':>8} {'jpeg ms':>8} {'draft ms':>9}")
+    for size in (16, 32, 64, 256, 1024, 2048):
+        image = make_image(size)
+        assert legacy_decode_image(rp, image) == rp.decode_image(image)
+        number = max(1, 20000 // size)
+
+        t_legacy = min(timeit.repeat(lambda: legacy_decode_image(rp, image), number=number, repeat=3)) / number
+        t_current = min(timeit.repeat(lambda: rp.decode_image(image), number=number, repeat=3)) / number
+
+        # decoding is part of the work when JPEG draft mode is used
+        jpeg = make_jpeg(size)
+        t_jpeg = min(timeit.repeat(lambda: rp.decode_image(Image.open(io.BytesIO(jpeg))), number=number, repeat=3))
+        t_draft = min(
+            timeit.repeat(lambda: rp.decode_image(Image.open(io.BytesIO(jpeg)), draft=True), number=number, repeat=3)
+        )
+
+        print(
+            f"{size:>4}x{size:<5} {t_legacy * 1e3:>10.2f} {t_current * 1e3:>11.2f} {t_legacy / t_current:>7.1f}x "
+            f"{t_jpeg / number * 1e3:>8.2f} {t_draft / number * 1e3:>9.2f}"
+        )
+
+    values = [(5 * i) % 17 for i in range(64)]
+    legacy = LegacyPixmap(16, 16)
+    assert [legacy_graph_frame(legacy, v) for v in values] == [graph_frame(rp, v) for v in values]
+
+    t_legacy = min(timeit.repeat(lambda: [legacy_graph_frame(legacy, v) for v in values], number=20, repeat=3))
+    t_current = min(timeit.repeat(lambda: [graph_frame(rp, v) for v in values], number=20, repeat=3))
+    number = 20 * len(values)
+    print()
+    print(f"{'graph':>10} {'legacy frames/s':>16} {'current frames/s':>17} {'speedup':>8}")
+    print(f"{'':>10} {number / t_legacy:>16.0f} {number / t_current:>17.0f} {t_legacy / t_current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
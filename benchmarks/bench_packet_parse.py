@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Parse a multi-megabyte capture of image packets once by copying every packet and payload like divo used
+to, and once through memoryviews. Also compares validating by a full parse, which is what Pixoo.write used
+to do for every packet, with PacketBase.is_valid parsing from views and checking the framing only.
+
+Usage: poetry run python benchmarks/bench_packet_parse.py
+"""
+
+import random
+import timeit
+from typing import Any, List
+
+from divo.command import CommandParser
+from divo.command_base import CommandParserBase
+from divo.evo_encoder import EvoEncoder
+from divo.exceptions import PacketChecksumError, PacketException, PacketParsingError
+from divo.packet import Packet
+
+
+def make_capture(size: int) -> bytes:
+    rng = random.Random(size)
+    packets: List[bytes] = []
+    length = 0
+    while length < size:
+        colours = rng.choice((2, 16, 64, 256))
+        palette = [rng.randrange(0x1000000) for _ in range(colours)]
+        pixels = palette + [rng.choice(palette) for _ in range(256 - colours)]
+        packets.append(EvoEncoder.image_bytes(pixels[:256]))
+        length += len(packets[-1])
+    return b"".join(packets)
+
+
+def split_copy(capture: bytes) -> List[bytes]:
+    packets = []
+    offset = 0
+    while offset < len(capture):
+        end = offset + capture[offset + 1] + (capture[offset + 2] << 8) + 4
+        packets.append(capture[offset:end])
+        offset = end
+    return packets
+
+
+def legacy_parse(parser: CommandParserBase, packet: bytes) -> Any:
+    try:
+        start = packet[0]
+        size = packet[1] | (packet[2] << 8)
+        cmd_type = packet[3]
+        data = packet[4 : 3 + size - 2]
+        checksum = packet[3 + size - 2] | (packet[3 + size - 1] << 8)
+        end = packet[3 + size]
+    except IndexError:
+        raise PacketParsingError("packet incomplete")
+
+    if start != Packet.START_OF_PACKET or end != Packet.END_OF_PACKET:
+        raise PacketParsingError("framing wrong")
+    if checksum != sum(packet[1 : 3 + size - 2]) & 0xFFFF:
+        raise PacketChecksumError("checksum wrong")
+
+    return parser.parse(cmd_type, data)
+
+
+def main() -> None:
+    parser = CommandParser()
+    capture = make_capture(4 << 20)
+    count = len(split_copy(capture))
+    print(f"capture: {len(capture) / (1 << 20):.1f} MiB, {count} packets")
+
+    def parse_copy() -> List[Any]:
+        return [legacy_parse(parser, p) for p in split_copy(capture)]
+
+    def parse_zero_copy() -> List[Any]:
+        return [Packet.parse(parser, p, zero_copy=True) for p in Packet.views(capture)]
+
+    def validate_parse() -> bool:
+        ok = True
+        for p in split_copy(capture):
+            try:
+                legacy_parse(parser, p)
+            except PacketException:
+                ok = False
+        return ok
+
+    def validate_is_valid() -> bool:
+        return all(Packet.is_valid(parser, p) for p in Packet.views(capture))
+
+    def validate_framing() -> bool:
+        return all(Packet.is_valid(parser, p, framing_only=True) for p in Packet.views(capture))
+
+    assert [c.image for c in parse_copy()] == [c.image for c in parse_zero_copy()]
+
+    print(f"{'':>23} {'MiB/s':>8} {'packets/s':>10}")
+    for name, fn in (
+        ("parse (copy)", parse_copy),
+        ("parse (zero_copy)", parse_zero_copy),
+        ("validate (parse)", validate_parse),
+        ("validate (is_valid)", validate_is_valid),
+        ("validate (framing_only)", validate_framing),
+    ):
+        t = min(timeit.repeat(fn, number=1, repeat=3))
+        print(f"{name:>23} {len(capture) / t / (1 << 20):>8.1f} {count / t:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
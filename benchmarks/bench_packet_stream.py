@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+Compare the string based image decoder divo used to have with PacketStreamDecoder.parse_image.
+
+Usage: poetry run python benchmarks/bench_packet_stream.py
+"""
+
+import random
+import timeit
+from typing import List
+
+from divo.evo_encoder import EvoEncoder
+from divo.image import ImageBuffer, Palette
+from divo.packet_stream import PacketStreamDecoder
+
+
+def legacy_parse_image(data: bytes, palette: Palette) -> ImageBuffer:
+    binary_string = ""
+    for bx in data:
+        by = f"{bx:08b}"
+        by = by[::-1]
+        binary_string += by
+
+    bits_per_pixel = palette.bits_per_pixel()
+
+    buf = ImageBuffer()
+    for pos in range(0, len(binary_string) - 2, bits_per_pixel):
+        pixel_no = int(pos / bits_per_pixel)
+        x = pixel_no % buf.width
+        y = int(pixel_no / buf.width)
+        if y >= buf.height:
+            break
+
+        bidx = binary_string[pos : pos + bits_per_pixel][::-1]
+        idx = int(bidx, 2)
+        try:
+            buf.set(x, y, palette[idx])
+        except IndexError:
+            pass
+
+    return buf
+
+
+def make_frame(colours: int) -> bytes:
+    rng = random.Random(colours)
+    palette = [rng.randrange(0x1000000) for _ in range(colours)]
+    pixels: List[int] = palette + [rng.choice(palette) for _ in range(256 - colours)]
+    return EvoEncoder.image_bytes(pixels)
+
+
+def main() -> None:
+    number = 200
+    print(f"{'colours':>8} {'legacy frames/s':>16} {'current frames/s':>17} {'speedup':>8}")
+    for colours in (2, 4, 8, 16, 32, 64):
+        frame = make_frame(colours)
+        palette_len = frame[14]
+        palette = PacketStreamDecoder.parse_palette(frame[15 : 15 + 3 * palette_len])
+        payload = frame[15 + 3 * palette_len : -3]
+
+        legacy = legacy_parse_image(payload, palette)
+        current = PacketStreamDecoder.parse_image(payload, palette)
+        assert repr(legacy.buf) == repr(current.buf)
+
+        t_legacy = min(timeit.repeat(lambda: legacy_parse_image(payload, palette), number=number, repeat=3))
+        t_current = min(
+            timeit.repeat(lambda: PacketStreamDecoder.parse_image(payload, palette), number=number, repeat=3)
+        )
+        print(f"{colours:>8} {number / t_legacy:>16.0f} {number / t_current:>17.0f} {t_legacy / t_current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Send image frames and light mode commands to an emulated Pixoo and report commands/s, once waiting
+for every response and once pipelined.
+
+Usage: poetry run python benchmarks/bench_send.py [latency in s] [bandwidth in bytes/s]
+"""
+
+import sys
+import time
+from typing import Any, Callable
+
+from loguru import logger
+
+from divo.emulator import RFCOMM_BANDWIDTH, RFCOMM_LATENCY, EmulatorTransport
+from divo.evo_encoder import EvoEncoder
+from divo.pixoo import Pixoo
+
+
+def measure(name: str, count: int, latency: float, bandwidth: float, send: Callable[[Pixoo, int], Any]) -> None:
+    for max_in_flight in (1, 4):
+        bt = EmulatorTransport(latency=latency, bandwidth=bandwidth)
+        d = Pixoo(bt)
+        start = time.perf_counter()
+        with d.pipeline(max_in_flight):
+            for i in range(count):
+                send(d, i)
+        elapsed = time.perf_counter() - start
+        bt.close()
+        print(f"{name:>12} {max_in_flight:>10} {count / elapsed:>12.1f}")
+
+
+def main() -> None:
+    logger.remove()
+    latency = float(sys.argv[1]) if len(sys.argv) > 1 else RFCOMM_LATENCY
+    bandwidth = float(sys.argv[2]) if len(sys.argv) > 2 else RFCOMM_BANDWIDTH
+    print(f"latency {latency}s, bandwidth {bandwidth} bytes/s")
+    print(f"{'':>12} {'in flight':>10} {'commands/s':>12}")
+
+    frames = [EvoEncoder.image_bytes([(i * 0x010101 + p) & 0xFFFFFF for p in range(256)]) for i in range(8)]
+    measure("image", 20, latency, bandwidth, lambda d, i: d.submit(frames[i % len(frames)]))
+    measure("light mode", 50, latency, bandwidth, lambda d, i: d.set_light_mode_light(i, 255 - i, 0))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+
+Compare the output of the per-pixel Screen/ImageBuffer printing with TerminalRenderer for a scrolling
+16x16 animation. Output goes to memory, so this measures the Python side and the amount of data the
+terminal (or the SSH connection) has to process.
+
+Usage: poetry run python benchmarks/bench_terminal_renderer.py
+"""
+
+import io
+import timeit
+from typing import List
+
+from divo.evo_pixmap import RawPixmap, RGBColor
+from divo.image import TerminalRenderer
+
+
+class CountingStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        return super().write(s)
+
+
+def legacy_draw(out: CountingStream, pixels: List[RGBColor], width: int) -> None:
+    # what ImageBuffer.print_to sent to the terminal before it used TerminalRenderer, one write per call
+    for i, (r, g, b) in enumerate(pixels):
+        out.write(f"\x1b[38;2;{r};{g};{b}m")
+        out.write("██")
+        out.write("\x1b[0m")
+        if i % width == width - 1:
+            out.write("\n")
+
+
+def make_frames(count: int) -> List[List[RGBColor]]:
+    rp = RawPixmap(16, 16)
+    frames = []
+    for i in range(count):
+        rp.scroll(-1, 0)
+        value = (5 * i) % 17
+        rp.vline(15, 16 - value, value, (255, 16 * (i % 16), 0))
+        rp.setPixel(i % 16, i % 16, RawPixmap.WHITE)
+        frames.append(rp.get_rgb_pixels())
+    return frames
+
+
+def main() -> None:
+    frames = make_frames(100)
+
+    def play_legacy() -> None:
+        for f in frames:
+            legacy_draw(legacy_out, f, 16)
+
+    def play_renderer() -> None:
+        for f in frames:
+            renderer.draw(f, 16)
+
+    legacy_out = CountingStream()
+    renderer_out = CountingStream()
+    renderer = TerminalRenderer(renderer_out)
+    t_legacy = min(timeit.repeat(play_legacy, number=1, repeat=3))
+    t_renderer = min(timeit.repeat(play_renderer, number=1, repeat=3))
+
+    runs = 3 * len(frames)
+    print(f"{'':>10} {'frames/s':>9} {'bytes/frame':>12} {'writes/frame':>13}")
+    for name, t, out in (("legacy", t_legacy, legacy_out), ("renderer", t_renderer, renderer_out)):
+        print(f"{name:>10} {len(frames) / t:>9.0f} {len(out.getvalue()) // runs:>12} {out.writes / runs:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
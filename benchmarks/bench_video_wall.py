@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+Show frames on a 64x32 wall of 4x2 emulated Pixoos: one after the other like separate Pixoos would, and with
+VideoWall encoding in this process or in a process pool. Every frame changes all tiles, except for the last
+case where only one tile changes.
+
+Usage: poetry run python benchmarks/bench_video_wall.py
+"""
+
+import random
+import timeit
+from typing import Dict, List
+
+from divo.emulator import LoopbackTransport
+from divo.evo_encoder import EvoEncoder
+from divo.evo_pixmap import RawPixmap
+from divo.pixoo import Pixoo
+from divo.pixoo_group import PixooGroup
+from divo.video_wall import VideoWall
+
+COLUMNS = 4
+ROWS = 2
+
+
+def make_frames(count: int, colours: int) -> List[RawPixmap]:
+    rng = random.Random(count)
+    palette = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(colours)]
+    frames = []
+    for _ in range(count):
+        rp = RawPixmap(16 * COLUMNS, 16 * ROWS)
+        rp.set_rgb_pixels([rng.choice(palette) for _ in range(rp.width * rp.height)])
+        frames.append(rp)
+    return frames
+
+
+def make_group() -> PixooGroup:
+    return PixooGroup({f"pixoo{i}": Pixoo(LoopbackTransport()) for i in range(COLUMNS * ROWS)})
+
+
+def layout(group: PixooGroup) -> List[List[str]]:
+    names = list(group.members)
+    return [names[r * COLUMNS : (r + 1) * COLUMNS] for r in range(ROWS)]
+
+
+def main() -> None:
+    frames = make_frames(20, 64)
+    # only the top left tile changes
+    partial = []
+    for i in range(20):
+        rp = RawPixmap(16 * COLUMNS, 16 * ROWS)
+        rp.blit(frames[0])
+        rp.fill_rect(0, 0, 16, 16, (i, 0, 0))
+        partial.append(rp)
+
+    with make_group() as group:
+        positions: Dict[str, List[int]] = {}
+        for r, row in enumerate(layout(group)):
+            for c, name in enumerate(row):
+                positions[name] = [16 * c, 16 * r]
+
+        def sequential() -> None:
+            for frame in frames:
+                for name, (x, y) in positions.items():
+                    group.members[name].write(EvoEncoder.image_bytes_rgb(frame.crop_rgb(x, y, 16, 16)))
+
+        with VideoWall(group, layout(group), processes=0) as inline, VideoWall(
+            group, layout(group), processes=2
+        ) as pooled:
+
+            def wall_inline() -> None:
+                for frame in frames:
+                    inline.show(frame)
+
+            def wall_pooled() -> None:
+                for frame in frames:
+                    pooled.show(frame)
+
+            def wall_partial() -> None:
+                for frame in partial:
+                    pooled.show(frame)
+
+            # start the worker processes
+            pooled.show(frames[-1])
+
+            print(f"{'':>28} {'frames/s':>9}")
+            for name, fn in (
+                ("sequential", sequential),
+                ("VideoWall (processes=0)", wall_inline),
+                ("VideoWall (process pool)", wall_pooled),
+                ("VideoWall (1 tile changes)", wall_partial),
+            ):
+                t = min(timeit.repeat(fn, number=1, repeat=5))
+                print(f"{name:>28} {len(frames) / t:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
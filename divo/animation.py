@@ -0,0 +1,195 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import struct
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from PIL import Image, ImageSequence
+
+from .command import Command
+from .evo_encoder import EvoEncoder
+from .evo_pixmap import RawPixmap
+from .exceptions import PacketParsingError
+from .packet import Packet
+
+
+class AnimationFrame(NamedTuple):
+    palette: bytes
+    image: bytes
+    duration: int  # milliseconds
+
+
+class AnimationEncoder:
+    """
+    Encode animations for SET_MUL_BOX_COLOR.
+
+    Every frame is stored as: 0xaa, frame length (16 bit, including this header), duration in ms (16 bit),
+    palette flag (0: frame brings its own palette), palette length, palette and packed pixels like a still
+    image. The frames are concatenated and sent in chunks, each chunk prefixed with the total length of
+    all frames (16 bit) and the chunk number (8 bit), which limits animations to MAX_CHUNKS * CHUNK_SIZE bytes.
+    """
+
+    FRAME_START = 0xAA
+    FRAME_HEADER = struct.Struct("<BHHB")
+    CHUNK_HEADER = struct.Struct("<HB")
+    CHUNK_SIZE = 200
+    MAX_CHUNKS = 256
+    DEFAULT_DURATION = 100
+
+    @classmethod
+    def encode_frame(cls, colour_array: List[int], duration: int) -> bytes:
+        """
+        :param colour_array: 0xRRGGBB colour per pixel
+        :param duration: time to show this frame in ms
+        """
+        palette, indices = EvoEncoder.index_colours(colour_array)
+        size = cls.FRAME_HEADER.size + EvoEncoder.encoded_size(len(palette), len(indices))
+
+        buf = bytearray(size)
+        cls.FRAME_HEADER.pack_into(buf, 0, cls.FRAME_START, size, min(duration, 0xFFFF), 0)
+        EvoEncoder.encode_indexed_into(buf, cls.FRAME_HEADER.size, palette, indices)
+        return bytes(buf)
+
+    @classmethod
+    def packets(cls, frames: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        chunk encoded frames into SET_MUL_BOX_COLOR packets
+
+        :raises ValueError: if the frames don't fit into MAX_CHUNKS chunks
+
+        Every chunk carries the total length, so all encoded frames are collected before the first packet is
+        built. They are small compared to the decoded images.
+        """
+        data = b"".join(frames)
+        max_size = min(0xFFFF, cls.MAX_CHUNKS * cls.CHUNK_SIZE)
+        if len(data) > max_size:
+            raise ValueError(f"animation too long: {len(data)} bytes encoded, at most {max_size} fit")
+
+        for index, pos in enumerate(range(0, len(data), cls.CHUNK_SIZE)):
+            header = cls.CHUNK_HEADER.pack(len(data), index)
+            yield Packet.build(Command.SET_MUL_BOX_COLOR, header + data[pos : pos + cls.CHUNK_SIZE])
+
+    @classmethod
+    def iter_image_frames(
+        cls, image: Image.Image, rp: RawPixmap, duration: Optional[int] = None
+    ) -> Iterator[Tuple[List[int], int]]:
+        """
+        decode frames of a GIF/APNG lazily, one at a time
+
+        :param image: opened animated (or still) image
+        :param rp: pixmap of the display size to decode into
+        :param duration: override the per-frame durations stored in the image
+        :return: iterator of pixel data and duration in ms
+        """
+        for frame in ImageSequence.Iterator(image):
+            frame_duration = duration
+            if frame_duration is None:
+                frame_duration = int(frame.info.get("duration") or cls.DEFAULT_DURATION)
+
+            rp.set_image(frame)
+            yield rp.get_pixel_data(), frame_duration
+
+    @classmethod
+    def iter_sprite_frames(
+        cls, image: Image.Image, rp: RawPixmap, frame_width: int, frame_height: int, duration: Optional[int] = None
+    ) -> Iterator[Tuple[List[int], int]]:
+        """
+        decode frames of a sprite sheet lazily, left to right and top to bottom
+
+        :param image: opened sprite sheet
+        :param rp: pixmap of the display size to decode into
+        :param frame_width: width of one frame in the sheet
+        :param frame_height: height of one frame in the sheet
+        :param duration: time to show each frame in ms
+        :return: iterator of pixel data and duration in ms
+        """
+        if duration is None:
+            duration = cls.DEFAULT_DURATION
+
+        for top in range(0, image.size[1] - frame_height + 1, frame_height):
+            for left in range(0, image.size[0] - frame_width + 1, frame_width):
+                frame = image.crop((left, top, left + frame_width, top + frame_height))
+                rp.set_image(frame)
+                yield rp.get_pixel_data(), duration
+
+    @classmethod
+    def encode(cls, frames: Iterable[Tuple[List[int], int]]) -> Iterator[bytes]:
+        """
+        :param frames: pixel data and duration in ms per frame
+        :return: SET_MUL_BOX_COLOR packets
+        """
+        return cls.packets(cls.encode_frame(pixels, duration) for pixels, duration in frames)
+
+
+class AnimationDecoder:
+    """
+    Reassemble the data of SET_MUL_BOX_COLOR packets and split it into frames.
+
+    Frames are handed out as soon as they are complete, so long animations are decoded incrementally.
+    """
+
+    def __init__(self) -> None:
+        self.total: Optional[int] = None
+        self.chunks: Dict[int, bytes] = {}
+        self.next_chunk = 0
+        self.buffer = bytearray()
+        self.received = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.total is not None and self.received >= self.total
+
+    def feed(self, data: bytes) -> Iterator[AnimationFrame]:
+        """
+        :param data: SET_MUL_BOX_COLOR payload, i.e. chunk header and chunk
+        :return: iterator over all frames that are complete now
+        """
+        header = AnimationEncoder.CHUNK_HEADER
+        if len(data) < header.size:
+            raise PacketParsingError("animation chunk incomplete")
+
+        total, index = header.unpack_from(data)
+        if self.total is None:
+            self.total = total
+        elif total != self.total:
+            raise PacketParsingError(f"animation length changed from {self.total} to {total}")
+
+        if index >= self.next_chunk and index not in self.chunks:
+            self.chunks[index] = bytes(data[header.size :])
+            self.received += len(data) - header.size
+
+        # move chunks that arrived in order to the buffer
+        while self.next_chunk in self.chunks:
+            self.buffer += self.chunks.pop(self.next_chunk)
+            self.next_chunk += 1
+
+        return self.frames()
+
+    def frames(self) -> Iterator[AnimationFrame]:
+        header = AnimationEncoder.FRAME_HEADER
+        while len(self.buffer) >= header.size:
+            start, size, duration, _ = header.unpack_from(self.buffer)
+            if start != AnimationEncoder.FRAME_START:
+                raise PacketParsingError(f"frame start value wrong: {start}")
+            if size <= header.size:
+                raise PacketParsingError(f"frame size wrong: {size}")
+            if len(self.buffer) < size:
+                return
+
+            frame = bytes(self.buffer[:size])
+            del self.buffer[:size]
+
+            palette_len = frame[header.size] or 256
+            palette_end = header.size + 1 + 3 * palette_len
+            yield AnimationFrame(frame[header.size + 1 : palette_end], frame[palette_end:], duration)
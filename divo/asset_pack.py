@@ -0,0 +1,258 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import mmap
+import os
+import secrets
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from PIL import Image
+
+from .animation import AnimationEncoder
+from .evo_encoder import EvoEncoder
+from .evo_pixmap import RawPixmap
+from .exceptions import AssetPackException, PacketException
+from .packet import BuiltPacket, Packet
+from .pixoo import Pixoo
+
+IMAGE_EXTENSIONS = (".png", ".gif", ".apng", ".webp", ".jpg", ".jpeg", ".bmp")
+
+
+class Asset(NamedTuple):
+    name: str
+    # complete packets, a SET_BOX_COLOR image or the SET_MUL_BOX_COLOR chunks of an animation
+    packets: List[bytes]
+    # milliseconds per animation frame, empty for still images
+    durations: Tuple[int, ...] = ()
+
+
+class AssetEntry(NamedTuple):
+    name: str
+    # position of the packets in the pack file
+    offset: int
+    length: int
+    durations: Tuple[int, ...]
+
+    @property
+    def duration(self) -> int:
+        """total length of the animation in ms, 0 for still images"""
+        return sum(self.durations)
+
+
+def encode_file(path: str, name: Optional[str] = None) -> Asset:
+    """
+    encode a still image or animation (GIF/APNG/WebP) for a 16x16 display like the img and anim commands do
+
+    :param name: name of the asset, defaults to the file name without extension
+    :raises ValueError: if the animation is too long
+    """
+    if name is None:
+        name = os.path.splitext(os.path.basename(path))[0]
+
+    rp = RawPixmap(16, 16)
+    with Image.open(path) as image:
+        if getattr(image, "n_frames", 1) > 1:
+            frames = list(AnimationEncoder.iter_image_frames(image, rp))
+            packets = list(AnimationEncoder.encode(frames))
+            # stored in 16 bit like in the frames
+            return Asset(name, packets, tuple(min(duration, 0xFFFF) for _, duration in frames))
+
+        rp.set_image(image)
+        return Asset(name, [EvoEncoder.image_bytes_rgb(rp.rgb_buffer())])
+
+
+def encode_directory(directory: str) -> Iterator[Asset]:
+    """
+    encode all images below directory, named by their path relative to it without extension, e.g. "icons/sun"
+
+    :raises ValueError: if two files get the same name, e.g. sun.png and sun.gif, or an animation is too long
+    """
+    paths: Dict[str, str] = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file_name in sorted(files):
+            if not file_name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+
+            path = os.path.join(root, file_name)
+            name = os.path.splitext(os.path.relpath(path, directory))[0].replace(os.sep, "/")
+            if name in paths:
+                raise ValueError(f"{paths[name]} and {path} would both be named {name}, rename one of them")
+            paths[name] = path
+
+            try:
+                asset = encode_file(path, name)
+            except ValueError as e:
+                raise ValueError(f"can't encode {path}: {e}")
+            yield asset
+
+
+class AssetPack:
+    """
+    Pre-encoded images and animations in a single file, ready to be sent without decoding anything.
+
+    The file starts with a header and an index of all assets, followed by their packets as they are sent to
+    the device. The file is mapped into memory, packets are handed out as memoryviews of the mapping. Their
+    framing and checksums are checked once when the pack is opened, so they're sent without validating them
+    again.
+
+    Header: magic, version (16 bit), number of assets (32 bit). Index entry: name length (16 bit), offset and
+    length of the packets in the file (32 bit each), number of frame durations (16 bit), then the UTF-8 name
+    and the durations in ms (16 bit each). All numbers are little-endian.
+    """
+
+    MAGIC = b"DIVOPACK"
+    VERSION = 1
+    HEADER = struct.Struct("<8sHI")
+    ENTRY = struct.Struct("<HIIH")
+
+    def __init__(self, path: str) -> None:
+        """
+        :raises OSError: if the file can't be opened
+        :raises AssetPackException: if it isn't an asset pack or a packet is broken
+        """
+        with open(path, "rb") as f:
+            try:
+                self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise AssetPackException(f"{path} is empty")
+
+        self.view = memoryview(self.mmap)
+        try:
+            self.entries = self._read_index(self.view)
+        except (AssetPackException, struct.error, UnicodeDecodeError) as e:
+            self.close()
+            raise AssetPackException(f"{path} is not a valid asset pack: {e}")
+
+    def __enter__(self) -> "AssetPack":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def close(self) -> None:
+        self.view.release()
+        try:
+            self.mmap.close()
+        except BufferError:
+            # packets handed out are still referenced, the mapping goes away together with them
+            pass
+
+    @classmethod
+    def _read_index(cls, view: memoryview) -> Dict[str, AssetEntry]:
+        magic, version, count = cls.HEADER.unpack_from(view)
+        if magic != cls.MAGIC:
+            raise AssetPackException("magic wrong")
+        if version != cls.VERSION:
+            raise AssetPackException(f"unsupported version {version}")
+
+        entries: Dict[str, AssetEntry] = {}
+        pos = cls.HEADER.size
+        for _ in range(count):
+            name_length, offset, length, duration_count = cls.ENTRY.unpack_from(view, pos)
+            pos += cls.ENTRY.size
+            name = bytes(view[pos : pos + name_length]).decode()
+            pos += name_length
+            durations = struct.unpack_from(f"<{duration_count}H", view, pos)
+            pos += 2 * duration_count
+
+            if offset + length > len(view):
+                raise AssetPackException(f"{name} is truncated")
+            cls._check_framing(name, view[offset : offset + length])
+            entries[name] = AssetEntry(name, offset, length, durations)
+
+        return entries
+
+    @staticmethod
+    def _check_framing(name: str, data: memoryview) -> None:
+        size = 0
+        for packet in Packet.views(data):
+            try:
+                Packet.unpack(packet, zero_copy=True)
+            except PacketException as e:
+                raise AssetPackException(f"{name} has a broken packet: {e}")
+            size += len(packet)
+
+        if size != len(data):
+            raise AssetPackException(f"{name} ends with an incomplete packet")
+
+    def data(self, name: str) -> memoryview:
+        """
+        :return: all packets of the asset back to back, without copying
+        :raises KeyError: if there's no such asset
+        """
+        entry = self.entries[name]
+        return self.view[entry.offset : entry.offset + entry.length]
+
+    def packets(self, name: str) -> List[memoryview]:
+        """:return: a view of every packet of the asset, e.g. to pass to BluetoothBase.write"""
+        return list(Packet.views(self.data(name)))
+
+    def send(self, pixoo: Pixoo, name: str) -> List[Optional[bytes]]:
+        """
+        send an asset to the device
+
+        :return: raw response per packet
+        """
+        # checked when opening the pack, copying a packet is cheaper than validating it again
+        return [pixoo.transceive(BuiltPacket(p)) for p in self.packets(name)]
+
+    @classmethod
+    def write(cls, path: str, assets: Iterable[Asset]) -> List[AssetEntry]:
+        """
+        write an asset pack, it's replaced atomically if it already exists
+
+        :return: index of the written pack
+        """
+        assets = list(assets)
+        names = [a.name.encode() for a in assets]
+        if len(set(names)) != len(names):
+            raise ValueError("asset names have to be unique")
+
+        index_size = sum(cls.ENTRY.size + len(n) + 2 * len(a.durations) for n, a in zip(names, assets))
+        offset = cls.HEADER.size + index_size
+
+        index = [cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(assets))]
+        entries: List[AssetEntry] = []
+        for name, asset in zip(names, assets):
+            length = sum(len(p) for p in asset.packets)
+            index.append(cls.ENTRY.pack(len(name), offset, length, len(asset.durations)))
+            index.append(name)
+            index.append(struct.pack(f"<{len(asset.durations)}H", *asset.durations))
+            entries.append(AssetEntry(asset.name, offset, length, asset.durations))
+            offset += length
+
+        # write to a temporary file first so a running kiosk never maps a partial pack
+        directory = os.path.dirname(os.path.abspath(path))
+        tmp_path = os.path.join(directory, f".tmp-{secrets.token_hex(8)}")
+        # not mkstemp, its files are only readable by us. The umask applies here like for open().
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.writelines(index)
+                for asset in assets:
+                    f.writelines(asset.packets)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        return entries
@@ -0,0 +1,38 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import abc
+
+from .helpers import ReadableBuffer
+
+
+class AsyncBluetoothBase(abc.ABC):
+    @abc.abstractmethod
+    async def connect(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def write(self, data: ReadableBuffer) -> int:
+        pass
+
+    @abc.abstractmethod
+    async def read(self, count: int) -> bytes:
+        """
+        :return: up to count bytes as soon as any data is available, empty if the connection was closed
+        """
+        pass
@@ -0,0 +1,67 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import socket
+from typing import Optional
+
+from .async_bluetooth_base import AsyncBluetoothBase
+from .bluetooth_socket import check_bluetooth_support, get_rfcomm_protocol
+from .exceptions import NotConnectedException
+from .helpers import ReadableBuffer
+
+
+class AsyncBluetoothSocket(AsyncBluetoothBase):
+    """
+    Bluetooth connection using native Bluetooth socket support driven by the asyncio event loop.
+    """
+
+    def __init__(self, mac_address: str):
+        self.mac_address = mac_address
+        self.sock: Optional[socket.socket] = None
+        self.BTPROTO_RFCOMM = get_rfcomm_protocol()
+
+        check_bluetooth_support()
+
+    async def connect(self) -> None:
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, self.BTPROTO_RFCOMM)
+
+        # older event loops try to resolve the address of non-unix sockets, so connect in a worker thread
+        try:
+            await loop.run_in_executor(None, sock.connect, (self.mac_address, 1))
+        except BaseException:
+            sock.close()
+            raise
+
+        sock.setblocking(False)
+        self.sock = sock
+
+    async def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    async def write(self, data: ReadableBuffer) -> int:
+        if self.sock is None:
+            raise NotConnectedException("tried to write data")
+
+        await asyncio.get_running_loop().sock_sendall(self.sock, data)
+        return len(data)
+
+    async def read(self, count: int) -> bytes:
+        if self.sock is None:
+            raise NotConnectedException("tried to read data")
+
+        return await asyncio.get_running_loop().sock_recv(self.sock, count)
@@ -0,0 +1,209 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, DefaultDict, Deque, Optional, Union
+
+from loguru import logger
+
+from .async_bluetooth_base import AsyncBluetoothBase
+from .command import COMMANDS_WITHOUT_RESPONSE, Command, CommandParser, GetBoxMode
+from .command_base import CommandBase
+from .device_state import DeviceState
+from .exceptions import CommandNoReplyException, NotConnectedException, PacketWriteException
+from .packet import BuiltPacket, Packet, ResponsePacket
+from .packet_framer import PacketFramer
+from .pixoo_base import PixooBase
+
+
+class AsyncPixoo(PixooBase):
+    """
+    Pixoo client for asyncio. All command methods return awaitables, e.g. `await pixoo.set_brightness(50)`.
+
+    Commands may be awaited concurrently. Writes are serialised and a reader task matches responses to
+    their commands by command id, so many commands and many devices can be in flight in one thread.
+    """
+
+    READ_SIZE = 1024
+
+    def __init__(
+        self, bt_device: AsyncBluetoothBase, response_timeout: float = 2.0, skip_redundant: bool = True
+    ) -> None:
+        self.comm = bt_device
+        self.response_timeout = response_timeout
+
+        # last acknowledged settings, see DeviceState
+        self.state = DeviceState()
+        self.skip_redundant = skip_redundant
+
+        self.command_parser = CommandParser()
+        self.framer = PacketFramer()
+
+        self.pending: DefaultDict[int, Deque["asyncio.Future[bytes]"]] = defaultdict(deque)
+        self.reader: Optional["asyncio.Task[None]"] = None
+        self.write_lock: Optional[asyncio.Lock] = None
+
+    async def connect(self) -> None:
+        await self.comm.connect()
+
+        self.write_lock = asyncio.Lock()
+        self.reader = asyncio.ensure_future(self._read_responses())
+
+    async def close(self) -> None:
+        if self.reader is not None:
+            self.reader.cancel()
+            try:
+                await self.reader
+            except asyncio.CancelledError:
+                pass
+            self.reader = None
+
+        await self.comm.close()
+
+    async def __aenter__(self) -> "AsyncPixoo":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.close()
+
+    async def write(self, data: bytes) -> Optional[Any]:
+        """
+        send raw data to Pixoo and receive and parse response packet
+
+        :param data: raw packet to send
+        :return: parsed ResponsePacket if this command has a response and we successfully received it
+        """
+        response = await self.transceive(data)
+        if response is None:
+            return None
+
+        return ResponsePacket.parse(self.command_parser, response)
+
+    async def transceive(self, data: bytes) -> Optional[bytes]:
+        """
+        send raw data to Pixoo and receive response packet
+
+        :param data: raw packet to send
+        :return: raw response packet if this command has a response and we received it in time
+        """
+        if self.write_lock is None:
+            raise NotConnectedException("tried to write data")
+
+        # packets we built ourselves are valid already
+        if not isinstance(data, BuiltPacket) and not Packet.is_valid(self.command_parser, data):
+            raise PacketWriteException("tried to send invalid packet")
+
+        cmd = data[3]
+        future: "Optional[asyncio.Future[bytes]]" = None
+        if cmd not in COMMANDS_WITHOUT_RESPONSE:
+            # register before sending so a quick response can't get lost
+            future = asyncio.get_running_loop().create_future()
+            self.pending[cmd].append(future)
+
+        sequence = self.state.sending(cmd)
+        try:
+            async with self.write_lock:
+                await self.comm.write(data)
+        except BaseException:
+            # nothing was sent, so a later response must not be matched to this command
+            if future is not None:
+                self.pending[cmd].remove(future)
+                future.cancel()
+            raise
+        logger.opt(lazy=True).debug("sending {}", lambda: list(data))
+
+        response = None
+        if future is not None:
+            try:
+                response = await asyncio.wait_for(future, self.response_timeout)
+            except (asyncio.TimeoutError, CommandNoReplyException):
+                logger.error(f"didn't receive response to command {cmd}")
+                return None
+
+        self.state.acknowledged(cmd, data[4:-3], sequence)
+        return response
+
+    async def _read_responses(self) -> None:
+        while True:
+            chunk = await self.comm.read(self.READ_SIZE)
+            if not chunk:
+                logger.error("connection closed")
+                for waiting in self.pending.values():
+                    for future in waiting:
+                        if not future.done():
+                            future.set_exception(CommandNoReplyException("connection closed"))
+                self.pending.clear()
+                return
+
+            for response in self.framer.feed(chunk):
+                logger.opt(lazy=True).debug("received {}", lambda: list(response))
+                self._dispatch(response)
+
+    def _dispatch(self, response: bytes) -> None:
+        cmd_type = response[4]
+        waiting = self.pending.get(cmd_type)
+
+        # skip commands that timed out meanwhile
+        while waiting and waiting[0].done():
+            waiting.popleft()
+
+        if not waiting:
+            logger.warning(f"dropping response to command {cmd_type} we didn't wait for")
+            return
+
+        waiting.popleft().set_result(response)
+
+    async def write_command(
+        self,
+        cmd: CommandBase,
+        cmd_data: Optional[Union[bytes, int]] = None,
+        need_response: bool = False,
+        force: bool = False,
+    ) -> Optional[Any]:
+        """
+        send command with payload and receive response if there is any
+
+        :param cmd: Command id
+        :param cmd_data: raw data, command-specific
+        :param force: send even if the device already acknowledged the same setting
+        :return: parsed ResponsePacket if we received it successfully, None if the command was skipped
+        """
+        return await self.write_packet(cmd, self.build_packet(cmd, cmd_data), need_response=need_response, force=force)
+
+    async def write_packet(
+        self, cmd: CommandBase, packet: BuiltPacket, need_response: bool = False, force: bool = False
+    ) -> Optional[Any]:
+        """
+        like write_command but with the complete packet of the command
+        """
+        if self.skip_redundant and not force and self.state.is_current(cmd.value, packet[4:-3]):
+            logger.debug(f"skipping command {cmd.value}, setting is current")
+            self.state.skip(cmd.value)
+            return None
+
+        response = await self.transceive(packet)
+        if response is None:
+            if need_response:
+                raise CommandNoReplyException(f"expected a reply to command {cmd.value}")
+            return None
+
+        return ResponsePacket.parse(self.command_parser, response)
+
+    async def get_box_mode(self) -> GetBoxMode:
+        box_mode = await self.write_command_with_response(Command.GET_BOX_MODE)
+        assert isinstance(box_mode, GetBoxMode)
+        self.state.seed(box_mode)
+        return box_mode
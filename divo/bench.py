@@ -0,0 +1,268 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import platform
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from PIL import Image
+
+from .command import Command, CommandParser
+from .emulator import LoopbackTransport
+from .evo_encoder import EvoEncoder
+from .evo_pixmap import RawPixmap
+from .helpers import percentile
+from .packet import Packet, ResponsePacket
+from .packet_stream import PacketStreamDecoder
+from .packet_template import PacketTemplate
+from .pixoo import Pixoo
+
+# bump when results stop being comparable to older baselines
+FORMAT_VERSION = 1
+
+
+class BenchResult(NamedTuple):
+    name: str
+    ops: int
+    ops_per_sec: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    peak_memory: int  # bytes allocated by Python at most during one op, Pillow's image memory isn't traced
+
+
+def measure(name: str, op: Callable[[], Any], min_time: float = 0.2, max_ops: int = 100000) -> BenchResult:
+    """
+    run op repeatedly for at least min_time seconds, timing every call
+
+    :param name: name of the benchmark
+    :param op: the operation to measure
+    :param min_time: seconds to spend measuring
+    :param max_ops: stop earlier after this many calls
+    """
+    # warm up caches, lazy imports etc.
+    op()
+
+    samples: List[float] = []
+    clock = time.perf_counter
+    start = clock()
+    end = start + min_time
+    while len(samples) < max_ops:
+        t0 = clock()
+        op()
+        t1 = clock()
+        samples.append(t1 - t0)
+        if t1 >= end:
+            break
+    elapsed = sum(samples)
+
+    # allocations are measured separately, tracing slows everything down
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    op()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return BenchResult(
+        name=name,
+        ops=len(samples),
+        ops_per_sec=len(samples) / elapsed if elapsed else 0.0,
+        p50_us=percentile(samples, 0.5) * 1e6,
+        p90_us=percentile(samples, 0.9) * 1e6,
+        p99_us=percentile(samples, 0.99) * 1e6,
+        peak_memory=peak - baseline,
+    )
+
+
+def _image_pixels(colours: int) -> List[int]:
+    return [(i % colours) * 0x010307 & 0xFFFFFF for i in range(256)]
+
+
+def _source_image(size: int) -> Image.Image:
+    return Image.merge("RGBA", [Image.effect_noise((size, size), 40 + 20 * i) for i in range(4)])
+
+
+def benchmarks() -> Dict[str, Callable[[], Callable[[], Any]]]:
+    """
+    :return: setup function per benchmark name, each returns the operation to measure
+    """
+
+    def packet_build() -> Callable[[], Any]:
+        return lambda: Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 50)
+
+    def packet_template() -> Callable[[], Any]:
+        template = PacketTemplate(Command.SET_BOX_MODE, bytes([1, 0, 0, 0, 0x14, 0, 1, 0, 0, 0]), (1, 2, 3))
+        values = iter(range(1 << 62))
+        return lambda: template.build(next(values) & 0xFF, 0, 0)
+
+    def packet_build_image() -> Callable[[], Any]:
+        payload = EvoEncoder.image_bytes(_image_pixels(16))[4:-3]
+        return lambda: Packet.build(Command.SET_BOX_COLOR, payload)
+
+    def packet_build_into_image() -> Callable[[], Any]:
+        payload = EvoEncoder.image_bytes(_image_pixels(16))[4:-3]
+        buf = bytearray(Packet.size_for(len(payload)))
+        return lambda: Packet.build_into(buf, Command.SET_BOX_COLOR, payload)
+
+    def packet_build_many() -> Callable[[], Any]:
+        commands = [(Command.SET_SYSTEM_BRIGHTNESS, level) for level in range(0, 100, 10)]
+        return lambda: Packet.build_many(commands)
+
+    def packet_parse() -> Callable[[], Any]:
+        parser = CommandParser()
+        packet = EvoEncoder.image_bytes(_image_pixels(16))
+        return lambda: Packet.parse(parser, packet)
+
+    def packet_parse_zero_copy() -> Callable[[], Any]:
+        parser = CommandParser()
+        packet = EvoEncoder.image_bytes(_image_pixels(16))
+        return lambda: Packet.parse(parser, packet, zero_copy=True)
+
+    def packet_is_valid() -> Callable[[], Any]:
+        parser = CommandParser()
+        packet = EvoEncoder.image_bytes(_image_pixels(16))
+        return lambda: Packet.is_valid(parser, packet)
+
+    def packet_is_valid_framing() -> Callable[[], Any]:
+        parser = CommandParser()
+        packet = EvoEncoder.image_bytes(_image_pixels(16))
+        return lambda: Packet.is_valid(parser, packet, framing_only=True)
+
+    def response_packet_parse() -> Callable[[], Any]:
+        parser = CommandParser()
+        packet = ResponsePacket.build(Command.GET_BOX_MODE, bytes(range(16)))
+        return lambda: ResponsePacket.parse(parser, packet)
+
+    def image_bytes() -> Callable[[], Any]:
+        pixels = _image_pixels(16)
+        return lambda: EvoEncoder.image_bytes(pixels)
+
+    def packet_stream_decode() -> Callable[[], Any]:
+        cmd = Packet.parse(CommandParser(), EvoEncoder.image_bytes(_image_pixels(16)))
+        return lambda: PacketStreamDecoder(cmd.palette, cmd.image)
+
+    def decode_image(size: int) -> Callable[[], Callable[[], Any]]:
+        def setup() -> Callable[[], Any]:
+            rp = RawPixmap(16, 16)
+            image = _source_image(size)
+            return lambda: rp.decode_image(image)
+
+        return setup
+
+    def send_image() -> Callable[[], Any]:
+        d = Pixoo(LoopbackTransport())
+        packet = EvoEncoder.image_bytes(_image_pixels(16))
+        return lambda: d.transceive(packet)
+
+    def send_image_raw() -> Callable[[], Any]:
+        d = Pixoo(LoopbackTransport())
+        # plain bytes are validated before sending, unlike packets from Packet.build and EvoEncoder
+        packet = bytes(EvoEncoder.image_bytes(_image_pixels(16)))
+        return lambda: d.transceive(packet)
+
+    def send_light_mode() -> Callable[[], Any]:
+        d = Pixoo(LoopbackTransport())
+        values = iter(range(1 << 62))
+        return lambda: d.set_light_mode_light(next(values) & 0xFF, 0, 0)
+
+    def send_image_pipelined() -> Callable[[], Any]:
+        d = Pixoo(LoopbackTransport(), max_in_flight=4)
+        packet = EvoEncoder.image_bytes(_image_pixels(16))
+        return lambda: d.submit(packet, parse=False)
+
+    suite = {
+        "packet.build": packet_build,
+        "packet.build.image": packet_build_image,
+        "packet.template.light_mode": packet_template,
+        "packet.build_into.image": packet_build_into_image,
+        "packet.build_many": packet_build_many,
+        "packet.parse.image": packet_parse,
+        "packet.parse.image.zero_copy": packet_parse_zero_copy,
+        "packet.is_valid.image": packet_is_valid,
+        "packet.is_valid.image.framing_only": packet_is_valid_framing,
+        "response_packet.parse": response_packet_parse,
+        "evo_encoder.image_bytes": image_bytes,
+        "packet_stream.decode": packet_stream_decode,
+    }
+    for size in (16, 64, 256, 1024):
+        suite[f"evo_pixmap.decode_image.{size}"] = decode_image(size)
+    suite.update(
+        {
+            "send.image": send_image,
+            "send.image.raw": send_image_raw,
+            "send.image.pipelined": send_image_pipelined,
+            "send.light_mode": send_light_mode,
+        }
+    )
+    return suite
+
+
+def run(names: Optional[Iterable[str]] = None, min_time: float = 0.2) -> List[BenchResult]:
+    """
+    :param names: benchmarks to run, all if None
+    :param min_time: seconds to spend per benchmark
+    """
+    suite = benchmarks()
+    if names is None:
+        names = suite.keys()
+    return [measure(name, suite[name](), min_time) for name in names]
+
+
+def to_json(results: List[BenchResult]) -> str:
+    return json.dumps(
+        {
+            "version": FORMAT_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": {r.name: r._asdict() for r in results},
+        },
+        indent=2,
+    )
+
+
+def compare(results: List[BenchResult], baseline: Dict[str, Any], threshold: float = 0.1) -> List[str]:
+    """
+    :param results: current results
+    :param baseline: parsed output of to_json
+    :param threshold: fraction of ops/s a benchmark may lose before it counts as regression
+    :return: description of every regression
+    """
+    if baseline.get("version") != FORMAT_VERSION:
+        raise ValueError(f"baseline has format version {baseline.get('version')}, expected {FORMAT_VERSION}")
+
+    regressions = []
+    for r in results:
+        old = baseline["results"].get(r.name)
+        if old is None:
+            continue
+
+        ratio = r.ops_per_sec / old["ops_per_sec"]
+        if ratio < 1 - threshold:
+            regressions.append(
+                f"{r.name}: {r.ops_per_sec:.0f} ops/s, baseline {old['ops_per_sec']:.0f} ops/s ({ratio - 1:+.0%})"
+            )
+    return regressions
+
+
+def format_table(results: List[BenchResult]) -> str:
+    lines = [f"{'benchmark':<32} {'ops/s':>10} {'p50 us':>9} {'p90 us':>9} {'p99 us':>9} {'peak mem':>9}"]
+    for r in results:
+        lines.append(
+            f"{r.name:<32} {r.ops_per_sec:>10.0f} {r.p50_us:>9.1f} {r.p90_us:>9.1f} {r.p99_us:>9.1f} "
+            f"{r.peak_memory:>9}"
+        )
+    return "\n".join(lines)
@@ -14,6 +14,8 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 
 import abc
 
+from .helpers import ReadableBuffer
+
 
 class BluetoothBase(abc.ABC):
     @abc.abstractmethod
@@ -29,9 +31,13 @@ class BluetoothBase(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def write(self, data: bytes) -> int:
+    def write(self, data: ReadableBuffer) -> int:
         pass
 
     @abc.abstractmethod
     def read(self, count: int) -> bytes:
         pass
+
+    def close(self) -> None:
+        """release the connection, connect() may be called again afterwards"""
+        pass
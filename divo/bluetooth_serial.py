@@ -17,6 +17,7 @@ from typing import Any
 import serial
 
 from .bluetooth_base import BluetoothBase
+from .helpers import ReadableBuffer
 
 
 class BluetoothSerial(BluetoothBase):
@@ -44,7 +45,7 @@ class BluetoothSerial(BluetoothBase):
     def flush(self) -> None:
         self.fd.reset_output_buffer()
 
-    def write(self, data: bytes) -> int:
+    def write(self, data: ReadableBuffer) -> int:
         ret = self.fd.write(data)
         assert isinstance(ret, int)
         return ret
@@ -18,6 +18,25 @@ from typing import Optional
 
 from .bluetooth_base import BluetoothBase
 from .exceptions import BluetoothSupportMissingException, NotConnectedException
+from .helpers import ReadableBuffer
+
+
+def get_rfcomm_protocol() -> int:
+    # workaround so we can at least make unit tests on python versions missing bluetooth support
+    try:
+        return int(socket.BTPROTO_RFCOMM)  # type: ignore
+    except AttributeError:
+        return 3
+
+
+def check_bluetooth_support() -> None:
+    # check if bluetooth sockets are supported
+    # see https://stackoverflow.com/a/29108576
+    if (
+        not sysconfig.get_config_vars()["HAVE_BLUETOOTH_H"]
+        and not sysconfig.get_config_vars()["HAVE_BLUETOOTH_BLUETOOTH_H"]
+    ):
+        raise BluetoothSupportMissingException("Your Python interpreter is missing Bluetooth support.")
 
 
 class BluetoothSocket(BluetoothBase):
@@ -29,21 +48,9 @@ class BluetoothSocket(BluetoothBase):
         self.mac_address = mac_address
         self.sock: Optional[socket.socket] = None
         self.timeout = socket_timeout
+        self.BTPROTO_RFCOMM = get_rfcomm_protocol()
 
-        # workaround so we can at least make unit tests on python versions missing bluetooth support
-        self.BTPROTO_RFCOMM = 3
-        try:
-            self.BTPROTO_RFCOMM = socket.BTPROTO_RFCOMM  # type: ignore
-        except AttributeError:
-            pass
-
-        # check if bluetooth sockets are supported
-        # see https://stackoverflow.com/a/29108576
-        if (
-            not sysconfig.get_config_vars()["HAVE_BLUETOOTH_H"]
-            and not sysconfig.get_config_vars()["HAVE_BLUETOOTH_BLUETOOTH_H"]
-        ):
-            raise BluetoothSupportMissingException("Your Python interpreter is missing Bluetooth support.")
+        check_bluetooth_support()
 
     def connect(self) -> None:
         self.sock = socket.socket(socket.AF_BLUETOOTH, socket.SOCK_STREAM, self.BTPROTO_RFCOMM)
@@ -52,13 +59,18 @@ class BluetoothSocket(BluetoothBase):
         if self.timeout is not None:
             self.sock.settimeout(self.timeout)
 
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
     def get_in_waiting(self) -> int:
         return 0
 
     def flush(self) -> None:
         return
 
-    def write(self, data: bytes) -> int:
+    def write(self, data: ReadableBuffer) -> int:
         if self.sock is None:
             raise NotConnectedException("tried to write data")
 
@@ -12,12 +12,23 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import struct
 from enum import IntEnum
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 from loguru import logger
 
 from .command_base import CommandBase, CommandParserBase
+from .exceptions import PacketParsingError
+from .helpers import ReadableBuffer
+
+
+def unpack_payload(layout: struct.Struct, data: ReadableBuffer) -> Tuple[Any, ...]:
+    """struct.unpack_from for command payloads, raises PacketParsingError if the payload is too short"""
+    try:
+        return layout.unpack_from(data)
+    except struct.error as e:
+        raise PacketParsingError(f"payload too short: {e}")
 
 
 class Command(CommandBase):
@@ -52,27 +63,40 @@ COMMANDS_WITHOUT_RESPONSE = [
 
 
 class CommandParser(CommandParserBase):
-    @staticmethod
-    def parse(cmd_type: int, data: bytes) -> Any:
-        if cmd_type == Command.SET_BOX_COLOR.value:
-            return SetBoxColor.from_data(data)
-        elif cmd_type == Command.SET_MUL_BOX_COLOR.value:
-            return SetMulBoxColor.from_data(data)
-        else:
+    # command id -> parser for its payload, see register()
+    parsers: Dict[int, Callable[[ReadableBuffer], Any]] = {}
+    response_parsers: Dict[int, Callable[[ReadableBuffer], Any]] = {}
+
+    @classmethod
+    def register(cls, cmd_type: int, parser: Callable[[ReadableBuffer], Any], response: bool = False) -> None:
+        """
+        add or replace the parser for a command, this is how commands not known to divo can be parsed, too
+
+        :param cmd_type: command id
+        :param parser: called with the payload, e.g. the from_data of a record class
+        :param response: parser is for the response to this command instead of the command itself
+        """
+        (cls.response_parsers if response else cls.parsers)[int(cmd_type)] = parser
+
+    @classmethod
+    def parse(cls, cmd_type: int, data: ReadableBuffer) -> Any:
+        parser = cls.parsers.get(cmd_type)
+        if parser is None:
             name = Command.get_name(cmd_type)
             logger.warning(f"parser for cmd_type {cmd_type} ({name}) not implemented")
+            return None
 
-        return None
+        return parser(data)
 
-    @staticmethod
-    def parse_response(cmd_type: int, data: bytes) -> Any:
-        if cmd_type == Command.GET_BOX_MODE.value:
-            return GetBoxMode.from_data(data)
-        else:
+    @classmethod
+    def parse_response(cls, cmd_type: int, data: ReadableBuffer) -> Any:
+        parser = cls.response_parsers.get(cmd_type)
+        if parser is None:
             name = Command.get_name(cmd_type)
             logger.warning(f"response parser for cmd_type {cmd_type} ({name}) not implemented")
+            return None
 
-        return None
+        return parser(data)
 
 
 class BoxMode(IntEnum):
@@ -128,6 +152,8 @@ class WeatherType(IntEnum):
 
 
 class ActivatedModes:
+    __slots__ = ("clock", "weather", "temperature", "date")
+
     @staticmethod
     def get_default() -> "ActivatedModes":
         return ActivatedModes(clock=True)
@@ -140,25 +166,67 @@ class ActivatedModes:
 
 
 class GetBoxMode:
-    @staticmethod
-    def from_data(data: bytes) -> "GetBoxMode":
-        return GetBoxMode(
-            mode=data[0],
-            temp_type=data[1],
-            light_mode=data[2],
-            light_r=data[3],
-            light_g=data[4],
-            light_b=data[5],
-            level=data[6],
-            music_type=data[7],
-            sys_light=data[8],
-            time_type=data[9],
-            time_r=data[10],
-            time_g=data[11],
-            time_b=data[12],
-            temp_r=data[13],
-            temp_g=data[14],
-            temp_b=data[15],
+    # payload of the response, one byte per field
+    FIELDS = (
+        "mode",
+        "temp_type",
+        "light_mode",
+        "light_r",
+        "light_g",
+        "light_b",
+        "level",
+        "music_type",
+        "sys_light",
+        "time_type",
+        "time_r",
+        "time_g",
+        "time_b",
+        "temp_r",
+        "temp_g",
+        "temp_b",
+    )
+    _layout = struct.Struct(f"{len(FIELDS)}B")
+
+    __slots__ = FIELDS + ("_raw", "light_level")
+
+    @classmethod
+    def from_data(cls, data: ReadableBuffer) -> "GetBoxMode":
+        (
+            mode,
+            temp_type,
+            light_mode,
+            light_r,
+            light_g,
+            light_b,
+            level,
+            music_type,
+            sys_light,
+            time_type,
+            time_r,
+            time_g,
+            time_b,
+            temp_r,
+            temp_g,
+            temp_b,
+        ) = unpack_payload(cls._layout, data)
+
+        return cls(
+            mode=mode,
+            temp_type=temp_type,
+            light_mode=light_mode,
+            light_r=light_r,
+            light_g=light_g,
+            light_b=light_b,
+            level=level,
+            music_type=music_type,
+            sys_light=sys_light,
+            time_type=time_type,
+            time_r=time_r,
+            time_g=time_g,
+            time_b=time_b,
+            temp_r=temp_r,
+            temp_g=temp_g,
+            temp_b=temp_b,
             raw=data,
         )
 
@@ -181,9 +249,9 @@ class GetBoxMode:
         temp_r: int = 0,
         temp_g: int = 0,
         temp_b: int = 0,
-        raw: Optional[bytes] = None,
+        raw: Optional[ReadableBuffer] = None,
     ):
-        self._raw: Optional[bytes] = raw
+        self._raw: Optional[ReadableBuffer] = raw
 
         self.mode = mode
         self.temp_type = temp_type
@@ -213,42 +281,80 @@ class GetBoxMode:
 
 
 class SetBoxColor:
-    @staticmethod
-    def from_data(data: bytes) -> "SetBoxColor":
-        # crap = 00 0a 0a 04 aa 7f 00 f4 01 00
-        _ = data[:10]
+    # unknown fields, then the palette size
+    # crap = 00 0a 0a 04 aa 7f 00 f4 01 00
+    _header = struct.Struct("10xB")
+
+    __slots__ = ("raw", "palette", "image")
 
-        palette_len = data[10]
-        palette = data[11 : 11 + 3 * palette_len]
-        image = data[11 + 3 * palette_len :]
+    @classmethod
+    def from_data(cls, data: ReadableBuffer) -> "SetBoxColor":
+        palette_len = unpack_payload(cls._header, data)[0] or 256  # a full palette doesn't fit in one byte
+        palette_end = cls._header.size + 3 * palette_len
 
-        return SetBoxColor(
-            palette=palette,
-            image=image,
+        return cls(
+            palette=data[cls._header.size : palette_end],
+            image=data[palette_end:],
             raw=data,
         )
 
-    def __init__(self, raw: bytes, palette: bytes, image: bytes):
+    def __init__(self, raw: ReadableBuffer, palette: ReadableBuffer, image: ReadableBuffer):
+        # memoryviews into the packet when it was parsed with zero_copy
         self.raw = raw
 
         self.palette = palette
         self.image = image
 
+    def materialize(self) -> "SetBoxColor":
+        """copy the views to bytes, needed before the parsed buffer is changed or reused"""
+        self.raw = bytes(self.raw)
+        self.palette = bytes(self.palette)
+        self.image = bytes(self.image)
+        return self
+
     def __str__(self) -> str:
-        return f"SetBoxColor<palette={self.palette!r} image={self.image!r}>"
+        return f"SetBoxColor<palette={bytes(self.palette)!r} image={bytes(self.image)!r}>"
 
 
 class SetMulBoxColor(SetBoxColor):
-    @staticmethod
-    def from_data(data: bytes) -> "SetBoxColor":
-        # crap = 2c 01 00 aa a2 00 1b 01 00
-        _ = data[:9]
-        palette_len = data[9]
-        palette = data[10 : 10 + 3 * palette_len]
-        image = data[10 + 3 * palette_len :]
-
-        return SetBoxColor(
-            palette=palette,
-            image=image,
-            raw=data,
-        )
+    # crap = 2c 01 00 aa a2 00 1b 01 00
+    _header = struct.Struct("9xB")
+
+    __slots__ = ()
+
+
+class AnimationChunk:
+    """
+    SET_MUL_BOX_COLOR packet after the first one of an animation, it only continues the frame data of the
+    previous chunks and is reassembled by AnimationDecoder
+    """
+
+    # total length of the animation, chunk number
+    _header = struct.Struct("<HB")
+
+    __slots__ = ("total", "index", "data")
+
+    @classmethod
+    def from_data(cls, data: ReadableBuffer) -> "AnimationChunk":
+        total, index = unpack_payload(cls._header, data)
+        return cls(total, index, data[cls._header.size :])
+
+    def __init__(self, total: int, index: int, data: ReadableBuffer):
+        self.total = total
+        self.index = index
+        self.data = data
+
+    def __str__(self) -> str:
+        return f"AnimationChunk<total={self.total} index={self.index} data={bytes(self.data)!r}>"
+
+
+def parse_mul_box_color(data: ReadableBuffer) -> Union[SetBoxColor, AnimationChunk]:
+    """only the first chunk of an animation starts with a frame header, the others can be cut anywhere"""
+    if len(data) > 2 and data[2] != 0:
+        return AnimationChunk.from_data(data)
+    return SetMulBoxColor.from_data(data)
+
+
+CommandParser.register(Command.SET_BOX_COLOR, SetBoxColor.from_data)
+CommandParser.register(Command.SET_MUL_BOX_COLOR, parse_mul_box_color)
+CommandParser.register(Command.GET_BOX_MODE, GetBoxMode.from_data, response=True)
@@ -16,6 +16,8 @@ import abc
 from enum import IntEnum
 from typing import Any
 
+from .helpers import ReadableBuffer
+
 
 class CommandBase(IntEnum):
     pass
@@ -24,10 +26,10 @@ class CommandBase(IntEnum):
 class CommandParserBase(abc.ABC):
     @staticmethod
     @abc.abstractmethod
-    def parse(cmd_type: int, data: bytes) -> Any:
+    def parse(cmd_type: int, data: ReadableBuffer) -> Any:
         pass
 
     @staticmethod
     @abc.abstractmethod
-    def parse_response(cmd_type: int, data: bytes) -> Any:
+    def parse_response(cmd_type: int, data: ReadableBuffer) -> Any:
         pass
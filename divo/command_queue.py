@@ -0,0 +1,151 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import threading
+from collections import OrderedDict
+from itertools import count
+from typing import Any, Hashable, Optional, Tuple, Union
+
+from loguru import logger
+
+from .command import Command
+from .command_base import CommandBase
+from .device_state import DeviceState
+from .pixoo_base import PixooBase
+
+QueuedCommand = Tuple[CommandBase, Optional[Union[bytes, int]], bool, bool]
+
+
+class CommandQueue(PixooBase):
+    """
+    Send commands to a Pixoo from a background thread without blocking the caller.
+
+    Commands for a setting that a single command fully describes (brightness, system colour, box mode) replace
+    a pending command for the same setting, for the box mode only one for the same mode. So only the newest
+    value is sent once the link is free again.
+    It is queued as if it was issued now. All other commands are sent in the order they were queued.
+
+    The command methods of PixooBase queue their command and return None, errors are logged.
+    """
+
+    COALESCED_COMMANDS = DeviceState.TRACKED_COMMANDS
+
+    def __init__(self, pixoo: PixooBase) -> None:
+        self.pixoo = pixoo
+
+        self.pending: "OrderedDict[Hashable, QueuedCommand]" = OrderedDict()
+        self.condition = threading.Condition()
+        self.sequence = count()
+        self.busy = False
+        self.stopping = False
+        self.thread: Optional[threading.Thread] = None
+
+        # serialises access to the Pixoo between the worker and get_box_mode
+        self.device_lock = threading.Lock()
+
+        self.sent = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def __enter__(self) -> "CommandQueue":
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self, drain: bool = True) -> None:
+        """
+        stop the worker thread
+
+        :param drain: send everything that is still queued first, otherwise drop it
+        """
+        with self.condition:
+            if not drain:
+                self.pending.clear()
+            self.stopping = True
+            self.condition.notify_all()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        wait until all queued commands were sent
+
+        :return: False if the timeout expired before
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.busy, timeout)
+
+    def coalesce_key(self, cmd: CommandBase, cmd_data: Optional[Union[bytes, int]] = None) -> Hashable:
+        if cmd.value == Command.SET_BOX_MODE:
+            # score, visualizer, light etc. are different settings, only the same mode is replaced
+            mode = cmd_data[0] if isinstance(cmd_data, bytes) and cmd_data else None
+            return cmd.value, mode
+        if cmd.value in self.COALESCED_COMMANDS:
+            return cmd.value
+
+        # unique key, never replaced
+        return (cmd.value, next(self.sequence))
+
+    def write_command(
+        self,
+        cmd: CommandBase,
+        cmd_data: Optional[Union[bytes, int]] = None,
+        need_response: bool = False,
+        force: bool = False,
+    ) -> None:
+        """
+        queue command, replacing a pending command for the same setting
+        """
+        key = self.coalesce_key(cmd, cmd_data)
+        with self.condition:
+            if self.pending.pop(key, None) is not None:
+                self.coalesced += 1
+            self.pending[key] = (cmd, cmd_data, need_response, force)
+            self.condition.notify_all()
+
+    def get_box_mode(self) -> Any:
+        with self.device_lock:
+            return self.pixoo.get_box_mode()
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.stopping)
+                if not self.pending:
+                    return
+
+                _, (cmd, cmd_data, need_response, force) = self.pending.popitem(last=False)
+                self.busy = True
+
+            try:
+                with self.device_lock:
+                    self.pixoo.write_command(cmd, cmd_data, need_response=need_response, force=force)
+                self.sent += 1
+            except Exception as e:  # pylint: disable=broad-except
+                # a failing command must not stop the worker, join() would wait forever
+                logger.error(f"queued command {cmd.value} failed: {e!r}")
+                self.errors += 1
+            finally:
+                with self.condition:
+                    self.busy = False
+                    self.condition.notify_all()
@@ -0,0 +1,249 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import socket
+import tempfile
+import threading
+from typing import List, Optional
+
+from loguru import logger
+
+from .bluetooth_base import BluetoothBase
+from .command import CommandParser
+from .exceptions import ConnectionException, NotConnectedException, PacketWriteException
+from .helpers import ReadableBuffer
+from .packet import Packet
+from .packet_framer import PacketFramer
+from .pixoo import Pixoo
+
+
+def default_socket_path() -> str:
+    path = os.environ.get("DIVO_SOCKET")
+    if path:
+        return path
+
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "divo.sock")
+    return os.path.join(tempfile.gettempdir(), f"divo-{os.getuid()}.sock")
+
+
+class DivoDaemon:
+    """
+    Keep the connection to a Pixoo open and relay packets from local clients to it.
+
+    Clients connect to a Unix domain socket and speak the Pixoo protocol itself: they send request packets
+    and get the raw response packets back, so a Pixoo on top of a DaemonTransport works like one connected
+    directly. Packets from all clients are validated and sent one at a time.
+    """
+
+    def __init__(self, pixoo: Pixoo, path: Optional[str] = None) -> None:
+        self.pixoo = pixoo
+        self.path = path if path is not None else default_socket_path()
+        self.command_parser = CommandParser()
+
+        self.device_lock = threading.Lock()
+        self.server: Optional[socket.socket] = None
+        self.accept_thread: Optional[threading.Thread] = None
+        # connected clients, accessed by the accept and client threads
+        self.clients: List[socket.socket] = []
+        self.clients_lock = threading.Lock()
+
+        # statistics
+        self.forwarded = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        """listen on the socket and handle clients in background threads"""
+        self._remove_stale_socket()
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # only the user running the daemon may talk to the device, the socket mustn't be accessible to
+        # others even for a moment before chmod
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.path, 0o600)
+        server.listen()
+        self.server = server
+
+        self.accept_thread = threading.Thread(target=self._accept, daemon=True)
+        self.accept_thread.start()
+        logger.info(f"divo daemon listening on {self.path}")
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            assert self.accept_thread is not None
+            self.accept_thread.join()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        if self.server is None:
+            return
+
+        # shutdown wakes up threads blocked in accept or recv, close alone doesn't
+        with self.clients_lock:
+            clients = list(self.clients)
+        for sock in [self.server] + clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.server.close()
+        self.server = None
+
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+        if self.accept_thread is not None and self.accept_thread is not threading.current_thread():
+            self.accept_thread.join()
+            self.accept_thread = None
+
+    def forward(self, packet: bytes) -> Optional[bytes]:
+        """
+        send a packet to the device
+
+        :param packet: complete request packet
+        :return: raw response packet, None if the command has no response or the device didn't answer
+        """
+        if not Packet.is_valid(self.command_parser, packet):
+            self.rejected += 1
+            raise PacketWriteException("tried to send invalid packet")
+
+        with self.device_lock:
+            try:
+                response = self.pixoo.transceive(packet)
+            except socket.timeout as e:
+                # don't wait for this response forever, the client times out by itself
+                self.pixoo.fail_pending(e)
+                return None
+            except OSError as e:
+                logger.error(f"lost connection to device: {e}, reconnecting")
+                self.pixoo.fail_pending(e)
+                self.pixoo.state.invalidate()
+                self.pixoo.comm.close()
+                self.pixoo.comm.connect()
+                self.pixoo.comm.flush()
+                response = self.pixoo.transceive(packet)
+
+        self.forwarded += 1
+        return response
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.path):
+            return
+
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            # nobody is listening anymore
+            os.unlink(self.path)
+            return
+        finally:
+            probe.close()
+
+        raise ConnectionException(f"a divo daemon is already listening on {self.path}")
+
+    def _accept(self) -> None:
+        while self.server is not None:
+            try:
+                client, _ = self.server.accept()
+            except OSError:
+                # closed by stop()
+                return
+
+            with self.clients_lock:
+                self.clients.append(client)
+            threading.Thread(target=self._handle, args=(client,), daemon=True).start()
+
+    def _handle(self, client: socket.socket) -> None:
+        framer = PacketFramer()
+        with client:
+            while True:
+                try:
+                    data = client.recv(4096)
+                except OSError:
+                    break
+                if not data:
+                    break
+
+                try:
+                    for packet in framer.feed(data):
+                        try:
+                            response = self.forward(packet)
+                        except PacketWriteException as e:
+                            logger.warning(f"ignoring packet from client: {e}")
+                            continue
+                        if response is not None:
+                            client.sendall(response)
+                except OSError as e:
+                    logger.error(f"client connection failed: {e}")
+                    break
+
+        with self.clients_lock:
+            self.clients.remove(client)
+
+
+class DaemonTransport(BluetoothBase):
+    """
+    Connection to a DivoDaemon instead of the device, use it like a BluetoothSocket.
+    """
+
+    def __init__(self, path: Optional[str] = None, socket_timeout: Optional[float] = None):
+        self.path = path if path is not None else default_socket_path()
+        self.timeout = socket_timeout
+        self.sock: Optional[socket.socket] = None
+
+    def connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as e:
+            sock.close()
+            raise NotConnectedException(f"no divo daemon listening on {self.path}: {e}")
+
+        sock.settimeout(self.timeout)
+        self.sock = sock
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def get_in_waiting(self) -> int:
+        return 0
+
+    def flush(self) -> None:
+        return
+
+    def write(self, data: ReadableBuffer) -> int:
+        if self.sock is None:
+            raise NotConnectedException("tried to write data")
+
+        self.sock.sendall(data)
+        return len(data)
+
+    def read(self, count: int) -> bytes:
+        if self.sock is None:
+            raise NotConnectedException("tried to read data")
+
+        return self.sock.recv(count)
@@ -0,0 +1,76 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from collections import Counter
+from typing import Dict
+
+from .command import Command, GetBoxMode
+from .helpers import ReadableBuffer
+
+
+class DeviceState:
+    """
+    Shadow copy of the settings the device acknowledged last, used to skip commands that wouldn't change
+    anything.
+
+    Only settings which are fully described by the payload of a single command are tracked. A setting is
+    forgotten as soon as a command touching it is sent and only remembered again once the device acknowledged
+    the last command sent for it, a late acknowledgement mustn't hide a newer command that is still in flight.
+    Commands that aren't tracked may switch the screen away from the current box mode, so they make us forget
+    it. Changes made with the buttons or the app can't be seen, call invalidate() if that matters.
+    """
+
+    TRACKED_COMMANDS = frozenset([Command.SET_SYSTEM_BRIGHTNESS, Command.SET_SYSTEM_COLOR, Command.SET_BOX_MODE])
+
+    def __init__(self) -> None:
+        self.settings: Dict[int, bytes] = {}
+        self.skipped: "Counter[int]" = Counter()
+        # number of commands sent per setting, to tell whether an acknowledged command was the last one
+        self.sent: "Counter[int]" = Counter()
+
+    @property
+    def skipped_total(self) -> int:
+        return sum(self.skipped.values())
+
+    def is_current(self, cmd: int, payload: bytes) -> bool:
+        """
+        :return: True if sending this command wouldn't change the acknowledged state
+        """
+        return cmd in self.TRACKED_COMMANDS and self.settings.get(cmd) == payload
+
+    def skip(self, cmd: int) -> None:
+        self.skipped[cmd] += 1
+
+    def sending(self, cmd: int) -> int:
+        """
+        :return: sequence number of the command, pass it to acknowledged
+        """
+        setting = cmd if cmd in self.TRACKED_COMMANDS else Command.SET_BOX_MODE
+        self.settings.pop(setting, None)
+        self.sent[setting] += 1
+        return self.sent[setting]
+
+    def acknowledged(self, cmd: int, payload: ReadableBuffer, sequence: int) -> None:
+        # a command for the same setting sent later is still in flight or wasn't acknowledged
+        if cmd in self.TRACKED_COMMANDS and self.sent[cmd] == sequence:
+            self.settings[cmd] = bytes(payload)
+
+    def seed(self, box_mode: GetBoxMode) -> None:
+        """
+        take over what a GET_BOX_MODE response tells about tracked settings
+        """
+        self.settings[Command.SET_SYSTEM_BRIGHTNESS] = bytes([box_mode.sys_light])
+
+    def invalidate(self) -> None:
+        self.settings.clear()
@@ -0,0 +1,234 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import socket
+import threading
+import time
+from typing import List, Optional
+
+from loguru import logger
+
+from .animation import AnimationDecoder, AnimationFrame
+from .bluetooth_base import BluetoothBase
+from .command import COMMANDS_WITHOUT_RESPONSE, BoxMode, Command, CommandParser, SetBoxColor
+from .exceptions import NotConnectedException, PacketException
+from .helpers import ReadableBuffer
+from .image import ImageBuffer
+from .packet import Packet, ResponsePacket
+from .packet_framer import PacketFramer
+from .packet_stream import PacketStreamDecoder
+
+# rough figures for a Pixoo connected via RFCOMM
+RFCOMM_LATENCY = 0.03  # seconds until a response starts arriving
+RFCOMM_BANDWIDTH = 20000  # bytes per second
+
+
+class PixooEmulator:
+    """
+    Device side of the protocol: parses incoming packets, keeps the device state and builds responses.
+    """
+
+    def __init__(self) -> None:
+        self.command_parser = CommandParser()
+        self.framer = PacketFramer()
+
+        # same layout as the GET_BOX_MODE response, see GetBoxMode.from_data
+        self.box_mode = bytearray(16)
+        self.framebuffer = ImageBuffer()
+        self.animation: List[AnimationFrame] = []
+        self.animation_decoder = AnimationDecoder()
+        self.received = 0
+        self.errors = 0
+
+    def feed(self, data: ReadableBuffer) -> bytes:
+        """
+        :param data: bytes received from the host
+        :return: responses to all packets completed by data
+        """
+        return b"".join(filter(None, map(self.handle, self.framer.feed(data))))
+
+    def handle(self, packet: bytes) -> Optional[bytes]:
+        """
+        :param packet: complete packet received from the host
+        :return: response packet if the device would send one
+        """
+        try:
+            parsed = Packet.parse(self.command_parser, packet)
+            cmd = Command(packet[3])
+        except (PacketException, ValueError) as e:
+            logger.warning(f"emulator ignoring packet: {e}")
+            self.errors += 1
+            return None
+
+        self.received += 1
+        data = packet[4:-3]
+        if cmd == Command.SET_BOX_COLOR and isinstance(parsed, SetBoxColor):
+            self.framebuffer = PacketStreamDecoder(parsed.palette, parsed.image).image
+        elif cmd == Command.SET_MUL_BOX_COLOR:
+            self._receive_animation(data)
+        elif cmd == Command.SET_SYSTEM_BRIGHTNESS:
+            self.box_mode[8] = data[0]
+        elif cmd == Command.SET_BOX_MODE and data[:1] == bytes([BoxMode.LIGHT]):
+            self.box_mode[0] = BoxMode.LIGHT
+            self.box_mode[3:6] = data[1:4]
+        elif cmd == Command.SET_BOX_MODE and data[:1] == bytes([BoxMode.ENV]):
+            self.box_mode[0] = BoxMode.ENV
+            self.box_mode[9] = data[2]
+            self.box_mode[10:13] = data[7:10]
+
+        if cmd in COMMANDS_WITHOUT_RESPONSE:
+            return None
+        if cmd == Command.GET_BOX_MODE:
+            return ResponsePacket.build(cmd, bytes(self.box_mode))
+        return ResponsePacket.build(cmd)
+
+    def _receive_animation(self, data: bytes) -> None:
+        # the first chunk starts a new animation
+        if data[2:3] == b"\x00":
+            self.animation_decoder = AnimationDecoder()
+            self.animation = []
+
+        try:
+            for frame in self.animation_decoder.feed(data):
+                if not self.animation:
+                    self.framebuffer = PacketStreamDecoder(frame.palette, frame.image).image
+                self.animation.append(frame)
+        except PacketException as e:
+            logger.warning(f"emulator ignoring animation: {e}")
+            self.errors += 1
+
+
+class EmulatorTransport(BluetoothBase):
+    """
+    Bluetooth connection to a PixooEmulator running in a thread, connected by a socket pair.
+
+    The link is simulated as a serial line: every byte takes 1/bandwidth seconds in each direction
+    and responses start after the given latency. Bandwidth 0 means unlimited.
+    """
+
+    def __init__(
+        self,
+        emulator: Optional[PixooEmulator] = None,
+        latency: float = 0.0,
+        bandwidth: float = 0.0,
+        socket_timeout: Optional[float] = 2.0,
+    ) -> None:
+        self.emulator = emulator if emulator is not None else PixooEmulator()
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.timeout = socket_timeout
+
+        self.sock: Optional[socket.socket] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def connect(self) -> None:
+        self.sock, device = socket.socketpair()
+        self.sock.settimeout(self.timeout)
+
+        self.thread = threading.Thread(target=self._serve, args=(device,), daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        if self.sock is None:
+            return
+
+        self.sock.close()
+        self.sock = None
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _transfer_time(self, count: int) -> float:
+        if not self.bandwidth:
+            return 0.0
+        return count / self.bandwidth
+
+    def _serve(self, device: socket.socket) -> None:
+        with device:
+            while True:
+                try:
+                    data = device.recv(4096)
+                except OSError:
+                    return
+                if not data:
+                    return
+
+                time.sleep(self._transfer_time(len(data)))
+                response = self.emulator.feed(data)
+                if not response:
+                    continue
+
+                time.sleep(self.latency + self._transfer_time(len(response)))
+                try:
+                    device.sendall(response)
+                except OSError:
+                    return
+
+    def get_in_waiting(self) -> int:
+        return 0
+
+    def flush(self) -> None:
+        return
+
+    def write(self, data: ReadableBuffer) -> int:
+        if self.sock is None:
+            raise NotConnectedException("tried to write data")
+
+        self.sock.sendall(data)
+        return len(data)
+
+    def read(self, count: int) -> bytes:
+        if self.sock is None:
+            raise NotConnectedException("tried to read data")
+
+        return self.sock.recv(count)
+
+
+class LoopbackTransport(BluetoothBase):
+    """
+    Bluetooth connection to a PixooEmulator in the same thread, without sockets or simulated delays.
+
+    Writes are handled by the emulator right away and its responses are buffered for read. Useful to measure
+    the host side of the protocol on its own.
+    """
+
+    def __init__(self, emulator: Optional[PixooEmulator] = None) -> None:
+        self.emulator = emulator if emulator is not None else PixooEmulator()
+        self.rx = bytearray()
+        self.connected = False
+
+    def connect(self) -> None:
+        self.connected = True
+
+    def get_in_waiting(self) -> int:
+        return len(self.rx)
+
+    def flush(self) -> None:
+        return
+
+    def write(self, data: ReadableBuffer) -> int:
+        if not self.connected:
+            raise NotConnectedException("tried to write data")
+
+        self.rx += self.emulator.feed(data)
+        return len(data)
+
+    def read(self, count: int) -> bytes:
+        if not self.connected:
+            raise NotConnectedException("tried to read data")
+
+        # like a socket timeout without data, Pixoo treats this as no reply
+        data = bytes(self.rx[:count])
+        del self.rx[:count]
+        return data
@@ -3,7 +3,7 @@ This file is part of divo (https://github.com/spezifisch/divo).
 Copyright (c) 2019 johsam (https://github.com/johsam).
 
 Original file: https://github.com/johsam/timebox-evo-rest/blob/80820d010a242a45d26e6ff3f9b2b53546beb66b/evo/encoder.py
-No modifications were made.
+Modifications by spezifisch.
 
 This program is free software: you can redistribute it and/or modify it under
 the terms of the GNU General Public License as published by the Free Software
@@ -18,39 +18,110 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 import binascii
 import math
 import struct
-from collections import OrderedDict
-from typing import List
+from typing import List, Sequence, Tuple
+
+from .helpers import ReadableBuffer, WritableBuffer, byte_sum
+from .packet import BuiltPacket
 
 
 class EvoEncoder:
+    IMAGE_HEADER = binascii.unhexlify("44000A0A04AA2D00000000")
+
     def __init__(self) -> None:
         pass
 
     @staticmethod
-    def encode_colours(colour_array: List[int]) -> str:
-        colour_dict = OrderedDict()  # type: OrderedDict[int,int]
-        colour_order = []
-        for colour in colour_array:
-            if colour not in colour_dict:
-                colour_dict[colour] = len(colour_dict)
-            colour_order.append(colour_dict[colour])
-
-        bits_needed = int(math.ceil(math.log(len(colour_dict), 2)))
+    def index_colours(colour_array: Sequence[int]) -> Tuple[List[int], List[int]]:
+        """
+        build palette in order of first appearance
+
+        :param colour_array: 0xRRGGBB colour per pixel
+        :return: palette and palette index per pixel
+        """
+        palette = list(dict.fromkeys(colour_array))
+        lookup = {colour: i for i, colour in enumerate(palette)}
+        return palette, list(map(lookup.__getitem__, colour_array))
+
+    @staticmethod
+    def rgb_colours(rgb: ReadableBuffer) -> List[int]:
+        """
+        :param rgb: 3 bytes RGB per pixel, e.g. RawPixmap.rgb_buffer()
+        :return: 0xRRGGBB colour per pixel
+        """
+        data = bytes(rgb)
+        return [(r << 16) | (g << 8) | b for r, g, b in zip(data[0::3], data[1::3], data[2::3])]
+
+    @staticmethod
+    def bits_needed(colour_count: int) -> int:
+        bits_needed = int(math.ceil(math.log(colour_count, 2)))
         if bits_needed == 0:
             bits_needed = 1
-        img_data = "{0:02x}".format(len(colour_dict) % 256)
-        for colour in colour_dict:
-            img_data += "{0:06x}".format(colour)
-
-        c_data = ""
-        for i in colour_order:
-            c_data += "{0:08b}".format(i)[-1::-1][:bits_needed]
-        for i in range(-1, len(c_data) - 1, 8):
-            if i == -1:
-                img_data += "{0:02x}".format(int(c_data[i + 8 :: -1], 2))
-                continue
-            img_data += "{0:02x}".format(int(c_data[i + 8 : i : -1], 2))
-        return img_data
+        return bits_needed
+
+    @staticmethod
+    def encoded_size(colour_count: int, pixel_count: int) -> int:
+        """size of palette length, palette and packed pixels as written by encode_indexed_into"""
+        bits = pixel_count * EvoEncoder.bits_needed(colour_count)
+        return 1 + 3 * colour_count + (bits + 7) // 8
+
+    @staticmethod
+    def encode_indexed_into(buf: WritableBuffer, offset: int, palette: Sequence[int], indices: Sequence[int]) -> int:
+        """
+        write palette length, palette and LSB-first packed indices into buf
+
+        :param buf: preallocated buffer with at least encoded_size() bytes left after offset
+        :param offset: position in buf to start writing at
+        :param palette: 0xRRGGBB colours
+        :param indices: palette index per pixel
+        :return: offset after the written data
+        """
+        if len(palette) > 256:
+            raise ValueError("too many colours")
+
+        buf[offset] = len(palette) % 256
+        offset += 1
+        buf[offset : offset + 3 * len(palette)] = b"".join([colour.to_bytes(3, "big") for colour in palette])
+        offset += 3 * len(palette)
+
+        bits_needed = EvoEncoder.bits_needed(len(palette))
+        if 8 % bits_needed == 0:
+            # OR the indices sharing a byte together column by column
+            per_byte = 8 // bits_needed
+            padded = list(indices) + [0] * (-len(indices) % per_byte)
+            packed = padded[0::per_byte]
+            for k in range(1, per_byte):
+                shift = k * bits_needed
+                packed = [a | (b << shift) for a, b in zip(packed, padded[k::per_byte])]
+            buf[offset : offset + len(packed)] = bytes(packed)
+            return offset + len(packed)
+
+        # odd bit depths span byte boundaries, so shift through an accumulator
+        acc = 0
+        acc_bits = 0
+        for i in indices:
+            acc |= i << acc_bits
+            acc_bits += bits_needed
+            if acc_bits >= 8:
+                buf[offset] = acc & 0xFF
+                offset += 1
+                acc >>= 8
+                acc_bits -= 8
+        if acc_bits:
+            buf[offset] = acc
+            offset += 1
+
+        return offset
+
+    @staticmethod
+    def encode_colour_bytes(colour_array: Sequence[int]) -> bytes:
+        palette, indices = EvoEncoder.index_colours(colour_array)
+        buf = bytearray(EvoEncoder.encoded_size(len(palette), len(indices)))
+        EvoEncoder.encode_indexed_into(buf, 0, palette, indices)
+        return bytes(buf)
+
+    @staticmethod
+    def encode_colours(colour_array: List[int]) -> str:
+        return EvoEncoder.encode_colour_bytes(colour_array).hex()
 
     @staticmethod
     def crc(pl: bytes) -> bytes:
@@ -64,11 +135,31 @@ class EvoEncoder:
         return struct.pack("<H", 2 + len(pl))
 
     @staticmethod
-    def image_bytes(colour_array: List[int]) -> bytes:
-        hex_data = "44000A0A04AA2D00000000" + EvoEncoder.encode_colours(colour_array)
-        payload = binascii.unhexlify(hex_data)
-        payload = EvoEncoder.length(payload) + payload
-        return b"\x01" + payload + EvoEncoder.crc(payload) + b"\x02"
+    def image_bytes(colour_array: Sequence[int]) -> BuiltPacket:
+        palette, indices = EvoEncoder.index_colours(colour_array)
+        header = EvoEncoder.IMAGE_HEADER
+        payload_len = len(header) + EvoEncoder.encoded_size(len(palette), len(indices))
+
+        # start marker, length, payload, checksum, end marker
+        buf = bytearray(1 + 2 + payload_len + 2 + 1)
+        buf[0] = 1
+        struct.pack_into("<H", buf, 1, 2 + payload_len)
+        buf[3 : 3 + len(header)] = header
+        end = EvoEncoder.encode_indexed_into(buf, 3 + len(header), palette, indices)
+
+        csum = byte_sum(memoryview(buf)[1:end])
+        buf[end] = csum & 0xFF
+        buf[end + 1] = (csum >> 8) & 0xFF
+        buf[end + 2] = 2
+        return BuiltPacket(buf)
+
+    @staticmethod
+    def image_bytes_rgb(rgb: ReadableBuffer) -> BuiltPacket:
+        """
+        :param rgb: 3 bytes RGB per pixel, e.g. RawPixmap.rgb_buffer()
+        :return: SET_BOX_COLOR packet
+        """
+        return EvoEncoder.image_bytes(EvoEncoder.rgb_colours(rgb))
 
     @staticmethod
     def encode_hex(hex_data: bytes) -> bytes:
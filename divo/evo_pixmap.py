@@ -17,10 +17,15 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import itertools
 import logging
-from typing import List, Tuple
+import sys
+from typing import List, Optional, Tuple
 
-from PIL import Image, ImageEnhance
+from PIL import Image, ImageChops, ImageEnhance
+
+from .helpers import ReadableBuffer
+from .image import TerminalRenderer
 
 RGBColor = Tuple[int, int, int]
 RGBAColor = Tuple[int, int, int, int]
@@ -41,18 +46,127 @@ class RawPixmap:
 
         self._width = width
         self._height = height
-        self._pixels: List[RGBColor] = [(0, 0, 0)] * width * height
+        # 3 bytes RGB per pixel, row by row
+        self._buf = bytearray(3 * width * height)
         self.clear()
 
-    def clear(self) -> None:
-        for i, _ in enumerate(self._pixels):
-            self._pixels[i] = self.BLACK
+    @property
+    def width(self) -> int:
+        return self._width
+
+    @property
+    def height(self) -> int:
+        return self._height
+
+    @staticmethod
+    def color_bytes(color: RGBColor) -> bytes:
+        """
+        :raises ValueError: if color isn't RGB, e.g. RGBA, writing it would shift all following pixels
+        """
+        if len(color) != 3:
+            raise ValueError(f"expected an RGB color, got {color!r}")
+        return bytes(color)
+
+    def clear(self, color: RGBColor = BLACK) -> None:
+        self._buf[:] = self.color_bytes(color) * (self._width * self._height)
 
     def setPixel(self, x: int, y: int, color: RGBColor) -> None:
-        self._pixels[(x % self._width) + (y % self._height) * self._width] = color
+        i = 3 * ((x % self._width) + (y % self._height) * self._width)
+        self._buf[i : i + 3] = self.color_bytes(color)
 
     def getPixel(self, x: int, y: int) -> RGBColor:
-        return self._pixels[(x % self._width) + (y % self._height) * self._width]
+        i = 3 * ((x % self._width) + (y % self._height) * self._width)
+        return self._buf[i], self._buf[i + 1], self._buf[i + 2]
+
+    def fill_rect(self, x: int, y: int, width: int, height: int, color: RGBColor) -> None:
+        """fill a rectangle, clipped to the pixmap (no wrap around like setPixel)"""
+        x0, x1 = max(x, 0), min(x + width, self._width)
+        y0, y1 = max(y, 0), min(y + height, self._height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        stride = 3 * self._width
+        if x0 == 0 and x1 == self._width:
+            # full rows are contiguous
+            self._buf[y0 * stride : y1 * stride] = self.color_bytes(color) * (self._width * (y1 - y0))
+            return
+
+        if 3 * (x1 - x0) < y1 - y0:
+            # narrow and tall, fewer slice assignments column by column
+            for column in range(x0, x1):
+                self.vline(column, y0, y1 - y0, color)
+            return
+
+        row = self.color_bytes(color) * (x1 - x0)
+        for start in range(y0 * stride + 3 * x0, y1 * stride, stride):
+            self._buf[start : start + len(row)] = row
+
+    def hline(self, x: int, y: int, length: int, color: RGBColor) -> None:
+        self.fill_rect(x, y, length, 1, color)
+
+    def vline(self, x: int, y: int, length: int, color: RGBColor) -> None:
+        y0, y1 = max(y, 0), min(y + length, self._height)
+        if not 0 <= x < self._width or y0 >= y1:
+            return
+
+        stride = 3 * self._width
+        start = y0 * stride + 3 * x
+        end = y1 * stride
+        buf = self._buf
+        buf[start:end:stride] = bytes((color[0],)) * (y1 - y0)
+        buf[start + 1 : end : stride] = bytes((color[1],)) * (y1 - y0)
+        buf[start + 2 : end : stride] = bytes((color[2],)) * (y1 - y0)
+
+    def blit(self, source: "RawPixmap", x: int = 0, y: int = 0) -> None:
+        """copy source to position x, y, clipped to this pixmap"""
+        x0, x1 = max(x, 0), min(x + source.width, self._width)
+        y0, y1 = max(y, 0), min(y + source.height, self._height)
+        if x0 >= x1 or y0 >= y1:
+            return
+
+        src = source.rgb_buffer()
+        src_stride = 3 * source.width
+        stride = 3 * self._width
+        row_len = 3 * (x1 - x0)
+        for row in range(y0, y1):
+            src_start = (row - y) * src_stride + 3 * (x0 - x)
+            start = row * stride + 3 * x0
+            self._buf[start : start + row_len] = src[src_start : src_start + row_len]
+
+    def scroll(self, dx: int, dy: int, color: RGBColor = BLACK, wrap: bool = False) -> None:
+        """
+        move the content by dx, dy pixels
+
+        :param color: fill for the uncovered area
+        :param wrap: move pixels leaving one side in at the other side instead
+        """
+        if wrap:
+            stride = 3 * self._width
+            shift = (dy % self._height) * stride
+            if shift:
+                self._buf[:] = self._buf[-shift:] + self._buf[:-shift]
+            shift = 3 * (dx % self._width)
+            if shift:
+                for start in range(0, len(self._buf), stride):
+                    row = self._buf[start : start + stride]
+                    self._buf[start : start + stride] = row[-shift:] + row[:-shift]
+            return
+
+        if abs(dx) >= self._width or abs(dy) >= self._height:
+            self.clear(color)
+            return
+
+        # move the whole buffer at once, pixels crossing a row boundary end up in the uncovered columns
+        shift = 3 * (dy * self._width + dx)
+        if shift > 0:
+            self._buf[shift:] = self._buf[:-shift]
+        elif shift < 0:
+            self._buf[:shift] = self._buf[-shift:]
+
+        if dy:
+            self.fill_rect(0, 0 if dy > 0 else self._height + dy, self._width, abs(dy), color)
+        if dx:
+            self.fill_rect(0 if dx > 0 else self._width + dx, 0, abs(dx), self._height, color)
 
     def line(self, x: int, y: int, x2: int, y2: int, color: RGBColor) -> None:
         """Brensenham line algorithm"""
@@ -92,13 +206,44 @@ class RawPixmap:
         self.setPixel(x2, y2, color)
 
     def set_rgb_pixels(self, data: List[RGBColor]) -> None:
-        self._pixels = list(data)
+        self.set_rgb_buffer(bytes(itertools.chain.from_iterable(data)))
 
     def get_rgb_pixels(self) -> List[RGBColor]:
-        return self._pixels
+        buf = self._buf
+        return list(zip(buf[0::3], buf[1::3], buf[2::3]))
+
+    def set_rgb_buffer(self, data: ReadableBuffer) -> None:
+        """:param data: 3 bytes RGB per pixel, row by row"""
+        if len(data) != len(self._buf):
+            raise ValueError(f"expected {len(self._buf)} bytes of RGB data, got {len(data)}")
+        self._buf[:] = data
+
+    def rgb_buffer(self) -> memoryview:
+        """
+        view on the pixels without copying them, 3 bytes RGB per pixel, row by row
+
+        This can be passed to EvoEncoder.image_bytes_rgb. It's read-only except on Python 3.7, which lacks
+        memoryview.toreadonly.
+        """
+        view = memoryview(self._buf)
+        if sys.version_info >= (3, 8):
+            return view.toreadonly()
+        return view
+
+    def crop_rgb(self, x: int, y: int, width: int, height: int) -> bytes:
+        """RGB data of the given area like rgb_buffer, it has to be inside the pixmap"""
+        if x < 0 or y < 0 or x + width > self._width or y + height > self._height:
+            raise ValueError("area outside of pixmap")
+
+        stride = 3 * self._width
+        row_len = 3 * width
+        start = y * stride + 3 * x
+        buf = self._buf
+        return b"".join(buf[i : i + row_len] for i in range(start, start + height * stride, stride))
 
     def get_pixel_data(self) -> List[int]:
-        return [(t[0] << 16) + (t[1] << 8) + t[2] for t in self._pixels]
+        buf = self._buf
+        return [(r << 16) | (g << 8) | b for r, g, b in zip(buf[0::3], buf[1::3], buf[2::3])]
 
     def load_image(self, path: str) -> Image:
         try:
@@ -117,10 +262,37 @@ class RawPixmap:
     def blend_rgba(cls, under: RGBAColor, over: RGBAColor) -> Tuple[int, ...]:
         return tuple([cls.blend_value(under[i], over[i], over[3]) for i in (0, 1, 2)] + [255])
 
-    def decode_image(self, image: Image, dim: bool = False) -> List[RGBColor]:
+    @classmethod
+    def flatten_alpha(cls, source: Image.Image) -> Image.Image:
+        """
+        Blend an RGBA image onto black, like blend_rgba does for single pixels.
+
+        ImageChops.multiply rounds down like blend_value, so the result is the same.
+        """
+        alpha = source.getchannel("A")
+        return ImageChops.multiply(source.convert("RGB"), Image.merge("RGB", (alpha, alpha, alpha)))
+
+    def decode_image(self, image: Image.Image, dim: bool = False, draft: bool = False) -> List[RGBColor]:
+        """
+        :param image: image of any size, it's scaled down to fit
+        :param dim: halve the brightness
+        :param draft: let the JPEG decoder scale down large images, faster but the pixels differ slightly
+        :return: pixels of the pixmap size
+        """
+        return list(self._decode_image(image, dim, draft).getdata())
+
+    def set_image(self, image: Image.Image, dim: bool = False, draft: bool = False) -> None:
+        """same as set_rgb_pixels(decode_image(...)) without building a list of pixels"""
+        self.set_rgb_buffer(self._decode_image(image, dim, draft).tobytes())
+
+    def _decode_image(self, image: Image.Image, dim: bool, draft: bool) -> Image.Image:
         w = self._width
         h = self._height
 
+        if draft:
+            # keep twice the target size for resampling, like thumbnail's reducing_gap
+            image.draft(None, (2 * w, 2 * h))
+
         image_mode = image.mode
         target = Image.new("RGBA", (w, h), color="black")
 
@@ -130,40 +302,31 @@ class RawPixmap:
             source = enhancer.enhance(0.5)
 
         if source.size[0] != w or source.size[1] != h:
+            # this also uses Image.reduce before resampling large images
             source.thumbnail((w, h), Image.BICUBIC)
 
         if image_mode == "RGBA":
             # Alpha to black
-            for y in range(source.size[1]):
-                for x in range(source.size[0]):
-                    source.putpixel((x, y), self.blend_rgba((0, 0, 0, 255), source.getpixel((x, y))))
+            source = self.flatten_alpha(source)
 
         offset = ((w - source.size[0]) // 2, (h - source.size[1]) // 2)
         target.paste(source, offset)
 
-        target = target.convert("RGB")
-
-        return list(target.getdata())
+        return target.convert("RGB")
 
-    def view(self) -> None:
-        def rgb_fg(r: int, g: int, b: int) -> str:
-            return "\x1b[38;2;" + str(r) + ";" + str(g) + ";" + str(b) + "m"
+    def view(self, renderer: Optional[TerminalRenderer] = None) -> None:
+        """
+        draw the pixmap in the terminal, black pixels in dark gray to keep the grid visible
 
-        print("\x1b[0;0H", end="")
+        :param renderer: draws only the pixels that changed since its last frame, by default a new one draws
+                         the whole pixmap in the top left corner
+        """
+        if renderer is None:
+            renderer = TerminalRenderer()
+            renderer.out.write("\x1b[0;0H")
 
-        for y in range(self._height):
-            res = []
-            for x in range(self._width):
-                (r, g, b) = self.getPixel(x, y)
-                if r == 0 and g == 0 and b == 0:
-                    res.append(rgb_fg(20, 20, 20) + u"\u25A0")
-                else:
-                    res.append(rgb_fg(r, g, b) + u"\u25A0")
-            print("".join(res))
+        dark = (20, 20, 20)
+        renderer.draw([dark if p == self.BLACK else p for p in self.get_rgb_pixels()], self._width)
 
     def pixel_list(self) -> List[RGBColor]:
-        result = []
-        for y in range(self._height):
-            for x in range(self._width):
-                result.append(self.getPixel(x, y))
-        return result
+        return self.get_rgb_pixels()
@@ -54,3 +54,8 @@ class BluetoothSupportMissingException(ConnectionException):
 
 class NotConnectedException(ConnectionException):
     pass
+
+
+# AssetPackExceptions
+class AssetPackException(DivoException):
+    pass
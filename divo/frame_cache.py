@@ -0,0 +1,192 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from loguru import logger
+
+from .command import CommandParser
+from .helpers import ReadableBuffer
+from .packet import Packet
+
+
+class FrameCache:
+    """
+    LRU cache of finished packets, e.g. SET_BOX_COLOR images, keyed by a hash of their source.
+
+    The memory tier is bounded by entry count and total bytes. With a cache_dir, packets are also stored on
+    disk so separate processes (e.g. CLI invocations) can reuse them.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 1 << 20, cache_dir: Optional[str] = None):
+        """
+        :param max_entries: maximum number of packets kept in memory
+        :param max_bytes: maximum total size of packets kept in memory
+        :param cache_dir: directory for the disk tier, None to keep packets in memory only
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.command_parser = CommandParser()
+
+        # statistics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def default_cache_dir() -> str:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(base, "divo", "frames")
+
+    @staticmethod
+    def file_key(path: str, variant: str = "") -> str:
+        """
+        key for a packet built from an image file, changes when the file is modified
+
+        :param path: source file
+        :param variant: anything else the packet depends on, e.g. the display size
+        :raises OSError: if the file doesn't exist
+        """
+        st = os.stat(path)
+        source = f"file\0{os.path.abspath(path)}\0{st.st_mtime_ns}\0{st.st_size}\0{variant}"
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    @staticmethod
+    def buffer_key(data: ReadableBuffer, variant: str = "") -> str:
+        """
+        key for a packet built from raw data, e.g. RawPixmap.rgb_buffer()
+
+        :param data: source data
+        :param variant: anything else the packet depends on
+        """
+        h = hashlib.sha256(b"buffer\0")
+        h.update(data)
+        h.update(b"\0" + variant.encode())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self.lock:
+            packet = self.entries.get(key)
+            if packet is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return packet
+
+        packet = self._load(key)
+        if packet is None:
+            self.misses += 1
+            return None
+
+        self.disk_hits += 1
+        self._remember(key, packet)
+        return packet
+
+    def put(self, key: str, packet: bytes) -> None:
+        self._remember(key, packet)
+        self._store(key, packet)
+
+    def get_or_build(self, key: str, build: Callable[[], bytes]) -> bytes:
+        """
+        :param key: from file_key or buffer_key
+        :param build: called to build the packet if it isn't cached
+        """
+        packet = self.get(key)
+        if packet is None:
+            packet = build()
+            self.put(key, packet)
+        return packet
+
+    def clear(self) -> None:
+        """empty the memory tier, the disk tier is kept"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def _remember(self, key: str, packet: bytes) -> None:
+        if len(packet) > self.max_bytes or self.max_entries <= 0:
+            return
+
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+
+            self.entries[key] = packet
+            self.size += len(packet)
+
+            while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.evictions += 1
+
+    def _path(self, key: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def _load(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        if path is None:
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                packet = f.read()
+        except OSError:
+            return None
+
+        if not Packet.is_valid(self.command_parser, packet):
+            logger.warning(f"removing broken frame cache entry {path}")
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+
+        return packet
+
+    def _store(self, key: str, packet: bytes) -> None:
+        path = self._path(key)
+        if path is None:
+            return
+
+        # write to a temporary file first so concurrent readers never see partial entries
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        except OSError as e:
+            logger.warning(f"couldn't write frame cache entry {path}: {e}")
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(packet)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"couldn't write frame cache entry {path}: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,131 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+from typing import Callable, Iterable, List, NamedTuple, Optional, Union
+
+from loguru import logger
+
+from .evo_encoder import EvoEncoder
+from .evo_pixmap import RawPixmap
+from .helpers import percentile
+from .pixoo import Pixoo
+
+# a pixmap is encoded before it's sent, anything else has to be a complete packet
+Frame = Union[RawPixmap, bytes]
+
+
+class FrameStats(NamedTuple):
+    sent: int
+    dropped: int
+    elapsed: float
+    fps: float
+    # send latency in milliseconds, until the device acknowledged the frame
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+
+
+class FrameScheduler:
+    """
+    Send frames to a Pixoo at a fixed rate or with per-frame durations.
+
+    Deadlines are computed from the start time with a monotonic clock, so sleeping or sending late doesn't
+    shift the frames after it. When sending falls behind, frames whose display time already ended are
+    dropped instead of being sent late.
+    """
+
+    def __init__(
+        self,
+        pixoo: Pixoo,
+        fps: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+
+        self.pixoo = pixoo
+        self.fps = fps
+        self.clock = clock
+        self.sleep = sleep
+
+        self.sent = 0
+        self.dropped = 0
+        self.elapsed = 0.0
+        self.latencies: List[float] = []
+
+    @staticmethod
+    def encode(frame: Frame) -> bytes:
+        if isinstance(frame, RawPixmap):
+            return EvoEncoder.image_bytes_rgb(frame.rgb_buffer())
+        return frame
+
+    def run(self, frames: Iterable[Frame], durations: Optional[Iterable[float]] = None) -> FrameStats:
+        """
+        send frames until the source is exhausted
+
+        :param frames: pixmaps or packets, pulled from the iterator only when they are due
+        :param durations: seconds to show each frame, default 1 / fps
+        :return: statistics of this run
+        """
+        frame_time = 1 / self.fps
+        duration_iter = iter(durations) if durations is not None else None
+
+        start = self.clock()
+        deadline = start
+        for frame in frames:
+            duration = next(duration_iter, frame_time) if duration_iter is not None else frame_time
+            next_deadline = deadline + duration
+
+            now = self.clock()
+            if now >= next_deadline:
+                # this frame should be gone already
+                self.dropped += 1
+                deadline = next_deadline
+                continue
+            if now < deadline:
+                self.sleep(deadline - now)
+
+            packet = self.encode(frame)
+            sent_at = self.clock()
+            self.pixoo.transceive(packet)
+            self.latencies.append(self.clock() - sent_at)
+            self.sent += 1
+
+            deadline = next_deadline
+
+        # wait until the last frame was shown for its duration
+        now = self.clock()
+        if now < deadline:
+            self.sleep(deadline - now)
+        self.elapsed += self.clock() - start
+
+        stats = self.stats()
+        logger.debug(
+            f"sent {stats.sent} frames at {stats.fps:.1f} frames/s, dropped {stats.dropped}, "
+            f"latency p50 {stats.p50_ms:.1f} ms p99 {stats.p99_ms:.1f} ms"
+        )
+        return stats
+
+    def stats(self) -> FrameStats:
+        """statistics of all runs so far"""
+        samples = sorted(self.latencies)
+        if samples:
+            p50, p90, p99 = (1000 * percentile(samples, f) for f in (0.5, 0.9, 0.99))
+        else:
+            p50 = p90 = p99 = 0.0
+
+        fps = self.sent / self.elapsed if self.elapsed > 0 else 0.0
+        return FrameStats(self.sent, self.dropped, self.elapsed, fps, p50, p90, p99)
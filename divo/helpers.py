@@ -12,8 +12,13 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import zlib
 from binascii import unhexlify
-from typing import List
+from typing import List, Union
+
+# bytes-like objects accepted in place of bytes
+ReadableBuffer = Union[bytes, bytearray, memoryview]
+WritableBuffer = Union[bytearray, memoryview]
 
 
 def clean_unhexlify(val: str) -> bytes:
@@ -23,3 +28,23 @@ def clean_unhexlify(val: str) -> bytes:
 
 def chunks(s: str, n: int) -> List[str]:
     return [s[i : i + n] for i in range(0, len(s), n)]
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    """nearest rank percentile"""
+    index = min(int(fraction * len(sorted_samples)), len(sorted_samples) - 1)
+    return sorted_samples[index]
+
+
+def byte_sum(data: ReadableBuffer) -> int:
+    """
+    sum of all bytes in data, like sum(data) but without iterating in Python for longer data
+
+    The low half of an Adler-32 checksum is 1 + the byte sum modulo 65521, that's the exact sum for up to
+    256 bytes.
+    """
+    if len(data) <= 128:
+        return sum(data)
+
+    view = memoryview(data)
+    return sum((zlib.adler32(view[i : i + 256]) & 0xFFFF) - 1 for i in range(0, len(view), 256))
@@ -12,11 +12,15 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import sys
+import time
 from math import ceil, log
-from typing import List, Optional
+from typing import Any, List, Optional, Sequence, TextIO, Tuple
 
 from colorconsole import terminal
 
+RGBColor = Tuple[int, int, int]
+
 
 class Color:
     def __init__(self, r: int, g: int, b: int):
@@ -64,18 +68,26 @@ class ImageBuffer:
     def set(self, x: int, y: int, color: Color) -> None:
         self.buf[y][x] = color
 
-    def print_to(self, screen: "Screen") -> None:
-        for row in self.buf:
-            for pixel in row:
-                screen.print_color(pixel)
+    def rgb_pixels(self) -> List[RGBColor]:
+        return [(c.r, c.g, c.b) for row in self.buf for c in row]
 
-            screen.line_end()
+    def print_to(self, screen: "Screen") -> None:
+        screen.print_image(self)
 
 
 class Screen:
-    def __init__(self, block: str = "██") -> None:
-        self.screen = terminal.get_terminal(conEmu=False)
+    def __init__(self, block: str = "██", out: TextIO = sys.stdout) -> None:
+        self._terminal: Any = None
         self.block = block
+        # images and palettes are drawn with a single write each, its statistics cover all of them
+        self.renderer = TerminalRenderer(out)
+
+    @property
+    def screen(self) -> Any:
+        # set up the terminal only when drawing, this fails if stdout isn't a terminal
+        if self._terminal is None:
+            self._terminal = terminal.get_terminal(conEmu=False)
+        return self._terminal
 
     def print_color(self, color: Color) -> None:
         self.screen.xterm24bit_set_fg_color(color.r, color.g, color.b)
@@ -86,10 +98,149 @@ class Screen:
     def line_end() -> None:
         print()
 
+    def print_image(self, image: ImageBuffer) -> None:
+        """draw the image below the cursor"""
+        self.renderer.reset()
+        self.renderer.draw_image(image)
+
     def print_palette(self, palette: List[Color]) -> None:
-        print(f"Palette ({len(palette)}):")
+        out = [f"Palette ({len(palette)}):\n"]
         for i, color in enumerate(palette):
-            print(i, end=" ")
-            self.print_color(color)
-            print("", color)
-        print("\n")
+            swatch = TerminalRenderer.foreground((color.r, color.g, color.b)) + self.block + TerminalRenderer.RESET
+            out.append(f"{i} {swatch} {color}\n")
+        out.append("\n\n")
+
+        self.renderer.out.write("".join(out))
+        self.renderer.out.flush()
+
+
+class TerminalRenderer:
+    """
+    Draw frames with 24 bit colour escape sequences, one write per frame.
+
+    Every character cell shows two pixel rows with an upper half block, the upper pixel as foreground and the
+    lower one as background colour. After the first frame only the cells that changed are redrawn.
+    """
+
+    HALF_BLOCK = "\u2580"
+    RESET = "\x1b[0m"
+
+    def __init__(self, out: TextIO = sys.stdout) -> None:
+        self.out = out
+        self.cells: List[Tuple[RGBColor, RGBColor]] = []
+        self.width = 0
+        self.lines = 0
+
+        # statistics
+        self.frames = 0
+        self.bytes_written = 0
+        self.render_time = 0.0
+
+    @property
+    def fps(self) -> float:
+        """frames per second the renderer could draw, not counting time between frames"""
+        return self.frames / self.render_time if self.render_time else 0.0
+
+    def reset(self) -> None:
+        """draw the next frame completely, below the current cursor position"""
+        self.cells = []
+
+    def draw(self, pixels: Sequence[RGBColor], width: int) -> None:
+        """
+        :param pixels: RGB colour per pixel, row by row
+        :param width: pixels per row
+        """
+        start = time.perf_counter()
+
+        frame = self.render(pixels, width)
+        if frame:
+            self.out.write(frame)
+            self.out.flush()
+
+        self.frames += 1
+        self.bytes_written += len(frame)
+        self.render_time += time.perf_counter() - start
+
+    def draw_image(self, image: ImageBuffer) -> None:
+        self.draw(image.rgb_pixels(), image.width)
+
+    def render(self, pixels: Sequence[RGBColor], width: int) -> str:
+        """
+        :return: escape sequences to update the terminal from the previous to this frame
+        """
+        # pad odd heights with a black row
+        height = (len(pixels) + width - 1) // width
+        rows = [pixels[y * width : (y + 1) * width] for y in range(height)]
+        if height % 2:
+            rows.append([(0, 0, 0)] * width)
+
+        cells: List[Tuple[RGBColor, RGBColor]] = []
+        for upper, lower in zip(rows[0::2], rows[1::2]):
+            cells.extend(zip(upper, lower))
+
+        if self.cells and width == self.width and len(cells) == len(self.cells):
+            frame = self._render_changes(cells)
+        else:
+            frame = self._render_full(cells, width)
+
+        self.cells = cells
+        self.width = width
+        self.lines = len(cells) // width
+        return frame
+
+    def _render_full(self, cells: List[Tuple[RGBColor, RGBColor]], width: int) -> str:
+        out = []
+        last = None
+        for i, cell in enumerate(cells):
+            if cell != last:
+                out.append(self._colour(cell))
+                last = cell
+            out.append(self.HALF_BLOCK)
+
+            if i % width == width - 1:
+                # colours must not bleed into the rest of the line
+                out.append(self.RESET + "\n")
+                last = None
+
+        return "".join(out)
+
+    def _render_changes(self, cells: List[Tuple[RGBColor, RGBColor]]) -> str:
+        out: List[str] = []
+        last = None
+        line = column = 0
+        for i, (old, new) in enumerate(zip(self.cells, cells)):
+            if old == new:
+                continue
+
+            if not out:
+                # move to the first column of the first line of the image
+                out.append(f"\x1b[{self.lines}F")
+
+            cell_line, cell_column = divmod(i, self.width)
+            if cell_line != line:
+                out.append(f"\x1b[{cell_line - line}E")
+                line, column = cell_line, 0
+            if cell_column != column:
+                out.append(f"\x1b[{cell_column + 1}G")
+            if new != last:
+                out.append(self._colour(new))
+                last = new
+
+            out.append(self.HALF_BLOCK)
+            column = cell_column + 1
+
+        if out:
+            # back to the line below the image
+            out.append(self.RESET + f"\x1b[{self.lines - line}E")
+
+        return "".join(out)
+
+    @staticmethod
+    def foreground(colour: RGBColor) -> str:
+        r, g, b = colour
+        return f"\x1b[38;2;{r};{g};{b}m"
+
+    @staticmethod
+    def _colour(cell: Tuple[RGBColor, RGBColor]) -> str:
+        (fr, fg, fb), (br, bg, bb) = cell
+        return f"\x1b[38;2;{fr};{fg};{fb};48;2;{br};{bg};{bb}m"
@@ -13,26 +13,37 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+import json
 import sys
+import time
 from binascii import hexlify
-from typing import List
+from typing import Any, Callable, List, Optional
 
 import click
 from loguru import logger
 
+from . import bench as divo_bench
+from .animation import AnimationDecoder, AnimationEncoder
+from .asset_pack import AssetPack, encode_directory
 from .bluetooth_socket import BluetoothSocket
-from .command import CommandParser
+from .command import Command, CommandParser
+from .daemon import DaemonTransport, DivoDaemon
 from .evo_encoder import EvoEncoder
 from .evo_pixmap import RawPixmap
-from .helpers import clean_unhexlify
-from .image import Screen
+from .frame_cache import FrameCache
+from .helpers import ReadableBuffer, clean_unhexlify
+from .image import Screen, TerminalRenderer
 from .packet import Packet
 from .packet_stream import PacketStreamDecoder
 from .pixoo import Pixoo
+from .stream import FORMATS, FrameStream, play_stream
 from .test import test_pattern
 
 
-def get_pixoo(mac_address: str) -> Pixoo:
+def get_pixoo(mac_address: str, via_daemon: bool = False) -> Pixoo:
+    if via_daemon:
+        return Pixoo(DaemonTransport(socket_timeout=2.0))
+
     if not mac_address:
         raise ValueError("no mac address given")
 
@@ -41,6 +52,63 @@ def get_pixoo(mac_address: str) -> Pixoo:
     return d
 
 
+def show_image(screen: Screen, palette: bytes, payload: bytes) -> None:
+    psd = PacketStreamDecoder(palette, payload)
+
+    print("palette data:", hexlify(palette))
+    print("palette:")
+    psd.palette.print_to(screen)
+
+    print("image data:", hexlify(payload))
+    print("image:")
+    psd.image.print_to(screen)
+
+
+def show_animation(screen: Screen, packets: List[bytes]) -> None:
+    decoder = AnimationDecoder()
+    for p in packets:
+        # strip packet header and checksum, the chunks are reassembled by the decoder
+        for frame in decoder.feed(p[4:-3]):
+            print(f"frame duration: {frame.duration} ms")
+            show_image(screen, frame.palette, frame.image)
+
+    if not decoder.complete:
+        logger.warning("animation data is incomplete")
+
+
+def play_animation(screen: Screen, packets: List[bytes], loops: int) -> None:
+    decoder = AnimationDecoder()
+    frames = []
+    for p in packets:
+        for frame in decoder.feed(p[4:-3]):
+            frames.append((PacketStreamDecoder(frame.palette, frame.image).image, frame.duration))
+
+    renderer = screen.renderer
+    renderer.reset()
+    played = renderer.frames
+    start = time.perf_counter()
+    deadline = start
+    for _ in range(loops):
+        for image, duration in frames:
+            renderer.draw_image(image)
+
+            deadline += duration / 1000
+            time.sleep(max(deadline - time.perf_counter(), 0))
+
+    elapsed = time.perf_counter() - start
+    played = renderer.frames - played
+    if played:
+        logger.debug(f"played {played} frames at {played / elapsed:.1f} frames/s")
+
+
+def log_renderer_stats(renderer: TerminalRenderer) -> None:
+    if renderer.frames:
+        logger.debug(
+            f"drew {renderer.frames} frames in the terminal, renderer {renderer.fps:.0f} frames/s, "
+            f"{renderer.bytes_written // renderer.frames} bytes/frame"
+        )
+
+
 @click.group()
 @click.option("--debug/--no-debug", default=False)
 @click.pass_context
@@ -54,7 +122,9 @@ def cli(ctx: click.Context, debug: bool) -> None:
         logger.add(sys.stderr, level="INFO")
 
     # image may be rendered to different outputs later
-    ctx.obj["screen"] = Screen()
+    screen = Screen()
+    ctx.obj["screen"] = screen
+    ctx.call_on_close(lambda: log_renderer_stats(screen.renderer))
 
 
 @cli.command()
@@ -74,8 +144,9 @@ def direct(ctx: click.Context, palette: str, payload: str) -> None:
 @click.argument("raw_data", nargs=-1)
 @click.option("--send", is_flag=True)
 @click.option("--mac-address")
+@click.option("--via-daemon", is_flag=True, help="send through a running divo daemon")
 @click.pass_context
-def raw(ctx: click.Context, raw_data: List[str], send: bool, mac_address: str) -> None:
+def raw(ctx: click.Context, raw_data: List[str], send: bool, mac_address: str, via_daemon: bool) -> None:
     screen = ctx.obj["screen"]
 
     # parse all packets, one per argument
@@ -86,22 +157,14 @@ def raw(ctx: click.Context, raw_data: List[str], send: bool, mac_address: str) -
         missing = commands.index(None)
         raise ValueError(f"couldn't parse packet no. {missing}")
 
-    palette = commands[0].palette
-    payload = commands[0].image  # TODO reassemble image data
-
-    psd = PacketStreamDecoder(palette, payload)
-
-    print("palette data:", hexlify(palette))
-    print("palette:")
-    psd.palette.print_to(screen)
-
-    print("image data:", hexlify(payload))
-    print("image:")
-    psd.image.print_to(screen)
+    if all(p[3] == Command.SET_MUL_BOX_COLOR for p in packets):
+        show_animation(screen, packets)
+    else:
+        show_image(screen, commands[0].palette, commands[0].image)
 
     if send:
-        logger.info(f"sending image to {mac_address}")
-        dev = get_pixoo(mac_address)
+        logger.info(f"sending image to {mac_address or 'divo daemon'}")
+        dev = get_pixoo(mac_address, via_daemon)
         for p in packets:
             dev.write(p)
 
@@ -110,17 +173,34 @@ def raw(ctx: click.Context, raw_data: List[str], send: bool, mac_address: str) -
 @click.argument("path", nargs=1)
 @click.option("--send", is_flag=True)
 @click.option("--mac-address")
+@click.option("--via-daemon", is_flag=True, help="send through a running divo daemon")
+@click.option("--cache/--no-cache", default=True, help="reuse encoded images from $XDG_CACHE_HOME/divo")
 @click.pass_context
-def img(ctx: click.Context, path: str, send: bool, mac_address: str) -> None:
+def img(ctx: click.Context, path: str, send: bool, mac_address: str, via_daemon: bool, cache: bool) -> None:
     screen = ctx.obj["screen"]
 
     print(path)
-    rp = RawPixmap(16, 16)
-    img = rp.load_image(path)
-    rp.set_rgb_pixels(rp.decode_image(img))
 
-    ee = EvoEncoder()
-    data = ee.image_bytes(rp.get_pixel_data())
+    def encode() -> bytes:
+        rp = RawPixmap(16, 16)
+        img = rp.load_image(path)
+        rp.set_image(img)
+
+        ee = EvoEncoder()
+        return ee.image_bytes_rgb(rp.rgb_buffer())
+
+    try:
+        key = FrameCache.file_key(path, "16x16") if cache else None
+    except OSError:
+        # load_image shows a placeholder for missing files, don't cache that
+        key = None
+
+    if key is None:
+        data = encode()
+    else:
+        frame_cache = FrameCache(cache_dir=FrameCache.default_cache_dir())
+        data = frame_cache.get_or_build(key, encode)
+        logger.debug(f"frame cache: {frame_cache.hits + frame_cache.disk_hits} hits, {frame_cache.misses} misses")
     print("raw command: " + bytes.hex(data))
 
     packets = [clean_unhexlify(bytes.hex(data))]
@@ -130,34 +210,216 @@ def img(ctx: click.Context, path: str, send: bool, mac_address: str) -> None:
         missing = commands.index(None)
         raise ValueError(f"couldn't parse packet no. {missing}")
 
-    palette = commands[0].palette
-    payload = commands[0].image  # TODO reassemble image data
+    show_image(screen, commands[0].palette, commands[0].image)
 
-    psd = PacketStreamDecoder(palette, payload)
+    if send:
+        logger.info(f"sending image to {mac_address or 'divo daemon'}")
+        dev = get_pixoo(mac_address, via_daemon)
+        for p in packets:
+            dev.write(p)
 
-    print("palette data:", hexlify(palette))
-    print("palette:")
-    psd.palette.print_to(screen)
 
-    print("image data:", hexlify(payload))
-    print("image:")
-    psd.image.print_to(screen)
+@cli.command()
+@click.argument("path", nargs=1)
+@click.option("--sprite", help="frame size when the image is a sprite sheet, e.g. 16x16")
+@click.option("--duration", type=int, help="milliseconds per frame, overrides durations stored in the image")
+@click.option("--play", is_flag=True, help="preview the animation in the terminal instead of listing the frames")
+@click.option("--loops", default=1, help="how often to play the preview")
+@click.option("--send", is_flag=True)
+@click.option("--mac-address")
+@click.option("--via-daemon", is_flag=True, help="send through a running divo daemon")
+@click.pass_context
+def anim(
+    ctx: click.Context,
+    path: str,
+    sprite: Optional[str],
+    duration: Optional[int],
+    play: bool,
+    loops: int,
+    send: bool,
+    mac_address: str,
+    via_daemon: bool,
+) -> None:
+    screen = ctx.obj["screen"]
+
+    print(path)
+    rp = RawPixmap(16, 16)
+    img = rp.load_image(path)
+
+    if sprite:
+        frame_width, frame_height = (int(x) for x in sprite.lower().split("x"))
+        frames = AnimationEncoder.iter_sprite_frames(img, rp, frame_width, frame_height, duration)
+    else:
+        frames = AnimationEncoder.iter_image_frames(img, rp, duration)
+
+    try:
+        packets = list(AnimationEncoder.encode(frames))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for p in packets:
+        print("raw command: " + bytes.hex(p))
+
+    if play:
+        play_animation(screen, packets, loops)
+    else:
+        show_animation(screen, packets)
 
     if send:
-        logger.info(f"sending image to {mac_address}")
-        dev = get_pixoo(mac_address)
+        logger.info(f"sending animation to {mac_address or 'divo daemon'}")
+        dev = get_pixoo(mac_address, via_daemon)
         for p in packets:
             dev.write(p)
 
 
 @cli.command()
-@click.option("--mac-address", required=True)
+@click.argument("path", default="-")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default="raw", help="raw RGB24 or length-prefixed PNG")
+@click.option("--fps", default=10.0, help="maximum frames per second")
+@click.option("--mac-address")
+@click.option("--via-daemon", is_flag=True, help="send through a running divo daemon")
+@click.pass_context
+def stream(ctx: click.Context, path: str, fmt: str, fps: float, mac_address: Optional[str], via_daemon: bool) -> None:
+    """
+    show 16x16 frames read from PATH (stdin by default, or a FIFO) on the Pixoo
+
+    Without --mac-address or --via-daemon the frames are shown in the terminal. Example:
+    ffmpeg -re -i video.mp4 -vf scale=16:16 -f rawvideo -pix_fmt rgb24 - | divo stream --mac-address 11:75:58:xx:xx:xx
+    """
+    show: Callable[[ReadableBuffer], Any]
+    if mac_address or via_daemon:
+        dev = get_pixoo(mac_address or "", via_daemon)
+
+        def show(rgb: ReadableBuffer) -> Any:
+            return dev.transceive(EvoEncoder.image_bytes_rgb(rgb))
+
+    else:
+        renderer = ctx.obj["screen"].renderer
+        rp = RawPixmap(16, 16)
+
+        def show(rgb: ReadableBuffer) -> Any:
+            rp.set_rgb_buffer(rgb)
+            renderer.draw(rp.get_rgb_pixels(), rp.width)
+
+    with click.open_file(path, "rb") as f:
+        try:
+            stats = play_stream(FrameStream(f, fmt).frames(), show, fps)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+    logger.info(
+        f"read {stats.read} frames, sent {stats.sent}, skipped {stats.unchanged} unchanged frames "
+        f"in {stats.elapsed:.1f} s"
+    )
+
+
+@cli.command()
+@click.argument("source", type=click.Path(exists=True, file_okay=False))
+@click.argument("output", type=click.Path(dir_okay=False))
+def pack(source: str, output: str) -> None:
+    """
+    encode all images and animations in SOURCE into the asset pack OUTPUT
+
+    Assets are named by their path relative to SOURCE without extension, show them with: divo asset OUTPUT NAME
+    """
+    try:
+        entries = AssetPack.write(output, encode_directory(source))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for entry in entries:
+        kind = f"{len(entry.durations)} frames, {entry.duration} ms" if entry.durations else "image"
+        print(f"{entry.name}: {entry.length} bytes, {kind}")
+    logger.info(f"packed {len(entries)} assets into {output}")
+
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.argument("name", required=False)
+@click.option("--mac-address")
+@click.option("--via-daemon", is_flag=True, help="send through a running divo daemon")
+@click.pass_context
+def asset(ctx: click.Context, path: str, name: Optional[str], mac_address: Optional[str], via_daemon: bool) -> None:
+    """
+    list the assets in the pack PATH, or show asset NAME on the Pixoo (or in the terminal without a device)
+    """
+    with AssetPack(path) as asset_pack:
+        if name is None:
+            for entry in asset_pack.entries.values():
+                print(entry.name)
+            return
+
+        if name not in asset_pack:
+            raise click.BadParameter(f"no asset {name} in {path}", param_hint="NAME")
+
+        if mac_address or via_daemon:
+            logger.info(f"sending {name} to {mac_address or 'divo daemon'}")
+            asset_pack.send(get_pixoo(mac_address or "", via_daemon), name)
+            return
+
+        packets = [bytes(p) for p in asset_pack.packets(name)]
+        if asset_pack.entries[name].durations:
+            show_animation(ctx.obj["screen"], packets)
+        else:
+            command = Packet.parse(CommandParser(), packets[0])
+            show_image(ctx.obj["screen"], command.palette, command.image)
+
+
+@cli.command()
+@click.option("--mac-address")
+@click.option("--via-daemon", is_flag=True, help="send through a running divo daemon")
 @click.option("--test-id", default=1, required=True)
-def test(mac_address: str, test_id: int) -> None:
-    dev = get_pixoo(mac_address)
+def test(mac_address: str, via_daemon: bool, test_id: int) -> None:
+    dev = get_pixoo(mac_address, via_daemon)
 
     test_pattern(test_id, dev)
 
 
+@cli.command()
+@click.option("--mac-address", required=True)
+@click.option("--socket", "socket_path", help="control socket, default: $DIVO_SOCKET or $XDG_RUNTIME_DIR/divo.sock")
+def daemon(mac_address: str, socket_path: Optional[str]) -> None:
+    """keep the connection to the Pixoo open for commands run with --via-daemon"""
+    dev = get_pixoo(mac_address)
+
+    DivoDaemon(dev, socket_path).serve_forever()
+
+
+@cli.command()
+@click.option("--filter", "name_filter", default="", help="only run benchmarks containing this text")
+@click.option("--time", "min_time", default=0.2, help="seconds per benchmark")
+@click.option("--json", "as_json", is_flag=True, help="print JSON instead of a table")
+@click.option("--output", type=click.Path(dir_okay=False), help="save the results as JSON, e.g. as baseline")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False), help="compare with saved results")
+@click.option("--threshold", default=0.1, help="slowdown that counts as regression, 0.1 is 10%")
+@click.pass_context
+def bench(
+    ctx: click.Context,
+    name_filter: str,
+    min_time: float,
+    as_json: bool,
+    output: Optional[str],
+    baseline: Optional[str],
+    threshold: float,
+) -> None:
+    # the send benchmarks would be drowned in debug logs
+    logger.remove()
+    logger.add(sys.stderr, level="ERROR")
+
+    names = [name for name in divo_bench.benchmarks() if name_filter in name]
+    results = divo_bench.run(names, min_time)
+
+    print(divo_bench.to_json(results) if as_json else divo_bench.format_table(results))
+    if output:
+        with open(output, "w") as f:
+            f.write(divo_bench.to_json(results))
+
+    if baseline:
+        with open(baseline) as f:
+            regressions = divo_bench.compare(results, json.load(f), threshold)
+        for regression in regressions:
+            logger.error(f"regression: {regression}")
+        if regressions:
+            ctx.exit(1)
+
+
 if __name__ == "__main__":
     cli(obj={})
@@ -12,40 +12,103 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-from typing import Any, Optional, Union
+import struct
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union
 
 from .command_base import CommandBase, CommandParserBase
 from .exceptions import PacketChecksumError, PacketParsingError
+from .helpers import ReadableBuffer, WritableBuffer, byte_sum
 from .packet_base import PacketBase
 
 
+class BuiltPacket(bytes):
+    """
+    packet built by divo itself, e.g. by Packet.build
+
+    Its framing and checksum are known to be right so it isn't validated again before sending. Slicing or
+    concatenating it gives plain bytes again.
+    """
+
+
 class Packet(PacketBase):
-    @classmethod
-    def build(cls, cmd: CommandBase, payload: Union[bytes, int, None] = None) -> bytes:
+    # start, size (2), command + checksum (2), end
+    OVERHEAD = 7
+
+    _header = struct.Struct("<BHB")
+    _trailer = struct.Struct("<HB")
+
+    @staticmethod
+    def _payload_bytes(payload: Union[ReadableBuffer, int, None]) -> ReadableBuffer:
         # many commands only have one or no bytes payload
         if isinstance(payload, int):
             # for convenience if only a single byte is sent
-            payload = bytes([payload])
+            return bytes([payload])
         elif payload is None:
-            payload = b""
+            return b""
+        return payload
+
+    @classmethod
+    def size_for(cls, payload_len: int) -> int:
+        return payload_len + cls.OVERHEAD
+
+    @classmethod
+    def _checksum(cls, size: int, command: int, payload: ReadableBuffer) -> int:
+        # sum of size, command and payload, the payload isn't copied into the packet first
+        return ((size & 0xFF) + (size >> 8) + command + byte_sum(payload)) & 0xFFFF
+
+    @classmethod
+    def build(cls, cmd: CommandBase, payload: Union[ReadableBuffer, int, None] = None) -> BuiltPacket:
+        payload = cls._payload_bytes(payload)
+        payload_len = len(payload)
+        size = payload_len + 3
+        command = cmd.value & 0xFF
+
+        # like build_into, without its bounds checks
+        buf = bytearray(payload_len + cls.OVERHEAD)
+        cls._header.pack_into(buf, 0, cls.START_OF_PACKET, size, command)
+        buf[4 : 4 + payload_len] = payload
+        cls._trailer.pack_into(buf, 4 + payload_len, cls._checksum(size, command, payload), cls.END_OF_PACKET)
+
+        # the only copy of the finished packet
+        return BuiltPacket(buf)
+
+    @classmethod
+    def build_into(
+        cls, buf: WritableBuffer, cmd: CommandBase, payload: Union[ReadableBuffer, int, None] = None, offset: int = 0
+    ) -> int:
+        """write the packet to buf at offset without intermediate copies, returns the offset after the packet"""
+        payload = cls._payload_bytes(payload)
+        payload_len = len(payload)
+        end = offset + payload_len + cls.OVERHEAD
+        if offset < 0 or end > len(buf):
+            raise ValueError(f"buffer too small for packet, need {end} bytes, got {len(buf)}")
 
         # add header
-        size = len(payload) + 3
-        size_lo = size & 0xFF
-        size_hi = (size >> 8) & 0xFF
+        size = payload_len + 3
         command = cmd.value & 0xFF
-        packet = bytes([cls.START_OF_PACKET, size_lo, size_hi, command])
+        cls._header.pack_into(buf, offset, cls.START_OF_PACKET, size, command)
 
         # add payload
-        packet += payload
+        pos = offset + 4
+        buf[pos : pos + payload_len] = payload
 
         # add checksum and end marker
-        checksum = sum(packet[1:]) & 0xFFFF
-        checksum_lo = checksum & 0xFF
-        checksum_hi = (checksum >> 8) & 0xFF
-        packet += bytes([checksum_lo, checksum_hi, cls.END_OF_PACKET])
+        checksum = cls._checksum(size, command, payload)
+        cls._trailer.pack_into(buf, pos + payload_len, checksum, cls.END_OF_PACKET)
 
-        return packet
+        return end
+
+    @classmethod
+    def build_many(cls, commands: Iterable[Tuple[CommandBase, Union[ReadableBuffer, int, None]]]) -> bytearray:
+        """pack several packets back to back into one buffer, e.g. for a single write"""
+        batch = [(cmd, cls._payload_bytes(payload)) for cmd, payload in commands]
+        buf = bytearray(sum(cls.size_for(len(payload)) for _, payload in batch))
+
+        offset = 0
+        for cmd, payload in batch:
+            offset = cls.build_into(buf, cmd, payload, offset)
+
+        return buf
 
     @staticmethod
     def __hex_checksum(checksum: int) -> str:
@@ -53,14 +116,32 @@ class Packet(PacketBase):
         return tmp[4:7] + tmp[2:4]
 
     @classmethod
-    def parse(cls, parser: CommandParserBase, packet: bytes) -> Any:
+    def views(cls, capture: ReadableBuffer) -> Iterator[memoryview]:
+        """
+        split a capture of back to back packets without copying
+
+        :param capture: packets as sent to the device
+        :return: iterator over a memoryview of each packet, an incomplete last packet is skipped
+        """
+        view = memoryview(capture)
+        offset = 0
+        while offset + 3 <= len(view):
+            end = offset + view[offset + 1] + (view[offset + 2] << 8) + 4
+            if end > len(view):
+                break
+            yield view[offset:end]
+            offset = end
+
+    @classmethod
+    def unpack(cls, packet: ReadableBuffer, zero_copy: bool = False) -> Tuple[int, ReadableBuffer]:
         try:
             start = packet[0]
             size_lo = packet[1]
             size_hi = packet[2]
             size = ((size_hi & 0xFF) << 8) | (size_lo & 0xFF)
             cmd_type = packet[3]
-            data = packet[4 : 3 + size - 2]
+            # a view of the payload instead of a copy
+            data = (memoryview(packet) if zero_copy else packet)[4 : 3 + size - 2]
             checksum_lo = packet[3 + size - 2]
             checksum_hi = packet[3 + size - 1]
             checksum = ((checksum_hi & 0xFF) << 8) | (checksum_lo & 0xFF)
@@ -73,14 +154,18 @@ class Packet(PacketBase):
         if end != PacketBase.END_OF_PACKET:
             raise PacketParsingError(f"END_OF_PACKET value wrong: {end}")
 
-        wanted_checksum = sum(packet[1 : 3 + size - 2]) & 0xFFFF
+        wanted_checksum = byte_sum(memoryview(packet)[1 : 3 + size - 2]) & 0xFFFF
         if checksum != wanted_checksum:
             raise PacketChecksumError(
                 f"checksum wrong, got: {Packet.__hex_checksum(checksum)} "
                 + f"wanted: {Packet.__hex_checksum(wanted_checksum)}"
             )
 
-        return parser.parse(cmd_type, data)
+        return cmd_type, data
+
+    @classmethod
+    def parse(cls, parser: CommandParserBase, packet: ReadableBuffer, zero_copy: bool = False) -> Any:
+        return parser.parse(*cls.unpack(packet, zero_copy))
 
 
 class ResponsePacket(PacketBase):
@@ -89,10 +174,24 @@ class ResponsePacket(PacketBase):
 
     @classmethod
     def build(cls, cmd: CommandBase, payload: Optional[Union[bytes, int]] = None) -> bytes:
-        raise NotImplementedError
+        if isinstance(payload, int):
+            payload = bytes([payload])
+        elif payload is None:
+            payload = b""
+
+        # size covers magic check, command, magic unk1 and payload
+        size = len(payload) + 3
+        size_lo = size & 0xFF
+        size_hi = (size >> 8) & 0xFF
+        command = cmd.value & 0xFF
+        packet = bytes([cls.START_OF_PACKET, size_lo, size_hi, cls.MAGIC_CHECK, command, cls.MAGIC_UNK1])
+        packet += payload
+        packet += bytes([cls.END_OF_PACKET])
+
+        return packet
 
     @classmethod
-    def parse(cls, parser: CommandParserBase, packet: bytes) -> Any:
+    def unpack(cls, packet: ReadableBuffer, zero_copy: bool = False) -> Tuple[int, ReadableBuffer]:
         try:
             start = packet[0]
             size_lo = packet[1]
@@ -101,7 +200,7 @@ class ResponsePacket(PacketBase):
             cmd_chk = packet[3]
             cmd_type = packet[4]
             unk1 = packet[5]
-            data = packet[6 : 2 + size + 1]
+            data = (memoryview(packet) if zero_copy else packet)[6 : 2 + size + 1]
             end = packet[2 + size + 1]
         except IndexError:
             raise PacketParsingError("packet incomplete")
@@ -115,4 +214,8 @@ class ResponsePacket(PacketBase):
         if unk1 != cls.MAGIC_UNK1:
             raise PacketParsingError(f"MAGIC_UNK1 value wrong: {unk1}")
 
-        return parser.parse_response(cmd_type, data)
+        return cmd_type, data
+
+    @classmethod
+    def parse(cls, parser: CommandParserBase, packet: ReadableBuffer, zero_copy: bool = False) -> Any:
+        return parser.parse_response(*cls.unpack(packet, zero_copy))
@@ -13,10 +13,11 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 import abc
-from typing import Any, Optional, Union
+from typing import Any, Optional, Tuple, Union
 
 from .command_base import CommandBase, CommandParserBase
 from .exceptions import PacketException
+from .helpers import ReadableBuffer
 
 
 class PacketBase(abc.ABC):
@@ -30,13 +31,34 @@ class PacketBase(abc.ABC):
 
     @classmethod
     @abc.abstractmethod
-    def parse(cls, parser: CommandParserBase, packet: bytes) -> Any:
+    def unpack(cls, packet: ReadableBuffer, zero_copy: bool = False) -> Tuple[int, ReadableBuffer]:
+        """
+        check the framing of a packet
+
+        :param packet: complete packet
+        :param zero_copy: return the payload as memoryview into packet instead of a copy
+        :return: command type and payload
+        """
+        pass
+
+    @classmethod
+    @abc.abstractmethod
+    def parse(cls, parser: CommandParserBase, packet: ReadableBuffer, zero_copy: bool = False) -> Any:
         pass
 
     @classmethod
-    def is_valid(cls, parser: CommandParserBase, packet: bytes) -> bool:
+    def is_valid(cls, parser: CommandParserBase, packet: ReadableBuffer, framing_only: bool = False) -> bool:
+        """
+        :param packet: complete packet
+        :param framing_only: only check framing and checksum without parsing the command, for callers that
+            know where the packet comes from
+        """
         try:
-            cls.parse(parser, packet)
+            # the payload is parsed from a view, it's never copied
+            if framing_only:
+                cls.unpack(packet, zero_copy=True)
+            else:
+                cls.parse(parser, packet, zero_copy=True)
         except PacketException:
             return False
         return True
@@ -0,0 +1,108 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import Iterator, Optional
+
+from loguru import logger
+
+from .helpers import ReadableBuffer
+from .packet_base import PacketBase
+
+
+class PacketFramer:
+    """
+    Reassemble packets from a byte stream that arrives in arbitrary chunks.
+
+    Requests and responses share the same framing: START_OF_PACKET, 16 bit little-endian size,
+    size bytes of content and END_OF_PACKET, so this works for Packet and ResponsePacket alike.
+    Garbage is skipped by scanning for the next START_OF_PACKET which leads to a sane size and
+    a matching END_OF_PACKET.
+    """
+
+    HEADER_SIZE = 3  # start marker and size
+    MIN_SIZE = 3  # smallest content: command and two bytes checksum or response magic
+
+    def __init__(self, max_size: int = 0xFFFF) -> None:
+        self.max_size = max_size
+        self.buffer = bytearray()
+        self.discarded = 0
+
+    def reset(self) -> None:
+        self.buffer.clear()
+
+    def feed(self, data: ReadableBuffer) -> Iterator[bytes]:
+        """
+        add received data
+
+        :param data: chunk of received bytes
+        :return: iterator over all packets that are complete now
+        """
+        self.buffer += data
+        return self.frames()
+
+    def frames(self) -> Iterator[bytes]:
+        frame = self.next_frame()
+        while frame is not None:
+            yield frame
+            frame = self.next_frame()
+
+    def next_frame(self) -> Optional[bytes]:
+        """
+        :return: next complete packet or None if more data is needed
+        """
+        buf = self.buffer
+        while True:
+            start = buf.find(PacketBase.START_OF_PACKET)
+            if start < 0:
+                self._discard(len(buf))
+                return None
+            self._discard(start)
+
+            if len(buf) < self.HEADER_SIZE:
+                return None
+
+            size = buf[1] | (buf[2] << 8)
+            if not (self.MIN_SIZE <= size <= self.max_size):
+                self._discard(1)
+                continue
+
+            total = self.HEADER_SIZE + size + 1
+            if len(buf) < total:
+                return None
+
+            if buf[total - 1] != PacketBase.END_OF_PACKET:
+                self._discard(1)
+                continue
+
+            frame = bytes(buf[:total])
+            del buf[:total]
+            return frame
+
+    def wanted(self) -> int:
+        """
+        :return: number of bytes that are at least needed to complete the next packet
+        """
+        if len(self.buffer) < self.HEADER_SIZE:
+            return self.HEADER_SIZE - len(self.buffer)
+
+        size = self.buffer[1] | (self.buffer[2] << 8)
+        return max(self.HEADER_SIZE + size + 1 - len(self.buffer), 1)
+
+    def _discard(self, count: int) -> None:
+        if not count:
+            return
+
+        logger.debug(f"framer skipping garbage: {bytes(self.buffer[:count])!r}")
+        del self.buffer[:count]
+        self.discarded += count
@@ -12,16 +12,32 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
+from itertools import chain
+from typing import Dict, List, Tuple
+
 from loguru import logger
 
-from .helpers import chunks
+from .helpers import ReadableBuffer, chunks
 from .image import Color, ImageBuffer, Palette
 
+# per-byte lookup tables for bit depths that divide a byte evenly, built on first use
+_UNPACK_TABLES: Dict[int, Tuple[Tuple[int, ...], ...]] = {}
+
+
+def _unpack_table(bits_per_pixel: int) -> Tuple[Tuple[int, ...], ...]:
+    table = _UNPACK_TABLES.get(bits_per_pixel)
+    if table is None:
+        mask = (1 << bits_per_pixel) - 1
+        shifts = range(0, 8, bits_per_pixel)
+        table = tuple(tuple((value >> shift) & mask for shift in shifts) for value in range(256))
+        _UNPACK_TABLES[bits_per_pixel] = table
+    return table
+
 
 class PacketStreamDecoder:
     _debug = False
 
-    def __init__(self, palette: bytes, payload: bytes):
+    def __init__(self, palette: ReadableBuffer, payload: ReadableBuffer):
         # parse palette
         self.palette = self.parse_palette(palette)
 
@@ -29,24 +45,59 @@ class PacketStreamDecoder:
         self.image = self.parse_image(payload, self.palette)
 
     @staticmethod
-    def parse_palette(data: bytes) -> Palette:
+    def parse_palette(data: ReadableBuffer) -> Palette:
         ret = Palette()
         ret.palette += [Color(*data[x : x + 3]) for x in range(0, len(data), 3)]
         return ret
 
-    @classmethod
-    def parse_image(cls, data: bytes, palette: Palette) -> ImageBuffer:
-        # parse byte data to binary string
-        binary_string = ""
+    @staticmethod
+    def bit_string(data: ReadableBuffer) -> str:
+        """payload as string of bits, least significant bit of each byte first"""
+        return "".join(f"{bx:08b}"[::-1] for bx in data)
+
+    @staticmethod
+    def unpack_indices(data: ReadableBuffer, bits_per_pixel: int) -> List[int]:
+        """
+        unpack LSB-first packed palette indices
+
+        A trailing partial index is zero-padded, just like the device does it.
+
+        :param data: packed image data
+        :param bits_per_pixel: width of each index in bits (1 to 8)
+        :return: flat list of palette indices
+        """
+        if not (1 <= bits_per_pixel <= 8):
+            raise ValueError("bits_per_pixel out of range")
+
+        if 8 % bits_per_pixel == 0:
+            table = _unpack_table(bits_per_pixel)
+            return list(chain.from_iterable(map(table.__getitem__, data)))
+
+        # odd bit depths span byte boundaries, so shift through an accumulator
+        mask = (1 << bits_per_pixel) - 1
+        indices = []
+        acc = 0
+        acc_bits = 0
         for bx in data:
-            by = f"{bx:08b}"
-            by = by[::-1]
-            binary_string += by
+            acc |= bx << acc_bits
+            acc_bits += 8
+            while acc_bits >= bits_per_pixel:
+                indices.append(acc & mask)
+                acc >>= bits_per_pixel
+                acc_bits -= bits_per_pixel
+        if acc_bits:
+            indices.append(acc)
 
-        bits_per_pixel = palette.bits_per_pixel()
+        return indices
+
+    @classmethod
+    def parse_image(cls, data: ReadableBuffer, palette: Palette) -> ImageBuffer:
+        # a single colour palette still uses one bit per pixel
+        bits_per_pixel = max(palette.bits_per_pixel(), 1)
 
         if cls._debug:
             # print payload as binary
+            binary_string = cls.bit_string(data)
             pixels_per_row = 16
             bits_per_row = pixels_per_row * bits_per_pixel
             for row in range(16):
@@ -55,24 +106,22 @@ class PacketStreamDecoder:
                 row_payload = binary_string[payload_start:payload_end]
                 print(chunks(row_payload, bits_per_pixel))
 
+        # the last two bits of the payload never start a pixel
+        pixel_count = len(range(0, len(data) * 8 - 2, bits_per_pixel))
+        indices = cls.unpack_indices(data, bits_per_pixel)[:pixel_count]
+
         # build image
         buf = ImageBuffer()
-        for pos in range(0, len(binary_string) - 2, bits_per_pixel):
-            pixel_no = int(pos / bits_per_pixel)
-            x = pixel_no % buf.width
-            y = int(pixel_no / buf.width)
-
-            if y >= buf.height:
-                extra_crap = binary_string[pos:]
-                logger.info(f"got extra crap after image: {extra_crap}")
-                break
-
-            bidx = binary_string[pos : pos + bits_per_pixel][::-1]
-            idx = int(bidx, 2)
-            try:
-                color = palette[idx]
-                buf.set(x, y, color)
-            except IndexError:
+        image_size = buf.width * buf.height
+        colors = palette.palette
+        for pixel_no, idx in enumerate(indices[:image_size]):
+            if idx < len(colors):
+                buf.set(pixel_no % buf.width, pixel_no // buf.width, colors[idx])
+            else:
                 logger.warning(f"tried to set color index {idx}")
 
+        if pixel_count > image_size:
+            extra_crap = cls.bit_string(data)[image_size * bits_per_pixel :]
+            logger.info(f"got extra crap after image: {extra_crap}")
+
         return buf
@@ -0,0 +1,74 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from typing import Optional, Sequence, Tuple
+
+from .command_base import CommandBase
+from .packet import BuiltPacket, Packet
+
+
+class PacketTemplate:
+    """
+    Packet of a command with a fixed payload layout where only a few bytes change, e.g. the colour of a light
+    mode.
+
+    The packet is built once. build() patches the variable bytes in a copy and corrects the checksum by
+    their difference to the template instead of summing the whole packet again.
+    """
+
+    def __init__(self, cmd: CommandBase, payload: bytes, fields: Sequence[int]) -> None:
+        """
+        :param cmd: command id
+        :param payload: payload with the default values of the variable bytes
+        :param fields: payload offset of each variable byte, in the order build() takes them
+        """
+        self.cmd = cmd
+        self.packet = Packet.build(cmd, payload)
+        # packet offsets of the variable bytes with their template values
+        self.fields: Tuple[Tuple[int, int], ...] = tuple((4 + i, payload[i]) for i in fields)
+        self.checksum = self.packet[-3] | (self.packet[-2] << 8)
+
+    def build(self, *values: int) -> BuiltPacket:
+        """
+        :param values: one byte per field
+        :return: the packet with the fields set
+        """
+        if len(values) != len(self.fields):
+            raise ValueError(f"expected {len(self.fields)} values, got {len(values)}")
+
+        packet = bytearray(self.packet)
+        checksum = self.checksum
+        for (pos, default), value in zip(self.fields, values):
+            packet[pos] = value  # raises ValueError if it's not a byte
+            checksum += value - default
+
+        packet[-3] = checksum & 0xFF
+        packet[-2] = (checksum >> 8) & 0xFF
+        return BuiltPacket(packet)
+
+
+class PacketTable:
+    """all packets of a command with a single byte payload from a small range, e.g. brightness 0 to 100"""
+
+    def __init__(self, cmd: CommandBase, count: int) -> None:
+        self.cmd = cmd
+        self.packets = tuple(Packet.build(cmd, value) for value in range(count))
+
+    def get(self, value: int) -> Optional[BuiltPacket]:
+        """
+        :return: prebuilt packet, None if value is outside of the table
+        """
+        if 0 <= value < len(self.packets):
+            return self.packets[value]
+        return None
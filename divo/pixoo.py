@@ -12,247 +12,258 @@ You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
-from datetime import datetime
-from typing import Any, Optional, Union
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, DefaultDict, Deque, Iterator, Optional, Tuple, Union
 
 from loguru import logger
 
 from .bluetooth_base import BluetoothBase
-from .command import (
-    COMMANDS_WITHOUT_RESPONSE,
-    ActivatedModes,
-    BoxMode,
-    Command,
-    CommandParser,
-    GetBoxMode,
-    LightMode,
-    TimeType,
-)
+from .command import COMMANDS_WITHOUT_RESPONSE, Command, CommandParser, GetBoxMode
 from .command_base import CommandBase
+from .device_state import DeviceState
 from .exceptions import CommandNoReplyException, PacketWriteException
-from .packet import Packet, ResponsePacket
+from .helpers import ReadableBuffer
+from .packet import BuiltPacket, Packet, ResponsePacket
+from .packet_framer import PacketFramer
+from .pixoo_base import PixooBase
 
 
-class Pixoo:
-    def __init__(self, bt_device: BluetoothBase) -> None:
+class Pixoo(PixooBase):
+    def __init__(self, bt_device: BluetoothBase, max_in_flight: int = 1, skip_redundant: bool = True) -> None:
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
         self.comm = bt_device
         self.comm.connect()
         self.comm.flush()
 
         self.command_parser = CommandParser()
+        self.framer = PacketFramer()
+
+        # last acknowledged settings, see DeviceState
+        self.state = DeviceState()
+        self.skip_redundant = skip_redundant
 
-    def write(self, data: bytes) -> Optional[Any]:
+        # commands sent but not yet answered, per command id in the order they were sent
+        self.max_in_flight = max_in_flight
+        self.pipelined = False
+        self.in_flight = 0
+        self.pending: DefaultDict[int, Deque[Tuple["Future[Any]", bool]]] = defaultdict(deque)
+
+    def write(self, data: ReadableBuffer) -> Optional[Any]:
         """
         send raw data to Pixoo and receive and parse response packet
 
         :param data: raw packet to send
-        :return: ResponsePacket if this command has a response and we successfully received it
+        :return: parsed ResponsePacket if this command has a response and we successfully received it
+        """
+        response = self.transceive(data)
+        if response is None:
+            return None
+
+        return ResponsePacket.parse(self.command_parser, response)
+
+    def transceive(self, data: ReadableBuffer) -> Optional[bytes]:
         """
+        send raw data to Pixoo and receive response packet
+
+        :param data: raw packet to send
+        :return: raw response packet if this command has a response and we successfully received it
+        """
+        future = self.submit(data, parse=False)
+        try:
+            response = self.wait(future)
+        except CommandNoReplyException:
+            return None
+
+        assert response is None or isinstance(response, bytes)
+        return response
+
+    def submit(
+        self, data: ReadableBuffer, callback: Optional[Callable[["Future[Any]"], None]] = None, parse: bool = True
+    ) -> "Future[Any]":
+        """
+        send raw data to Pixoo without waiting for the response
+
+        Up to max_in_flight commands are sent before we block to receive the oldest response. Responses are
+        matched to their commands by command id.
 
-        if not Packet.is_valid(self.command_parser, data):
+        :param data: raw packet to send
+        :param callback: called with the future once the response arrived
+        :param parse: resolve the future with the parsed ResponsePacket instead of the raw one
+        :return: future resolving to the response, None for commands without response
+        """
+        # packets we built ourselves are valid already
+        if not isinstance(data, BuiltPacket) and not Packet.is_valid(self.command_parser, data):
             raise PacketWriteException("tried to send invalid packet")
 
-        self.comm.write(data)
-        logger.debug(f"sending {list(data)}")
+        while self.in_flight >= self.max_in_flight:
+            self.receive_response()
 
         cmd = data[3]
-        if cmd in COMMANDS_WITHOUT_RESPONSE:
-            return None
+        sequence = self.state.sending(cmd)
+
+        self.comm.write(data)
+        logger.opt(lazy=True).debug("sending {}", lambda: list(data))
 
-        # read packet start marker and packet size
-        response = self.comm.read(3)
-        if len(response) == 3:
-            if response[0] == Packet.START_OF_PACKET:
-                size_lo = response[1]
-                size_hi = response[2]
-                size = ((size_hi & 0xFF) << 8) | (size_lo & 0xFF)
-                logger.debug(f"receiving payload with length {size}")
-
-                # read rest of packet
-                rest = self.comm.read(size + 1)
-                if len(rest):
-                    if rest[-1] == Packet.END_OF_PACKET:
-                        # we received a complete packet
-                        packet = response + rest
-                        logger.debug(f"received {list(packet)}")
-                        return ResponsePacket.parse(self.command_parser, packet)
-                    else:
-                        logger.error(f"end marker not present: rest={rest!r}")
-                else:
-                    logger.error("rest empty")
-            else:
-                logger.error(f"received garbage: {response!r}")
+        future: "Future[Any]" = Future()
+        future.add_done_callback(partial(self._acknowledged, cmd, data[4:-3], sequence))
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        if cmd in COMMANDS_WITHOUT_RESPONSE:
+            future.set_result(None)
         else:
-            logger.error(f"didn't receive enough data for response, only: {response!r}")
+            self.pending[cmd].append((future, parse))
+            self.in_flight += 1
+
+        return future
+
+    def _acknowledged(self, cmd: int, payload: ReadableBuffer, sequence: int, future: "Future[Any]") -> None:
+        if future.exception() is None:
+            self.state.acknowledged(cmd, payload, sequence)
 
-        return None
+    def receive_response(self) -> None:
+        """
+        receive one response and resolve the future of the oldest command it belongs to
+        """
+        response = self.read_response()
+        if response is None:
+            # the device stopped talking to us, nothing in flight will get an answer
+            self.fail_pending(CommandNoReplyException("no reply received"))
+            return
+
+        cmd_type = response[4]
+        queue = self.pending.get(cmd_type)
+        if not queue:
+            logger.warning(f"dropping response to command {cmd_type} we didn't wait for")
+            return
+
+        future, parse = queue.popleft()
+        self.in_flight -= 1
+        if not parse:
+            future.set_result(response)
+            return
+
+        try:
+            future.set_result(ResponsePacket.parse(self.command_parser, response))
+        except Exception as e:  # pylint: disable=broad-except
+            # the future isn't pending anymore, its caller would wait forever if the error escaped here
+            future.set_exception(e)
+
+    def wait(self, future: "Future[Any]") -> Any:
+        """
+        receive responses until the given command is answered
+
+        :return: result of the future
+        """
+        while not future.done():
+            self.receive_response()
+
+        return future.result()
+
+    def drain(self) -> None:
+        """
+        receive responses until no command is in flight anymore
+        """
+        while self.in_flight:
+            self.receive_response()
+
+    @contextmanager
+    def pipeline(self, max_in_flight: int = 4) -> Iterator[None]:
+        """
+        keep up to max_in_flight commands in flight, write_command returns futures meanwhile
+
+        All outstanding responses are received when leaving the context.
+        """
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+
+        previous = self.max_in_flight, self.pipelined
+        self.max_in_flight, self.pipelined = max_in_flight, True
+        try:
+            yield
+        finally:
+            self.max_in_flight, self.pipelined = previous
+            self.drain()
+
+    def fail_pending(self, exception: Exception) -> None:
+        """give up on all commands waiting for a response"""
+        for waiting in self.pending.values():
+            for future, _ in waiting:
+                future.set_exception(exception)
+        self.pending.clear()
+        self.in_flight = 0
+        self.framer.reset()
+
+    def read_response(self) -> Optional[bytes]:
+        """
+        read until a complete response packet arrived, skipping garbage
+
+        :return: raw response packet or None if the device stopped sending
+        """
+        response = self.framer.next_frame()
+        while response is None:
+            chunk = self.comm.read(self.framer.wanted())
+            if not chunk:
+                logger.error(f"didn't receive complete response, only: {bytes(self.framer.buffer)!r}")
+                return None
+
+            response = next(self.framer.feed(chunk), None)
+
+        logger.opt(lazy=True).debug("received {}", lambda: list(response))
+        return response
 
     def write_command(
-        self, cmd: CommandBase, cmd_data: Optional[Union[bytes, int]] = None, need_response: bool = False
+        self,
+        cmd: CommandBase,
+        cmd_data: Optional[Union[bytes, int]] = None,
+        need_response: bool = False,
+        force: bool = False,
     ) -> Optional[Any]:
         """
         send command with payload and receive response if there is any
 
         :param cmd: Command id
         :param cmd_data: raw data, command-specific
-        :return: parsed ResponsePacket if we received it successfully
+        :param force: send even if the device already acknowledged the same setting
+        :return: parsed ResponsePacket if we received it successfully, a future for it in pipeline mode.
+                 None if the command was skipped.
         """
-        resp = self.write(Packet.build(cmd, cmd_data))
-        if need_response and resp is None:
-            raise CommandNoReplyException(f"expected a reply to command {cmd.value}")
-
-        return resp
-
-    def write_command_with_response(
-        self, cmd: CommandBase, cmd_data: Optional[Union[bytes, int]] = None
-    ) -> ResponsePacket:
-        resp = self.write_command(cmd, cmd_data, need_response=True)
-        assert isinstance(resp, ResponsePacket)
-        return resp
-
-    def set_brightness(self, percent: int) -> ResponsePacket:
-        if not (0 <= percent <= 100):
-            raise ValueError("out of range")
-
-        return self.write_command_with_response(Command.SET_SYSTEM_BRIGHTNESS, percent)
-
-    def set_score(self, blue_score: int, red_score: int) -> ResponsePacket:
-        rs_lo = red_score & 0xFF
-        rs_hi = (red_score >> 8) & 0xFF
-        bs_lo = blue_score & 0xFF
-        bs_hi = (blue_score >> 8) & 0xFF
-        val = bytes([BoxMode.WATCH, 0, rs_lo, rs_hi, bs_lo, bs_hi, 0, 0, 0, 0])
-        return self.write_command_with_response(Command.SET_BOX_MODE, val)
-
-    def set_music_visualizer(self, visualizer: int) -> ResponsePacket:
-        if not (0 <= visualizer <= 11):
-            raise ValueError("visualizer id out of range")
-
-        val = bytes([BoxMode.MUSIC, visualizer & 0xFF] + [0] * 8)
-        return self.write_command_with_response(Command.SET_BOX_MODE, val)
-
-    def set_time(self, ts: Optional[datetime] = None) -> ResponsePacket:
-        if ts is None:
-            ts = datetime.now()
-
-        year = ts.year
-        month = ts.month
-        day_of_month = ts.day
-        hours = ts.hour
-        minutes = ts.minute
-        seconds = ts.second
-        day_of_week = ts.isoweekday() % 7
-
-        val = bytes(
-            [
-                int(year % 100),
-                int(year / 100),
-                month,  # 1 to 12
-                day_of_month,  # 1 to 31
-                hours,
-                minutes,
-                seconds,
-                day_of_week,  # 0=sun, 1=mon, ..6=sat
-            ]
-        )
-        return self.write_command_with_response(Command.SET_TIME, val)
-
-    def set_game(self, enable: bool, game: int) -> ResponsePacket:
-        if not (0 <= game <= 8):
-            raise ValueError("game id out of range")
-
-        val = bytes([int(enable), game])
-        return self.write_command_with_response(Command.SET_GAME, val)
-
-    def set_system_color(self, r: int, g: int, b: int) -> ResponsePacket:
-        val = bytes([r & 0xFF, g & 0xFF, b & 0xFF])
-        return self.write_command_with_response(Command.SET_SYSTEM_COLOR, val)
-
-    def set_sleep_color(self, r: int, g: int, b: int) -> None:
-        val = bytes([r & 0xFF, g & 0xFF, b & 0xFF])
-        self.write_command(Command.SET_SLEEP_COLOR, val)
+        return self.write_packet(cmd, self.build_packet(cmd, cmd_data), need_response=need_response, force=force)
 
-    def get_box_mode(self) -> GetBoxMode:
-        data = self.write_command(Command.GET_BOX_MODE)
-        assert isinstance(data, bytes)
-        return GetBoxMode.from_data(data)
+    def write_packet(
+        self, cmd: CommandBase, packet: BuiltPacket, need_response: bool = False, force: bool = False
+    ) -> Optional[Any]:
+        """
+        like write_command but with the complete packet of the command
+        """
+        if self.skip_redundant and not force and self.state.is_current(cmd.value, packet[4:-3]):
+            logger.debug(f"skipping command {cmd.value}, setting is current")
+            self.state.skip(cmd.value)
+            if self.pipelined:
+                skipped: "Future[Any]" = Future()
+                skipped.set_result(None)
+                return skipped
+            return None
 
-    def set_light_mode_clock(
-        self,
-        time_type: TimeType,
-        red: int,
-        green: int,
-        blue: int,
-        modes: Optional[ActivatedModes] = None,
-    ) -> ResponsePacket:
-        if modes is None:
-            modes = ActivatedModes.get_default()
-
-        val = bytes(
-            [
-                BoxMode.ENV.value,
-                1,
-                time_type.value,
-                int(modes.clock),
-                int(modes.weather),
-                int(modes.temperature),
-                int(modes.date),
-                red,
-                green,
-                blue,
-            ]
-        )
-        return self.write_command_with_response(Command.SET_BOX_MODE, val)
-
-    def set_light_mode_temperature(self, box_mode: GetBoxMode) -> ResponsePacket:
-        val = bytes(
-            [
-                LightMode.TEMPERATURE.value,
-                box_mode.temp_type,
-                box_mode.temp_r,
-                box_mode.temp_g,
-                box_mode.temp_b,
-                0,
-            ]
-        )
-        return self.write_command_with_response(Command.SET_BOX_MODE, val)
-
-    def send_app_newest_time(self, value: Optional[bool]) -> None:
-        if value is None:
-            data = -1 & 0xFF
-        else:
-            data = int(value)
-        self.write_command(Command.SEND_APP_NEWEST_TIME, data)
+        if self.pipelined:
+            return self.submit(packet)
 
-    def set_light_mode_light(
-        self,
-        red: int,
-        green: int,
-        blue: int,
-        modes: Optional[ActivatedModes] = None,
-    ) -> ResponsePacket:
-        if modes is None:
-            modes = ActivatedModes.get_default()
-
-        val = bytes(
-            [
-                BoxMode.LIGHT.value,
-                red,
-                green,
-                blue,
-                0x14,
-                0,
-                int(modes.clock),
-                int(modes.weather),
-                int(modes.temperature),
-                int(modes.date),
-            ]
-        )
-        return self.write_command_with_response(Command.SET_BOX_MODE, val)
-
-    def set_light_mode_vj(self, pattern: int) -> ResponsePacket:
-        if pattern < 0 or pattern > 15:
-            raise ValueError("pattern id out of range")
-
-        val = bytes([BoxMode.SPECIAL.value, pattern])
-        return self.write_command_with_response(Command.SET_BOX_MODE, val)
+        response = self.transceive(packet)
+        if response is None:
+            if need_response:
+                raise CommandNoReplyException(f"expected a reply to command {cmd.value}")
+            return None
+
+        return ResponsePacket.parse(self.command_parser, response)
+
+    def get_box_mode(self) -> GetBoxMode:
+        # always wait for this one, even in pipeline mode
+        box_mode = self.wait(self.submit(Packet.build(Command.GET_BOX_MODE)))
+        assert isinstance(box_mode, GetBoxMode)
+        self.state.seed(box_mode)
+        return box_mode
@@ -0,0 +1,225 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import abc
+from datetime import datetime
+from typing import Any, Optional, Union
+
+from .command import ActivatedModes, BoxMode, Command, GetBoxMode, LightMode, TimeType
+from .command_base import CommandBase
+from .packet import BuiltPacket, Packet
+from .packet_template import PacketTable, PacketTemplate
+
+
+class PixooBase(abc.ABC):
+    """
+    Payloads of all commands the Pixoo understands.
+
+    Subclasses decide how a command is sent. The command methods return whatever write_command returns,
+    so with AsyncPixoo they return awaitables.
+
+    Setters of settings tracked in DeviceState are skipped if the device already acknowledged the same
+    payload, pass force=True to send them anyway.
+    """
+
+    # prebuilt packets of commands with a single byte payload, used by build_packet
+    packet_tables = {
+        Command.SET_SYSTEM_BRIGHTNESS.value: PacketTable(Command.SET_SYSTEM_BRIGHTNESS, 101),
+    }
+
+    # commands with a fixed payload layout that effect loops send over and over, see PacketTemplate
+    _score = PacketTemplate(Command.SET_BOX_MODE, bytes([BoxMode.WATCH] + [0] * 9), (2, 3, 4, 5))
+    _music_visualizer = PacketTemplate(Command.SET_BOX_MODE, bytes([BoxMode.MUSIC] + [0] * 9), (1,))
+    _system_color = PacketTemplate(Command.SET_SYSTEM_COLOR, bytes(3), (0, 1, 2))
+    _sleep_color = PacketTemplate(Command.SET_SLEEP_COLOR, bytes(3), (0, 1, 2))
+    _light_mode_clock = PacketTemplate(
+        Command.SET_BOX_MODE, bytes([BoxMode.ENV, 1] + [0] * 8), (2, 3, 4, 5, 6, 7, 8, 9)
+    )
+    _light_mode_light = PacketTemplate(
+        Command.SET_BOX_MODE, bytes([BoxMode.LIGHT, 0, 0, 0, 0x14] + [0] * 5), (1, 2, 3, 6, 7, 8, 9)
+    )
+
+    @abc.abstractmethod
+    def write_command(
+        self,
+        cmd: CommandBase,
+        cmd_data: Optional[Union[bytes, int]] = None,
+        need_response: bool = False,
+        force: bool = False,
+    ) -> Any:
+        pass
+
+    @abc.abstractmethod
+    def get_box_mode(self) -> Any:
+        pass
+
+    def write_packet(
+        self, cmd: CommandBase, packet: BuiltPacket, need_response: bool = False, force: bool = False
+    ) -> Any:
+        """
+        like write_command but with the complete packet, e.g. from a PacketTemplate
+
+        Subclasses that don't send packets themselves get its payload passed to write_command.
+        """
+        return self.write_command(cmd, packet[4:-3], need_response=need_response, force=force)
+
+    def build_packet(self, cmd: CommandBase, cmd_data: Optional[Union[bytes, int]] = None) -> BuiltPacket:
+        """Packet.build, using the prebuilt packet if there is one"""
+        table = self.packet_tables.get(cmd.value)
+        if table is not None and isinstance(cmd_data, int):
+            packet = table.get(cmd_data)
+            if packet is not None:
+                return packet
+
+        return Packet.build(cmd, cmd_data)
+
+    def write_command_with_response(
+        self, cmd: CommandBase, cmd_data: Optional[Union[bytes, int]] = None, force: bool = False
+    ) -> Any:
+        return self.write_command(cmd, cmd_data, need_response=True, force=force)
+
+    def set_brightness(self, percent: int, force: bool = False) -> Any:
+        if not (0 <= percent <= 100):
+            raise ValueError("out of range")
+
+        return self.write_command_with_response(Command.SET_SYSTEM_BRIGHTNESS, percent, force=force)
+
+    def set_score(self, blue_score: int, red_score: int, force: bool = False) -> Any:
+        rs_lo = red_score & 0xFF
+        rs_hi = (red_score >> 8) & 0xFF
+        bs_lo = blue_score & 0xFF
+        bs_hi = (blue_score >> 8) & 0xFF
+        packet = self._score.build(rs_lo, rs_hi, bs_lo, bs_hi)
+        return self.write_packet(Command.SET_BOX_MODE, packet, need_response=True, force=force)
+
+    def set_music_visualizer(self, visualizer: int, force: bool = False) -> Any:
+        if not (0 <= visualizer <= 11):
+            raise ValueError("visualizer id out of range")
+
+        packet = self._music_visualizer.build(visualizer & 0xFF)
+        return self.write_packet(Command.SET_BOX_MODE, packet, need_response=True, force=force)
+
+    def set_time(self, ts: Optional[datetime] = None) -> Any:
+        if ts is None:
+            ts = datetime.now()
+
+        year = ts.year
+        month = ts.month
+        day_of_month = ts.day
+        hours = ts.hour
+        minutes = ts.minute
+        seconds = ts.second
+        day_of_week = ts.isoweekday() % 7
+
+        val = bytes(
+            [
+                int(year % 100),
+                int(year / 100),
+                month,  # 1 to 12
+                day_of_month,  # 1 to 31
+                hours,
+                minutes,
+                seconds,
+                day_of_week,  # 0=sun, 1=mon, ..6=sat
+            ]
+        )
+        return self.write_command_with_response(Command.SET_TIME, val)
+
+    def set_game(self, enable: bool, game: int) -> Any:
+        if not (0 <= game <= 8):
+            raise ValueError("game id out of range")
+
+        val = bytes([int(enable), game])
+        return self.write_command_with_response(Command.SET_GAME, val)
+
+    def set_system_color(self, r: int, g: int, b: int, force: bool = False) -> Any:
+        packet = self._system_color.build(r & 0xFF, g & 0xFF, b & 0xFF)
+        return self.write_packet(Command.SET_SYSTEM_COLOR, packet, need_response=True, force=force)
+
+    def set_sleep_color(self, r: int, g: int, b: int) -> Any:
+        packet = self._sleep_color.build(r & 0xFF, g & 0xFF, b & 0xFF)
+        return self.write_packet(Command.SET_SLEEP_COLOR, packet)
+
+    def set_light_mode_clock(
+        self,
+        time_type: TimeType,
+        red: int,
+        green: int,
+        blue: int,
+        modes: Optional[ActivatedModes] = None,
+        force: bool = False,
+    ) -> Any:
+        if modes is None:
+            modes = ActivatedModes.get_default()
+
+        packet = self._light_mode_clock.build(
+            time_type.value,
+            int(modes.clock),
+            int(modes.weather),
+            int(modes.temperature),
+            int(modes.date),
+            red,
+            green,
+            blue,
+        )
+        return self.write_packet(Command.SET_BOX_MODE, packet, need_response=True, force=force)
+
+    def set_light_mode_temperature(self, box_mode: GetBoxMode, force: bool = False) -> Any:
+        val = bytes(
+            [
+                LightMode.TEMPERATURE.value,
+                box_mode.temp_type,
+                box_mode.temp_r,
+                box_mode.temp_g,
+                box_mode.temp_b,
+                0,
+            ]
+        )
+        return self.write_command_with_response(Command.SET_BOX_MODE, val, force=force)
+
+    def send_app_newest_time(self, value: Optional[bool]) -> Any:
+        if value is None:
+            data = -1 & 0xFF
+        else:
+            data = int(value)
+        return self.write_command(Command.SEND_APP_NEWEST_TIME, data)
+
+    def set_light_mode_light(
+        self,
+        red: int,
+        green: int,
+        blue: int,
+        modes: Optional[ActivatedModes] = None,
+        force: bool = False,
+    ) -> Any:
+        if modes is None:
+            modes = ActivatedModes.get_default()
+
+        packet = self._light_mode_light.build(
+            red,
+            green,
+            blue,
+            int(modes.clock),
+            int(modes.weather),
+            int(modes.temperature),
+            int(modes.date),
+        )
+        return self.write_packet(Command.SET_BOX_MODE, packet, need_response=True, force=force)
+
+    def set_light_mode_vj(self, pattern: int, force: bool = False) -> Any:
+        if pattern < 0 or pattern > 15:
+            raise ValueError("pattern id out of range")
+
+        val = bytes([BoxMode.SPECIAL.value, pattern])
+        return self.write_command_with_response(Command.SET_BOX_MODE, val, force=force)
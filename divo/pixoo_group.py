@@ -0,0 +1,153 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Union
+
+from loguru import logger
+
+from .bluetooth_socket import BluetoothSocket
+from .command import CommandParser
+from .command_base import CommandBase
+from .evo_encoder import EvoEncoder
+from .evo_pixmap import RawPixmap
+from .exceptions import DivoException, PacketWriteException
+from .packet import BuiltPacket, Packet
+from .pixoo import Pixoo
+from .pixoo_base import PixooBase
+
+
+class MemberResult(NamedTuple):
+    name: str
+    # response of the device, None if there was an error
+    result: Any
+    error: Optional[Exception]
+    # seconds until the device acknowledged
+    latency: float
+
+
+def connect_bluetooth(mac_address: str) -> Pixoo:
+    return Pixoo(BluetoothSocket(mac_address, socket_timeout=2.0))
+
+
+class PixooGroup(PixooBase):
+    """
+    Send the same commands and frames to several Pixoos at once.
+
+    Packets are built and images encoded once, then written to all members concurrently, one worker thread
+    per device. A device that fails doesn't stop the others: the command methods of PixooBase return a
+    MemberResult per member with its response or error and latency.
+    """
+
+    def __init__(self, members: Mapping[str, Pixoo]) -> None:
+        """
+        :param members: connected devices by name, e.g. MAC address
+        """
+        self.members = dict(members)
+        self.command_parser = CommandParser()
+        self.locks = {name: threading.Lock() for name in self.members}
+        self.pool = ThreadPoolExecutor(max_workers=max(len(self.members), 1), thread_name_prefix="pixoo-group")
+
+    @classmethod
+    def connect(
+        cls, mac_addresses: Sequence[str], connect: Callable[[str], Pixoo] = connect_bluetooth
+    ) -> "PixooGroup":
+        """
+        connect to all devices in parallel, devices that can't be connected are left out
+
+        :param mac_addresses: devices to connect to
+        :param connect: creates the connected Pixoo for an address
+        """
+        members: Dict[str, Pixoo] = {}
+        with ThreadPoolExecutor(max_workers=max(len(mac_addresses), 1)) as pool:
+            futures = {mac: pool.submit(connect, mac) for mac in mac_addresses}
+            for mac, future in futures.items():
+                try:
+                    members[mac] = future.result()
+                except (DivoException, OSError) as e:
+                    logger.error(f"couldn't connect to {mac}: {e!r}")
+
+        return cls(members)
+
+    def __enter__(self) -> "PixooGroup":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.pool.shutdown()
+
+    def _call(self, name: str, fn: Callable[[Pixoo], Any]) -> MemberResult:
+        start = time.perf_counter()
+        try:
+            with self.locks[name]:
+                result = fn(self.members[name])
+        except Exception as e:  # pylint: disable=broad-except
+            # one member must not fail the whole broadcast
+            logger.error(f"{name} failed: {e!r}")
+            return MemberResult(name, None, e, time.perf_counter() - start)
+
+        return MemberResult(name, result, None, time.perf_counter() - start)
+
+    def broadcast(self, fn: Callable[[Pixoo], Any]) -> List[MemberResult]:
+        """
+        call fn with every member concurrently
+
+        :return: result per member, in the order of members
+        """
+        futures = [self.pool.submit(self._call, name, fn) for name in self.members]
+        return [f.result() for f in futures]
+
+    def write(self, data: bytes) -> List[MemberResult]:
+        """send a raw packet to all members, it's validated once instead of by every member"""
+        if not isinstance(data, BuiltPacket):
+            if not Packet.is_valid(self.command_parser, data):
+                raise PacketWriteException("tried to send invalid packet")
+            data = BuiltPacket(data)
+
+        return self.broadcast(lambda d: d.write(data))
+
+    def write_each(self, packets: Mapping[str, BuiltPacket]) -> List[MemberResult]:
+        """
+        send a different packet to each of the given members concurrently, e.g. the tiles of a VideoWall
+
+        :return: result per member, in the order of packets
+        """
+        futures = [self.pool.submit(self._call, name, partial(Pixoo.write, data=p)) for name, p in packets.items()]
+        return [f.result() for f in futures]
+
+    def write_command(
+        self,
+        cmd: CommandBase,
+        cmd_data: Optional[Union[bytes, int]] = None,
+        need_response: bool = False,
+        force: bool = False,
+    ) -> List[MemberResult]:
+        return self.write_packet(cmd, self.build_packet(cmd, cmd_data), need_response=need_response, force=force)
+
+    def write_packet(
+        self, cmd: CommandBase, packet: BuiltPacket, need_response: bool = False, force: bool = False
+    ) -> List[MemberResult]:
+        return self.broadcast(lambda d: d.write_packet(cmd, packet, need_response=need_response, force=force))
+
+    def get_box_mode(self) -> List[MemberResult]:
+        return self.broadcast(lambda d: d.get_box_mode())
+
+    def send_image(self, pixmap: RawPixmap) -> List[MemberResult]:
+        """encode the pixmap once and show it on all members"""
+        return self.write(EvoEncoder.image_bytes_rgb(pixmap.rgb_buffer()))
@@ -0,0 +1,155 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import struct
+import time
+from typing import IO, Any, Callable, Iterable, Iterator, NamedTuple, Optional
+
+from loguru import logger
+from PIL import Image
+
+from .evo_pixmap import RawPixmap
+from .helpers import ReadableBuffer
+
+FORMATS = ("raw", "png")
+
+
+class StreamStats(NamedTuple):
+    read: int
+    sent: int
+    unchanged: int
+    elapsed: float
+
+
+class FrameStream:
+    """
+    Read frames from a pipe or file.
+
+    raw: RGB24 frames of width * height * 3 bytes, e.g. from ffmpeg -f rawvideo -pix_fmt rgb24
+    png: PNG images each prefixed with its length as 4 byte big endian integer, scaled to fit
+
+    Every frame is read into the same buffer, so memory use doesn't grow with the stream length.
+    """
+
+    _length = struct.Struct(">I")
+
+    # larger PNG frames are refused, a garbage length prefix mustn't allocate gigabytes
+    MAX_PNG_SIZE = 4 << 20
+
+    def __init__(
+        self, f: IO[bytes], fmt: str = "raw", width: int = 16, height: int = 16, max_png_size: int = MAX_PNG_SIZE
+    ) -> None:
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown stream format: {fmt}")
+
+        self.f = f
+        self.fmt = fmt
+        self.max_png_size = max_png_size
+        self.pixmap = RawPixmap(width, height)
+        self.frame_size = width * height * 3
+
+        self.buf = bytearray(self.frame_size if fmt == "raw" else self._length.size)
+
+    def read_exactly(self, view: memoryview) -> bool:
+        """
+        fill view, pipes may return less than asked for
+
+        :return: False if the stream ended first
+        """
+        pos = 0
+        while pos < len(view):
+            count = self.f.readinto(view[pos:])  # type: ignore
+            if not count:
+                if pos:
+                    logger.warning(f"stream ended in the middle of a frame, {pos} of {len(view)} bytes read")
+                return False
+            pos += count
+        return True
+
+    def frames(self) -> Iterator[memoryview]:
+        """
+        :return: RGB data of each frame, only valid until the next frame is read
+        :raises ValueError: if a PNG frame is larger than max_png_size, the stream is out of sync then
+        """
+        if self.fmt == "raw":
+            view = memoryview(self.buf)
+            while self.read_exactly(view):
+                yield view
+            return
+
+        while self.read_exactly(memoryview(self.buf)[: self._length.size]):
+            (length,) = self._length.unpack_from(self.buf)
+            if length > self.max_png_size:
+                raise ValueError(f"PNG frame of {length} bytes is larger than {self.max_png_size} bytes")
+            if length > len(self.buf):
+                self.buf.extend(bytes(length - len(self.buf)))
+            data = memoryview(self.buf)[:length]
+            if not self.read_exactly(data):
+                return
+
+            with Image.open(io.BytesIO(data)) as image:
+                self.pixmap.set_image(image)
+            # the buffer can't grow while it's exported
+            data.release()
+
+            yield self.pixmap.rgb_buffer()
+
+
+def play_stream(
+    frames: Iterable[ReadableBuffer],
+    show: Callable[[ReadableBuffer], Any],
+    fps: float = 10.0,
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep,
+) -> StreamStats:
+    """
+    show frames at most fps times per second, frames equal to the one shown last are skipped
+
+    A producer that is faster than that is slowed down by the pipe filling up.
+
+    :param frames: RGB data per frame, e.g. FrameStream.frames()
+    :param show: called with the RGB data of each frame to show, e.g. to encode and send it
+    :param fps: maximum rate
+    """
+    if fps <= 0:
+        raise ValueError("fps must be positive")
+
+    interval = 1 / fps
+    previous: Optional[bytearray] = None
+    read = sent = unchanged = 0
+
+    start = clock()
+    next_frame = start
+    for frame in frames:
+        read += 1
+        if previous is not None and previous == frame:
+            unchanged += 1
+            continue
+
+        now = clock()
+        if now < next_frame:
+            sleep(next_frame - now)
+            now = next_frame
+
+        show(frame)
+        sent += 1
+        next_frame = now + interval
+
+        if previous is None:
+            previous = bytearray(frame)
+        else:
+            previous[:] = frame
+
+    return StreamStats(read, sent, unchanged, clock() - start)
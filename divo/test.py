@@ -14,13 +14,14 @@ this program. If not, see <http://www.gnu.org/licenses/>.
 
 import math
 from time import sleep
-from typing import Any, Tuple
+from typing import Any, Iterator, Tuple
 
 from loguru import logger
 
 from .command import ActivatedModes, Command, CommandParser, TimeType, WeatherType
 from .evo_encoder import EvoEncoder
 from .evo_pixmap import RawPixmap
+from .frame_scheduler import FrameScheduler
 from .packet import Packet, ResponsePacket
 from .pixoo import Pixoo
 
@@ -144,11 +145,13 @@ def test_pattern(test: int, d: Pixoo) -> None:
 
         d.set_light_mode_light(0xF8, 0x01, 0x79)
 
-        for h in range(0, 255, 5):
-            rgb = hsv_to_rgb(h, 1, 1)
-            r, g, b = [int(round(x * 255)) for x in rgb]
-            d.set_light_mode_light(r, g, b)
-            sleep(0.1)
+        # don't wait for each response before sending the next colour
+        with d.pipeline():
+            for h in range(0, 255, 5):
+                rgb = hsv_to_rgb(h, 1, 1)
+                r, g, b = [int(round(x * 255)) for x in rgb]
+                d.set_light_mode_light(r, g, b)
+                sleep(0.1)
     elif test == 9:
         logger.info("VJ test")
         d.send_app_newest_time(False)
@@ -189,11 +192,10 @@ def test_pattern(test: int, d: Pixoo) -> None:
 
         rp = RawPixmap(16, 16)
         img = rp.load_image("test.png")
-        pixels = rp.decode_image(img)
-        rp.set_rgb_pixels(pixels)
+        rp.set_image(img)
 
         ee = EvoEncoder()
-        x = ee.image_bytes(rp.get_pixel_data())
+        x = ee.image_bytes_rgb(rp.rgb_buffer())
         parse_packet(x)
         d.write(x)
     elif test == 13:
@@ -228,5 +230,19 @@ def test_pattern(test: int, d: Pixoo) -> None:
         val = bytes([0])
         d.write_command(Command.SET_24_HOUR, val)
         sleep(1)
+    elif test == 15:
+        logger.info("scrolling rainbow test")
+
+        def rainbow_frames(count: int) -> Iterator[RawPixmap]:
+            rp = RawPixmap(16, 16)
+            for i in range(count):
+                rp.scroll(-1, 0)
+                rgb = hsv_to_rgb((i * 10) % 360, 1, 1)
+                r, g, b = [int(round(x * 255)) for x in rgb]
+                rp.vline(15, 0, 16, (r, g, b))
+                yield rp
+
+        stats = FrameScheduler(d, fps=10).run(rainbow_frames(100))
+        logger.info(f"sent {stats.sent} frames at {stats.fps:.1f} frames/s, dropped {stats.dropped}")
     else:
         raise ValueError("invalid test id")
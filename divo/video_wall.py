@@ -0,0 +1,148 @@
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2021 spezifisch (https://github.com/spezifisch).
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation.
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from .evo_encoder import EvoEncoder
+from .evo_pixmap import RawPixmap
+from .packet import BuiltPacket
+from .pixoo_group import MemberResult, PixooGroup
+
+
+def encode_tile(rgb: bytes) -> bytes:
+    """EvoEncoder.image_bytes_rgb as plain bytes, to be run in a worker process"""
+    return bytes(EvoEncoder.image_bytes_rgb(rgb))
+
+
+class VideoWall:
+    """
+    Show one large canvas on a grid of Pixoos of a PixooGroup, each member showing one tile.
+
+    Only tiles that changed since they were last shown are encoded and sent. Encoding is done in a process
+    pool, all tiles are encoded before the first one is written so the members update at about the same
+    time.
+    """
+
+    def __init__(
+        self,
+        group: PixooGroup,
+        layout: Sequence[Sequence[str]],
+        tile_width: int = 16,
+        tile_height: int = 16,
+        processes: Optional[int] = None,
+    ) -> None:
+        """
+        :param group: connected members of the wall
+        :param layout: rows of member names from top left to bottom right, e.g. [["a", "b"], ["c", "d"]]
+        :param processes: worker processes for encoding, None for one per CPU up to the number of tiles,
+            0 encodes in this process which is also the default with a single CPU
+        """
+        if not layout or any(len(row) != len(layout[0]) for row in layout):
+            raise ValueError("layout has to be a non-empty grid")
+
+        self.group = group
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.columns = len(layout[0])
+        self.rows = len(layout)
+
+        # tile position in the canvas by member name
+        self.positions: Dict[str, Tuple[int, int]] = {}
+        for row, names in enumerate(layout):
+            for column, name in enumerate(names):
+                if name not in group.members:
+                    raise ValueError(f"{name} is not a member of the group")
+                self.positions[name] = (column * tile_width, row * tile_height)
+
+        # RGB data of the tile each member shows
+        self.shown: Dict[str, bytes] = {}
+
+        if processes is None:
+            # passing tiles to a single worker process is only overhead
+            cpus = os.cpu_count() or 1
+            processes = min(cpus, len(self.positions)) if cpus > 1 else 0
+        self.pool: Optional[Executor] = ProcessPoolExecutor(processes) if processes > 0 else None
+
+        self.canvas = RawPixmap(self.width, self.height)
+
+    @property
+    def width(self) -> int:
+        return self.columns * self.tile_width
+
+    @property
+    def height(self) -> int:
+        return self.rows * self.tile_height
+
+    def __enter__(self) -> "VideoWall":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown()
+
+    def tiles(self, canvas: RawPixmap) -> Dict[str, bytes]:
+        """:return: RGB data of every tile by member name"""
+        if canvas.width != self.width or canvas.height != self.height:
+            raise ValueError(f"expected a {self.width}x{self.height} canvas")
+
+        return {
+            name: canvas.crop_rgb(x, y, self.tile_width, self.tile_height) for name, (x, y) in self.positions.items()
+        }
+
+    def changed_tiles(self, canvas: RawPixmap) -> Dict[str, bytes]:
+        """:return: like tiles, only the ones that differ from what the members show"""
+        return {name: rgb for name, rgb in self.tiles(canvas).items() if self.shown.get(name) != rgb}
+
+    def encode(self, tiles: Dict[str, bytes]) -> Dict[str, BuiltPacket]:
+        if self.pool is None or len(tiles) < 2:
+            return {name: EvoEncoder.image_bytes_rgb(rgb) for name, rgb in tiles.items()}
+
+        packets = self.pool.map(encode_tile, tiles.values())
+        return {name: BuiltPacket(p) for name, p in zip(tiles, packets)}
+
+    def show(self, canvas: Optional[RawPixmap] = None, force: bool = False) -> List[MemberResult]:
+        """
+        send the tiles of the canvas that changed
+
+        :param canvas: defaults to the canvas of the wall
+        :param force: send all tiles, e.g. after the members showed something else
+        :return: result per member that was sent a tile, failed tiles are sent again next time
+        """
+        if canvas is None:
+            canvas = self.canvas
+
+        tiles = self.tiles(canvas) if force else self.changed_tiles(canvas)
+        if not tiles:
+            return []
+
+        results = self.group.write_each(self.encode(tiles))
+        for r in results:
+            if r.error is None:
+                self.shown[r.name] = tiles[r.name]
+            else:
+                self.shown.pop(r.name, None)
+
+        return results
+
+    def show_image(self, image: Image.Image, force: bool = False) -> List[MemberResult]:
+        """scale the image to fit the whole wall and show it"""
+        self.canvas.set_image(image)
+        return self.show(force=force)
@@ -0,0 +1,187 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from PIL import Image
+
+from divo.animation import AnimationDecoder, AnimationEncoder
+from divo.command import Command, CommandParser
+from divo.emulator import PixooEmulator
+from divo.evo_encoder import EvoEncoder
+from divo.evo_pixmap import RawPixmap
+from divo.exceptions import PacketParsingError
+from divo.packet import Packet
+
+
+def frame_pixels(count):
+    # enough distinct colours per frame to get a long animation
+    return [[(f << 16) | (i % 40) for i in range(256)] for f in range(count)]
+
+
+class TestAnimationEncoder(unittest.TestCase):
+    def test_encode_frame(self) -> None:
+        pixels = [0xFF0000] * 128 + [0x0000FF] * 128
+        frame = AnimationEncoder.encode_frame(pixels, 300)
+
+        still = EvoEncoder.encode_colour_bytes(pixels)
+        assert frame[:6] == b"\xaa" + len(frame).to_bytes(2, "little") + b"\x2c\x01\x00"
+        assert frame[6:] == still
+
+    def test_chunks(self) -> None:
+        packets = list(AnimationEncoder.encode((p, 100) for p in frame_pixels(3)))
+        assert len(packets) > 1
+
+        command_parser = CommandParser()
+        total = None
+        for index, p in enumerate(packets):
+            assert p[3] == Command.SET_MUL_BOX_COLOR
+            assert Packet.parse(command_parser, p) is not None
+
+            chunk = p[4:-3]
+            assert int.from_bytes(chunk[2:3], "little") == index
+            if total is None:
+                total = int.from_bytes(chunk[:2], "little")
+            assert int.from_bytes(chunk[:2], "little") == total
+            assert len(chunk) - 3 <= AnimationEncoder.CHUNK_SIZE
+
+    def test_too_long(self) -> None:
+        with self.assertRaises(ValueError):
+            list(AnimationEncoder.packets([b"\x00" * 0x10000]))
+
+    def test_max_chunks(self) -> None:
+        size = AnimationEncoder.MAX_CHUNKS * AnimationEncoder.CHUNK_SIZE
+        packets = list(AnimationEncoder.packets([b"\x00" * size]))
+        assert len(packets) == AnimationEncoder.MAX_CHUNKS
+        assert packets[-1][4 + 2] == AnimationEncoder.MAX_CHUNKS - 1
+
+        # the chunk number would overflow, this used to fail with struct.error
+        with self.assertRaisesRegex(ValueError, "animation too long"):
+            list(AnimationEncoder.packets([b"\x00" * (size + 1)]))
+
+    def test_image_frames(self) -> None:
+        gif = Image.new("RGB", (16, 16), (80, 0, 0))
+        gif.info["duration"] = 40
+        rp = RawPixmap(16, 16)
+
+        # PIL only sets up an ImageSequence for opened files, a still image is one frame
+        decoded = list(AnimationEncoder.iter_image_frames(gif, rp))
+        assert len(decoded) == 1
+        assert decoded[0][1] == 40
+        decoded = list(AnimationEncoder.iter_image_frames(gif, rp, 70))
+        assert decoded[0][1] == 70
+
+    def test_sprite_frames(self) -> None:
+        sheet = Image.new("RGB", (48, 32))
+        sheet.paste((255, 0, 0), (16, 0, 32, 16))
+        sheet.paste((0, 255, 0), (0, 16, 16, 32))
+        rp = RawPixmap(16, 16)
+
+        decoded = list(AnimationEncoder.iter_sprite_frames(sheet, rp, 16, 16))
+        assert len(decoded) == 6
+        assert all(d == AnimationEncoder.DEFAULT_DURATION for _, d in decoded)
+        assert set(decoded[0][0]) == {0}
+        assert set(decoded[1][0]) == {0xFF0000}
+        assert set(decoded[3][0]) == {0x00FF00}
+
+
+class TestAnimationDecoder(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        pixels = frame_pixels(4)
+        packets = list(AnimationEncoder.encode((p, 50 * i) for i, p in enumerate(pixels)))
+
+        decoder = AnimationDecoder()
+        frames = []
+        for p in packets:
+            assert not decoder.complete
+            frames += decoder.feed(p[4:-3])
+        assert decoder.complete
+
+        assert [f.duration for f in frames] == [0, 50, 100, 150]
+        for frame, expected in zip(frames, pixels):
+            palette, indices = EvoEncoder.index_colours(expected)
+            encoded = EvoEncoder.encode_colour_bytes(expected)
+            assert frame.palette == encoded[1 : 1 + 3 * len(palette)]
+            assert frame.image == encoded[1 + 3 * len(palette) :]
+
+    def test_out_of_order(self) -> None:
+        packets = list(AnimationEncoder.encode((p, 100) for p in frame_pixels(2)))
+        chunks = [p[4:-3] for p in packets]
+
+        decoder = AnimationDecoder()
+        frames = list(decoder.feed(chunks[1]))
+        assert frames == []
+        for c in [chunks[0]] + chunks[2:]:
+            frames += decoder.feed(c)
+        assert decoder.complete
+        assert len(frames) == 2
+
+    def test_full_palette(self) -> None:
+        pixels = list(range(256))
+        packets = list(AnimationEncoder.encode([(pixels, 100)]))
+
+        decoder = AnimationDecoder()
+        frames = [f for p in packets for f in decoder.feed(p[4:-3])]
+        assert len(frames) == 1
+        assert len(frames[0].palette) == 3 * 256
+        assert len(frames[0].image) == 256
+
+    def test_bad_data(self) -> None:
+        decoder = AnimationDecoder()
+        with self.assertRaises(PacketParsingError):
+            list(decoder.feed(b"\x01"))
+        with self.assertRaises(PacketParsingError):
+            list(decoder.feed(b"\x08\x00\x00\xbb\x08\x00\x00\x00\x00\x00"))
+
+        decoder = AnimationDecoder()
+        list(decoder.feed(b"\x10\x00\x00"))
+        with self.assertRaises(PacketParsingError):
+            list(decoder.feed(b"\x11\x00\x01"))
+
+        # a frame that isn't longer than its header
+        decoder = AnimationDecoder()
+        with self.assertRaises(PacketParsingError):
+            list(decoder.feed(b"\x08\x00\x00\xaa\x06\x00\x00\x00\x00\x00"))
+
+
+class TestEmulatorAnimation(unittest.TestCase):
+    def test_receive(self) -> None:
+        pixels = frame_pixels(3)
+        e = PixooEmulator()
+        for p in AnimationEncoder.encode((p, 100) for p in pixels):
+            e.feed(p)
+
+        assert e.errors == 0
+        assert len(e.animation) == 3
+        assert repr(e.framebuffer.buf[0][5]) == "Color(0, 0, 5)"
+        assert repr(e.framebuffer.buf[1][0]) == "Color(0, 0, 16)"
+
+    def test_short_last_chunk(self) -> None:
+        # 3 frames of one colour and one of three colours are 206 bytes, the last chunk has only 6 of them
+        pixels = [[0] * 256] * 3 + [[i % 3 for i in range(256)]]
+        packets = list(AnimationEncoder.encode((p, 100) for p in pixels))
+        assert len(packets[-1]) == Packet.size_for(3 + 6)
+
+        parser = CommandParser()
+        assert all(Packet.parse(parser, p) is not None for p in packets)
+
+        e = PixooEmulator()
+        for p in packets:
+            e.feed(p)
+        assert e.errors == 0
+        assert len(e.animation) == 4
@@ -0,0 +1,143 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from divo.asset_pack import Asset, AssetPack, encode_directory, encode_file
+from divo.emulator import LoopbackTransport
+from divo.evo_encoder import EvoEncoder
+from divo.exceptions import AssetPackException
+from divo.packet import Packet
+from divo.pixoo import Pixoo
+
+
+class TestAssetPack(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        self.source = os.path.join(self.tmp.name, "assets")
+        os.makedirs(os.path.join(self.source, "icons"))
+        Image.new("RGB", (16, 16), (255, 0, 0)).save(os.path.join(self.source, "icons", "red.png"))
+        Image.new("RGB", (32, 32), (0, 0, 255)).save(os.path.join(self.source, "blue.png"))
+        frames = [Image.new("RGB", (16, 16), (0, 60 * i, 0)) for i in range(3)]
+        frames[0].save(
+            os.path.join(self.source, "anim.gif"), save_all=True, append_images=frames[1:], duration=[100, 200, 300]
+        )
+        with open(os.path.join(self.source, "notes.txt"), "w") as f:
+            f.write("not an image")
+
+        self.path = os.path.join(self.tmp.name, "assets.pack")
+
+    def test_encode(self) -> None:
+        assets = list(encode_directory(self.source))
+        assert [a.name for a in assets] == ["anim", "blue", "icons/red"]
+        assert assets[0].durations == (100, 200, 300)
+        assert assets[1].durations == ()
+
+        red = encode_file(os.path.join(self.source, "icons", "red.png"))
+        assert red.name == "red"
+        assert red.packets == [EvoEncoder.image_bytes_rgb(bytes([255, 0, 0]) * 256)]
+
+    def test_name_clash(self) -> None:
+        Image.new("RGB", (16, 16)).save(os.path.join(self.source, "blue.gif"))
+        with self.assertRaisesRegex(ValueError, "both be named blue"):
+            list(encode_directory(self.source))
+
+    def test_round_trip(self) -> None:
+        assets = list(encode_directory(self.source))
+        entries = AssetPack.write(self.path, assets)
+
+        with AssetPack(self.path) as pack:
+            assert len(pack) == 3
+            assert "icons/red" in pack
+            assert "red" not in pack
+            assert list(pack.entries.values()) == entries
+            assert pack.entries["anim"].duration == 600
+
+            for a in assets:
+                packets = pack.packets(a.name)
+                assert all(isinstance(p, memoryview) for p in packets)
+                assert [bytes(p) for p in packets] == a.packets
+
+            with self.assertRaises(KeyError):
+                pack.data("missing")
+
+    def test_permissions(self) -> None:
+        umask = os.umask(0o022)
+        try:
+            AssetPack.write(self.path, [Asset("a", [EvoEncoder.image_bytes([0] * 256)])])
+        finally:
+            os.umask(umask)
+        assert os.stat(self.path).st_mode & 0o777 == 0o644
+
+    def test_send(self) -> None:
+        AssetPack.write(self.path, encode_directory(self.source))
+        bt = LoopbackTransport()
+        d = Pixoo(bt)
+
+        with AssetPack(self.path) as pack:
+            pack.send(d, "icons/red")
+            assert repr(bt.emulator.framebuffer.buf[0][0]) == "Color(255, 0, 0)"
+
+            # validated when opening the pack, not again for every packet sent
+            with mock.patch.object(Packet, "is_valid") as is_valid:
+                pack.send(d, "anim")
+            assert not is_valid.called
+            assert [f.duration for f in bt.emulator.animation] == [100, 200, 300]
+            assert bt.emulator.errors == 0
+
+    def test_close_with_views(self) -> None:
+        AssetPack.write(self.path, [Asset("a", [EvoEncoder.image_bytes([0] * 256)])])
+        pack = AssetPack(self.path)
+        packets = pack.packets("a")
+        pack.close()
+        assert packets[0][0] == 1
+
+    def test_invalid(self) -> None:
+        with self.assertRaises(ValueError):
+            AssetPack.write(self.path, [Asset("a", []), Asset("a", [])])
+
+        for data in (b"", b"DIVOPACK", b"NOTAPACK\x01\x00\x00\x00\x00\x00"):
+            with open(self.path, "wb") as f:
+                f.write(data)
+            with self.assertRaises(AssetPackException):
+                AssetPack(self.path)
+
+        AssetPack.write(self.path, [Asset("a", [EvoEncoder.image_bytes([0] * 256)])])
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with self.assertRaises(AssetPackException):
+            AssetPack(self.path)
+
+        AssetPack.write(self.path, [Asset("a", [EvoEncoder.image_bytes([0] * 256)])])
+        with open(self.path, "r+b") as f:
+            # checksum of the packet
+            f.seek(-2, os.SEEK_END)
+            f.write(b"\x00")
+        with self.assertRaisesRegex(AssetPackException, "broken packet"):
+            AssetPack(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
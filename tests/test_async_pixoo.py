@@ -0,0 +1,171 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import asyncio
+import unittest
+from typing import Any, Dict, List, Optional
+
+from divo.async_bluetooth_base import AsyncBluetoothBase
+from divo.async_pixoo import AsyncPixoo
+from divo.command import Command, GetBoxMode
+from divo.exceptions import CommandNoReplyException, NotConnectedException
+from divo.packet import Packet
+
+
+def response_for(cmd: int, data: bytes = b"") -> bytes:
+    size = 3 + len(data)
+    return bytes([1, size & 0xFF, size >> 8, 4, cmd, 0x55]) + data + b"\x02"
+
+
+class FakeAsyncBluetooth(AsyncBluetoothBase):
+    """answers every command, optionally holding back responses until `release` is called"""
+
+    def __init__(self, hold: int = 0, answers: bool = True, data: Optional[Dict[int, bytes]] = None) -> None:
+        self.hold = hold
+        self.answers = answers
+        self.data = data or {}
+        self.held: List[bytes] = []
+        self.written: List[bytes] = []
+        self.closed = False
+        self.rx: "asyncio.Queue[bytes]" = asyncio.Queue()
+
+    async def connect(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        self.closed = True
+
+    async def write(self, data: bytes) -> int:
+        self.written.append(data)
+        if self.answers:
+            self.held.append(response_for(data[3], self.data.get(data[3], b"")))
+            if len(self.held) > self.hold:
+                self.release()
+        return len(data)
+
+    def release(self) -> None:
+        # deliver in reverse order, split into small chunks
+        data = b"".join(reversed(self.held))
+        self.held.clear()
+        for i in range(0, len(data), 5):
+            self.rx.put_nowait(data[i : i + 5])
+
+    async def read(self, count: int) -> bytes:
+        return await self.rx.get()
+
+
+class TestAsyncPixoo(unittest.TestCase):
+    def run_async(self, coro: Any) -> Any:
+        return asyncio.get_event_loop().run_until_complete(coro)
+
+    def setUp(self) -> None:
+        asyncio.set_event_loop(asyncio.new_event_loop())
+
+    def tearDown(self) -> None:
+        asyncio.get_event_loop().close()
+
+    def test_commands(self) -> None:
+        async def run() -> None:
+            bt = FakeAsyncBluetooth()
+            async with AsyncPixoo(bt) as d:
+                assert await d.set_brightness(23) is None
+                assert await d.set_sleep_color(1, 2, 3) is None
+            assert bt.written == [
+                Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23),
+                Packet.build(Command.SET_SLEEP_COLOR, b"\x01\x02\x03"),
+            ]
+            assert bt.closed
+
+        self.run_async(run())
+
+    def test_skip_redundant(self) -> None:
+        async def run() -> None:
+            bt = FakeAsyncBluetooth()
+            async with AsyncPixoo(bt) as d:
+                await d.set_system_color(1, 2, 3)
+                await d.set_system_color(1, 2, 3)
+                await d.set_system_color(1, 2, 3, force=True)
+                assert len(bt.written) == 2
+                assert d.state.skipped[Command.SET_SYSTEM_COLOR] == 1
+
+        self.run_async(run())
+
+    def test_concurrent_out_of_order(self) -> None:
+        async def run() -> None:
+            box_mode = bytes(range(16))
+            bt = FakeAsyncBluetooth(hold=2, data={Command.GET_BOX_MODE: box_mode})
+            async with AsyncPixoo(bt) as d:
+                results = await asyncio.gather(
+                    d.transceive(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)),
+                    d.get_box_mode(),
+                    d.transceive(Packet.build(Command.SET_SYSTEM_COLOR, b"\x01\x02\x03")),
+                )
+            assert len(bt.written) == 3
+            assert results[0] == response_for(Command.SET_SYSTEM_BRIGHTNESS)
+            assert isinstance(results[1], GetBoxMode)
+            assert results[1].temp_b == 15
+            assert results[2] == response_for(Command.SET_SYSTEM_COLOR)
+
+        self.run_async(run())
+
+    def test_timeout(self) -> None:
+        async def run() -> None:
+            async with AsyncPixoo(FakeAsyncBluetooth(answers=False), response_timeout=0.01) as d:
+                assert await d.transceive(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)) is None
+                with self.assertRaises(CommandNoReplyException):
+                    await d.set_brightness(23)
+
+        self.run_async(run())
+
+    def test_connection_closed(self) -> None:
+        async def run() -> None:
+            bt = FakeAsyncBluetooth(answers=False)
+            async with AsyncPixoo(bt) as d:
+                task = asyncio.ensure_future(d.set_system_color(1, 2, 3))
+                await asyncio.sleep(0)
+                bt.rx.put_nowait(b"")
+                with self.assertRaises(CommandNoReplyException):
+                    await task
+
+        self.run_async(run())
+
+    def test_write_error(self) -> None:
+        class FailingBluetooth(FakeAsyncBluetooth):
+            fail = True
+
+            async def write(self, data: bytes) -> int:
+                if self.fail:
+                    self.fail = False
+                    raise OSError("connection reset")
+                return await super().write(data)
+
+        async def run() -> None:
+            async with AsyncPixoo(FailingBluetooth(), response_timeout=1.0) as d:
+                with self.assertRaises(OSError):
+                    await d.transceive(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23))
+                assert not d.pending[Command.SET_SYSTEM_BRIGHTNESS]
+
+                response = await d.transceive(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 42))
+                assert response == response_for(Command.SET_SYSTEM_BRIGHTNESS)
+
+        self.run_async(run())
+
+    def test_not_connected(self) -> None:
+        d = AsyncPixoo(FakeAsyncBluetooth())
+        with self.assertRaises(NotConnectedException):
+            self.run_async(d.set_brightness(23))
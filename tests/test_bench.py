@@ -0,0 +1,85 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import json
+import unittest
+
+from loguru import logger
+
+from divo import bench
+
+
+class TestBench(unittest.TestCase):
+    def setUp(self) -> None:
+        logger.disable("divo")
+
+    def tearDown(self) -> None:
+        logger.enable("divo")
+
+    def test_percentile(self) -> None:
+        samples = [float(i) for i in range(100)]
+        assert bench.percentile(samples, 0.5) == 50.0
+        assert bench.percentile(samples, 0.99) == 99.0
+        assert bench.percentile(samples, 1.0) == 99.0
+        assert bench.percentile([3.0], 0.9) == 3.0
+
+    def test_measure(self) -> None:
+        calls = []
+        result = bench.measure("append", lambda: calls.append(bytearray(1000)), min_time=0.01, max_ops=50)
+
+        assert result.name == "append"
+        # warm up and memory run come on top
+        assert result.ops == 50
+        assert len(calls) == 52
+        assert result.ops_per_sec > 0
+        assert result.p50_us <= result.p90_us <= result.p99_us
+        assert result.peak_memory >= 1000
+
+    def test_run_all(self) -> None:
+        results = bench.run(min_time=0.001)
+        assert [r.name for r in results] == list(bench.benchmarks())
+        assert all(r.ops_per_sec > 0 for r in results)
+
+    def test_json_compare(self) -> None:
+        results = bench.run(["packet.build", "send.light_mode"], min_time=0.01)
+        baseline = json.loads(bench.to_json(results))
+        assert baseline["version"] == bench.FORMAT_VERSION
+        assert baseline["results"]["packet.build"]["ops"] == results[0].ops
+
+        assert bench.compare(results, baseline) == []
+
+        # twice as fast before
+        baseline["results"]["packet.build"]["ops_per_sec"] *= 2
+        regressions = bench.compare(results, baseline, threshold=0.3)
+        assert len(regressions) == 1
+        assert regressions[0].startswith("packet.build: ")
+        assert bench.compare(results, baseline, threshold=0.6) == []
+
+        # benchmarks missing in the baseline are ignored
+        del baseline["results"]["send.light_mode"]
+        assert len(bench.compare(results, baseline, threshold=0.3)) == 1
+
+        baseline["version"] = 0
+        with self.assertRaises(ValueError):
+            bench.compare(results, baseline)
+
+    def test_format_table(self) -> None:
+        results = bench.run(["packet.build"], min_time=0.001)
+        lines = bench.format_table(results).splitlines()
+        assert len(lines) == 2
+        assert lines[1].startswith("packet.build ")
@@ -106,6 +106,11 @@ class TestBluetoothSocket(unittest.TestCase):
                 mock_sock.return_value.recv.assert_called_once_with(count)
                 assert received_data == data
 
+                s.close()
+                mock_sock.return_value.close.assert_called_once_with()
+                assert s.sock is None
+                s.close()
+
             # test timeout setting
             with patch("socket.socket", autospec=True) as mock_sock:
                 timeout = 123.45
@@ -0,0 +1,110 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from typing import Any
+from unittest import mock
+
+from divo.command import (
+    ActivatedModes,
+    AnimationChunk,
+    Command,
+    CommandParser,
+    GetBoxMode,
+    SetBoxColor,
+    SetMulBoxColor,
+)
+from divo.evo_encoder import EvoEncoder
+from divo.exceptions import PacketParsingError
+from divo.packet import Packet, ResponsePacket
+
+
+class Custom:
+    __slots__ = ("value",)
+
+    @classmethod
+    def from_data(cls, data: Any) -> "Custom":
+        c = cls()
+        c.value = bytes(data)
+        return c
+
+
+class TestCommandParser(unittest.TestCase):
+    def test_unknown(self) -> None:
+        assert CommandParser.parse(0x42, b"\x17") is None
+        assert CommandParser.parse_response(0x42, b"\x17") is None
+
+    def test_register(self) -> None:
+        with mock.patch.dict(CommandParser.parsers), mock.patch.dict(CommandParser.response_parsers):
+            CommandParser.register(0x42, Custom.from_data)
+            CommandParser.register(0x42, Custom.from_data, response=True)
+
+            cmd = Packet.parse(CommandParser, EvoEncoder.encode_bytes(b"\x42\x17"))
+            assert isinstance(cmd, Custom)
+            assert cmd.value == b"\x17"
+
+            response = CommandParser.parse_response(0x42, b"\x23")
+            assert isinstance(response, Custom)
+
+        assert 0x42 not in CommandParser.parsers
+
+    def test_get_box_mode(self) -> None:
+        raw = ResponsePacket.build(Command.GET_BOX_MODE, bytes(range(16)))
+        box_mode = ResponsePacket.parse(CommandParser, raw)
+        assert isinstance(box_mode, GetBoxMode)
+        assert [getattr(box_mode, name) for name in GetBoxMode.FIELDS] == list(range(16))
+        assert box_mode.level == 6
+        assert box_mode.light_level == 0
+
+    def test_short_payloads(self) -> None:
+        for cmd_type, data in (
+            (Command.SET_BOX_COLOR, bytes(10)),
+            (Command.SET_MUL_BOX_COLOR, b""),
+            (Command.SET_MUL_BOX_COLOR, bytes(9)),
+        ):
+            with self.assertRaises(PacketParsingError):
+                CommandParser.parse(cmd_type, data)
+        with self.assertRaises(PacketParsingError):
+            CommandParser.parse_response(Command.GET_BOX_MODE, bytes(15))
+
+        # invalid, not an exception escaping from the parser
+        packet = ResponsePacket.build(Command.GET_BOX_MODE, bytes(3))
+        assert ResponsePacket.is_valid(CommandParser, packet) is False
+
+    def test_set_box_color(self) -> None:
+        data = bytes(10) + b"\x02" + b"\x11" * 6 + b"\x55"
+        cmd = CommandParser.parse(Command.SET_BOX_COLOR, data)
+        assert type(cmd) is SetBoxColor
+        assert cmd.palette == b"\x11" * 6
+        assert cmd.image == b"\x55"
+
+        cmd = CommandParser.parse(Command.SET_MUL_BOX_COLOR, data[1:])
+        assert type(cmd) is SetMulBoxColor
+        assert cmd.palette == b"\x11" * 6
+        assert cmd.image == b"\x55"
+
+    def test_animation_chunk(self) -> None:
+        # continuation chunks can be shorter than the header of the first one
+        cmd = CommandParser.parse(Command.SET_MUL_BOX_COLOR, b"\xce\x00\x01\x01\x02")
+        assert type(cmd) is AnimationChunk
+        assert (cmd.total, cmd.index, cmd.data) == (206, 1, b"\x01\x02")
+
+    def test_slots(self) -> None:
+        for record in (ActivatedModes(), GetBoxMode(), SetBoxColor(b"", b"", b"")):
+            with self.assertRaises(AttributeError):
+                record.typo = 1
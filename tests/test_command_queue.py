@@ -0,0 +1,151 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import threading
+import unittest
+from typing import Any, List, Optional, Tuple, Union
+
+from divo.command import BoxMode, Command
+from divo.command_base import CommandBase
+from divo.command_queue import CommandQueue
+from divo.exceptions import CommandNoReplyException
+from divo.pixoo_base import PixooBase
+
+
+class GatedPixoo(PixooBase):
+    """records commands, each one waits for the gate to open"""
+
+    def __init__(self) -> None:
+        self.gate = threading.Event()
+        self.started = threading.Event()
+        self.written: List[Tuple[int, Any]] = []
+
+    def write_command(
+        self,
+        cmd: CommandBase,
+        cmd_data: Optional[Union[bytes, int]] = None,
+        need_response: bool = False,
+        force: bool = False,
+    ) -> Any:
+        self.started.set()
+        self.gate.wait()
+        if cmd == Command.SET_GAME:
+            raise CommandNoReplyException("no reply")
+        self.written.append((cmd.value, cmd_data))
+        return None
+
+    def get_box_mode(self) -> Any:
+        return "box mode"
+
+
+class TestCommandQueue(unittest.TestCase):
+    def test_coalesce(self) -> None:
+        pixoo = GatedPixoo()
+        with CommandQueue(pixoo) as q:
+            # keep the worker busy with the first command while more pile up
+            q.set_brightness(1)
+            assert pixoo.started.wait(1)
+
+            for i in range(2, 10):
+                q.set_brightness(i)
+            q.set_time()
+            q.set_light_mode_light(1, 2, 3)
+            q.set_sleep_color(1, 2, 3)
+            q.set_light_mode_light(4, 5, 6)
+            q.set_brightness(23)
+
+            pixoo.gate.set()
+            assert q.join(1)
+
+        assert [cmd for cmd, _ in pixoo.written] == [
+            Command.SET_SYSTEM_BRIGHTNESS,
+            Command.SET_TIME,
+            Command.SET_SLEEP_COLOR,
+            Command.SET_BOX_MODE,
+            Command.SET_SYSTEM_BRIGHTNESS,
+        ]
+        assert pixoo.written[-2][1][1:4] == b"\x04\x05\x06"
+        assert pixoo.written[-1][1] == 23
+        assert q.coalesced == 9
+        assert q.sent == 5
+
+    def test_errors(self) -> None:
+        pixoo = GatedPixoo()
+        pixoo.gate.set()
+        with CommandQueue(pixoo) as q:
+            q.set_game(True, 1)
+            q.set_brightness(1)
+            assert q.join(1)
+            assert q.get_box_mode() == "box mode"
+
+        assert q.errors == 1
+        assert q.sent == 1
+
+    def test_unexpected_error(self) -> None:
+        class BrokenPixoo(GatedPixoo):
+            def write_command(self, cmd: CommandBase, *args: Any, **kwargs: Any) -> Any:
+                if cmd == Command.SET_TIME:
+                    raise TypeError("bug")
+                return super().write_command(cmd, *args, **kwargs)
+
+        pixoo = BrokenPixoo()
+        pixoo.gate.set()
+        with CommandQueue(pixoo) as q:
+            q.set_time()
+            q.set_brightness(1)
+            assert q.join(1)
+
+        assert q.errors == 1
+        assert pixoo.written == [(Command.SET_SYSTEM_BRIGHTNESS, 1)]
+
+    def test_coalesce_box_mode(self) -> None:
+        pixoo = GatedPixoo()
+        with CommandQueue(pixoo) as q:
+            q.set_brightness(1)
+            assert pixoo.started.wait(1)
+
+            q.set_score(1, 2)
+            q.set_light_mode_light(1, 2, 3)
+            q.set_score(3, 4)
+            q.set_music_visualizer(2)
+
+            pixoo.gate.set()
+            assert q.join(1)
+
+        box_modes = [data for cmd, data in pixoo.written if cmd == Command.SET_BOX_MODE]
+        # the newest score replaced the pending one and was queued anew
+        assert [data[0] for data in box_modes] == [BoxMode.LIGHT, BoxMode.WATCH, BoxMode.MUSIC]
+        assert box_modes[1][2:6] == b"\x04\x00\x03\x00"
+        assert q.coalesced == 1
+
+    def test_stop_without_drain(self) -> None:
+        pixoo = GatedPixoo()
+        q = CommandQueue(pixoo)
+        q.start()
+        q.set_brightness(1)
+        assert pixoo.started.wait(1)
+        q.set_time()
+
+        # the pending command is dropped while the first one is still being sent
+        stopper = threading.Thread(target=q.stop, kwargs={"drain": False})
+        stopper.start()
+        with q.condition:
+            assert q.condition.wait_for(lambda: q.stopping, 1)
+        pixoo.gate.set()
+        stopper.join()
+        assert [cmd for cmd, _ in pixoo.written] == [Command.SET_SYSTEM_BRIGHTNESS]
@@ -0,0 +1,152 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from divo.command import Command
+from divo.daemon import DaemonTransport, DivoDaemon, default_socket_path
+from divo.emulator import EmulatorTransport
+from divo.evo_encoder import EvoEncoder
+from divo.exceptions import ConnectionException, NotConnectedException
+from divo.packet import Packet, ResponsePacket
+from divo.pixoo import Pixoo
+
+
+class TestDivoDaemon(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "divo.sock")
+        self.device = EmulatorTransport()
+        self.daemon = DivoDaemon(Pixoo(self.device), self.path)
+        self.daemon.start()
+
+    def tearDown(self) -> None:
+        self.daemon.stop()
+        self.device.close()
+        shutil.rmtree(self.tmp)
+
+    def client(self):
+        return Pixoo(DaemonTransport(self.path, socket_timeout=2.0))
+
+    def test_pixoo(self) -> None:
+        d = self.client()
+        d.set_brightness(42)
+        d.set_light_mode_light(1, 2, 3)
+        box_mode = d.get_box_mode()
+        assert box_mode.sys_light == 42
+
+        d.write(EvoEncoder.image_bytes([0x00FF00] * 256))
+        assert repr(self.device.emulator.framebuffer.buf[0][0]) == "Color(0, 255, 0)"
+        assert self.daemon.forwarded == 4
+        d.comm.close()
+
+    def test_socket(self) -> None:
+        assert os.stat(self.path).st_mode & 0o777 == 0o600
+
+        # a second daemon must not take over the socket
+        with self.assertRaises(ConnectionException):
+            DivoDaemon(self.daemon.pixoo, self.path).start()
+
+        self.daemon.stop()
+        assert not os.path.exists(self.path)
+        with self.assertRaises(NotConnectedException):
+            self.client()
+
+    def test_reconnect(self) -> None:
+        original_write = self.device.write
+
+        def write(data):
+            # the first write fails like a connection that was reset
+            self.device.write = original_write
+            raise OSError("connection reset")
+
+        self.device.write = write
+        with mock.patch.object(self.device, "close", wraps=self.device.close) as close:
+            self.client().set_brightness(7)
+            assert close.call_count == 1
+
+        assert self.device.emulator.box_mode[8] == 7
+
+    def test_stale_socket(self) -> None:
+        self.daemon.stop()
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(self.path)
+        stale.close()
+
+        self.daemon.start()
+        self.client().set_brightness(1)
+
+    def test_invalid_packets(self) -> None:
+        brightness = Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 5)
+        broken = bytearray(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 6))
+        broken[-2] ^= 0xFF
+
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(2.0)
+            sock.connect(self.path)
+            # garbage, a packet with a bad checksum and a good one split in the middle
+            sock.sendall(b"\x07\x07" + bytes(broken) + brightness[:3])
+            sock.sendall(brightness[3:])
+            assert sock.recv(1024) == ResponsePacket.build(Command.SET_SYSTEM_BRIGHTNESS)
+
+        assert self.device.emulator.box_mode[8] == 5
+        assert self.daemon.forwarded == 1
+
+    def test_clients(self) -> None:
+        errors = []
+
+        def run(n):
+            try:
+                d = self.client()
+                for _ in range(10):
+                    assert d.get_box_mode() is not None
+                    d.set_brightness(n, force=True)
+                d.comm.close()
+            except Exception as e:  # pragma: no cover
+                errors.append(e)
+
+        threads = [threading.Thread(target=run, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert errors == []
+        assert self.daemon.forwarded == 80
+
+
+class TestDefaultSocketPath(unittest.TestCase):
+    def test_env(self) -> None:
+        old = {k: os.environ.pop(k, None) for k in ("DIVO_SOCKET", "XDG_RUNTIME_DIR")}
+        try:
+            assert default_socket_path().startswith(tempfile.gettempdir())
+            os.environ["XDG_RUNTIME_DIR"] = "/run/user/1000"
+            assert default_socket_path() == "/run/user/1000/divo.sock"
+            os.environ["DIVO_SOCKET"] = "/tmp/custom.sock"
+            assert default_socket_path() == "/tmp/custom.sock"
+        finally:
+            for k, v in old.items():
+                os.environ.pop(k, None)
+                if v is not None:
+                    os.environ[k] = v
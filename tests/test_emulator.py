@@ -0,0 +1,100 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import time
+import unittest
+
+from divo.command import BoxMode, Command
+from divo.emulator import EmulatorTransport, LoopbackTransport, PixooEmulator
+from divo.evo_encoder import EvoEncoder
+from divo.packet import Packet, ResponsePacket
+from divo.pixoo import Pixoo
+
+
+class TestPixooEmulator(unittest.TestCase):
+    def test_response(self) -> None:
+        e = PixooEmulator()
+        packet = Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)
+        assert e.feed(packet[:3]) == b""
+        assert e.feed(packet[3:]) == ResponsePacket.build(Command.SET_SYSTEM_BRIGHTNESS)
+        assert e.received == 1
+        assert e.box_mode[8] == 23
+
+    def test_no_response(self) -> None:
+        e = PixooEmulator()
+        assert e.feed(Packet.build(Command.SET_SLEEP_COLOR, b"\x01\x02\x03")) == b""
+        assert e.received == 1
+
+    def test_bad_packets(self) -> None:
+        e = PixooEmulator()
+        assert e.feed(b"\x01\x04\x00t\x17\x12\x34\x02") == b""  # bad checksum
+        assert e.feed(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)[:-1] + b"\x00") == b""
+        assert e.feed(b"\x01\x03\x00\xfe\x01\x01\x02") == b""  # unknown command
+        assert e.errors == 2
+        assert e.received == 0
+
+
+class TestEmulatorTransport(unittest.TestCase):
+    def test_pixoo(self) -> None:
+        bt = EmulatorTransport()
+        d = Pixoo(bt)
+        try:
+            d.set_brightness(42)
+            d.set_light_mode_light(1, 2, 3)
+            box_mode = d.get_box_mode()
+            assert box_mode.sys_light == 42
+            assert box_mode.mode == BoxMode.LIGHT
+            assert (box_mode.light_r, box_mode.light_g, box_mode.light_b) == (1, 2, 3)
+        finally:
+            bt.close()
+
+    def test_framebuffer(self) -> None:
+        bt = EmulatorTransport()
+        d = Pixoo(bt)
+        try:
+            d.write(EvoEncoder.image_bytes([0xFF0000] * 16 + [0x0000FF] * 240))
+            buf = bt.emulator.framebuffer.buf
+            assert repr(buf[0][0]) == "Color(255, 0, 0)"
+            assert repr(buf[1][0]) == "Color(0, 0, 255)"
+        finally:
+            bt.close()
+
+    def test_latency(self) -> None:
+        bt = EmulatorTransport(latency=0.05, bandwidth=1000)
+        d = Pixoo(bt)
+        try:
+            start = time.monotonic()
+            d.set_brightness(42)
+            # 8 bytes request, 7 bytes response
+            assert time.monotonic() - start >= 0.05 + 0.015
+        finally:
+            bt.close()
+
+
+class TestLoopbackTransport(unittest.TestCase):
+    def test_pixoo(self) -> None:
+        bt = LoopbackTransport()
+        d = Pixoo(bt)
+        d.set_brightness(42)
+        assert d.get_box_mode().sys_light == 42
+
+        with d.pipeline(4):
+            for i in range(10):
+                d.write(EvoEncoder.image_bytes([i] * 256))
+        assert bt.emulator.received == 12
+        assert bt.get_in_waiting() == 0
@@ -0,0 +1,79 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from divo.command import CommandParser, SetBoxColor
+from divo.evo_encoder import EvoEncoder
+from divo.packet import Packet
+
+
+class TestEvoEncoder(unittest.TestCase):
+    def test_index_colours(self) -> None:
+        palette, indices = EvoEncoder.index_colours([5, 7, 5, 9, 7])
+        assert palette == [5, 7, 9]
+        assert indices == [0, 1, 0, 2, 1]
+
+    def test_bits_needed(self) -> None:
+        assert EvoEncoder.bits_needed(1) == 1
+        assert EvoEncoder.bits_needed(2) == 1
+        assert EvoEncoder.bits_needed(3) == 2
+        assert EvoEncoder.bits_needed(8) == 3
+        assert EvoEncoder.bits_needed(9) == 4
+        assert EvoEncoder.bits_needed(256) == 8
+
+    def test_encode_colours(self) -> None:
+        pixels = [0x000000, 0xFF0000, 0x00FF00, 0x0000FF] * 4
+        assert EvoEncoder.encode_colours(pixels) == "04000000ff000000ff000000ffe4e4e4e4"
+
+    def test_encode_colours_odd_depth(self) -> None:
+        # 5 colours need 3 bits per pixel, so indices span byte boundaries
+        assert EvoEncoder.encode_colours([1, 2, 3, 4, 5] * 2) == "0500000100000200000300000400000588464423"
+
+    def test_encode_indexed_into(self) -> None:
+        buf = bytearray(b"\xaa" * 8)
+        end = EvoEncoder.encode_indexed_into(buf, 2, [0x123456], [0, 0, 0])
+        assert end == 7
+        assert buf == b"\xaa\xaa\x01\x12\x34\x56\x00\xaa"
+
+    def test_encode_indexed_into_too_many_colours(self) -> None:
+        with self.assertRaises(ValueError):
+            EvoEncoder.encode_indexed_into(bytearray(1024), 0, list(range(257)), [0])
+
+    def test_image_bytes(self) -> None:
+        data = EvoEncoder.image_bytes([0xFF0000] * 256)
+        exp = bytes.fromhex(
+            "01310044000a0a04aa2d0000000001ff0000" + "00" * 32 + "640202",
+        )
+        assert data == exp
+
+    def test_image_bytes_parses(self) -> None:
+        pixels = [(i * 0x010203) & 0xFFFFFF for i in range(16)] * 16
+        data = EvoEncoder.image_bytes(pixels)
+
+        cmd = Packet.parse(CommandParser, data)
+        assert isinstance(cmd, SetBoxColor)
+        assert len(cmd.palette) == 3 * 16
+        assert len(cmd.image) == 16 * 16 * 4 // 8
+
+    def test_image_bytes_rgb(self) -> None:
+        pixels = [(i * 0x010203) & 0xFFFFFF for i in range(16)] * 16
+        rgb = b"".join(p.to_bytes(3, "big") for p in pixels)
+
+        assert EvoEncoder.rgb_colours(rgb) == pixels
+        assert EvoEncoder.image_bytes_rgb(memoryview(rgb)) == EvoEncoder.image_bytes(pixels)
@@ -0,0 +1,244 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import sys
+import unittest
+
+from PIL import Image
+
+from divo.evo_pixmap import RawPixmap
+from divo.image import TerminalRenderer
+
+
+def noise(size, mode="RGBA"):
+    return Image.merge("RGBA", [Image.effect_noise(size, 40 + 20 * i) for i in range(4)]).convert(mode)
+
+
+class TestRawPixmap(unittest.TestCase):
+    def blend_pixel_by_pixel(self, rp, image):
+        source = image.convert("RGBA")
+        source.thumbnail((16, 16), Image.BICUBIC)
+        return [rp.blend_rgba((0, 0, 0, 255), p)[:3] for p in source.getdata()]
+
+    def test_flatten_alpha(self) -> None:
+        rp = RawPixmap(16, 16)
+        image = Image.new("RGBA", (256, 256))
+        image.putdata([(x, 255 - x, 128, y) for y in range(256) for x in range(256)])
+
+        flat = rp.flatten_alpha(image)
+        assert flat.mode == "RGB"
+        assert list(flat.getdata()) == [rp.blend_rgba((0, 0, 0, 255), p)[:3] for p in image.getdata()]
+
+    def test_decode_rgba(self) -> None:
+        rp = RawPixmap(16, 16)
+        for size in ((16, 16), (64, 64), (100, 37)):
+            image = noise(size)
+            decoded = rp.decode_image(image)
+            assert len(decoded) == 256
+
+            expected = self.blend_pixel_by_pixel(rp, image)
+            if size == (100, 37):
+                # centered vertically
+                assert decoded[: 16 * 5] == [(0, 0, 0)] * 16 * 5
+                decoded = decoded[16 * 5 : 16 * 11]
+            assert decoded == expected
+
+    def test_decode_other_modes(self) -> None:
+        # alpha is ignored, not blended, for anything but RGBA
+        rp = RawPixmap(16, 16)
+        image = noise((32, 32), "LA")
+        source = image.convert("RGBA")
+        source.thumbnail((16, 16), Image.BICUBIC)
+        assert rp.decode_image(image) == [p[:3] for p in source.getdata()]
+
+    def test_draft(self) -> None:
+        out = io.BytesIO()
+        noise((512, 512), "RGB").save(out, "JPEG")
+
+        rp = RawPixmap(16, 16)
+        image = Image.open(io.BytesIO(out.getvalue()))
+        decoded = rp.decode_image(image, draft=True)
+        assert image.size == (64, 64)
+        assert len(decoded) == 256
+
+        # off by default
+        image = Image.open(io.BytesIO(out.getvalue()))
+        rp.decode_image(image)
+        assert image.size == (512, 512)
+
+
+class TestRawPixmapDrawing(unittest.TestCase):
+    def rows(self, rp):
+        return [
+            "".join("#" if p != rp.BLACK else "." for p in rp.pixel_list()[y * rp.width : (y + 1) * rp.width])
+            for y in range(rp.height)
+        ]
+
+    def test_pixels(self) -> None:
+        rp = RawPixmap(4, 3)
+        assert rp.get_rgb_pixels() == [rp.BLACK] * 12
+
+        rp.setPixel(1, 2, rp.RED)
+        rp.setPixel(5, -1, rp.BLUE)  # wraps around to 1, 2
+        assert rp.getPixel(1, 2) == rp.BLUE
+        assert rp.getPixel(-3, 5) == rp.BLUE
+        assert rp.get_pixel_data()[9] == 0x0000FF
+
+    def test_not_rgb(self) -> None:
+        rp = RawPixmap(4, 3)
+        for draw in (
+            lambda: rp.setPixel(0, 0, (1, 2, 3, 4)),
+            lambda: rp.fill_rect(0, 0, 2, 2, (1, 2)),
+            lambda: rp.fill_rect(0, 0, 4, 2, (1, 2, 3, 4)),
+            lambda: rp.clear((1, 2, 3, 4)),
+        ):
+            with self.assertRaises(ValueError):
+                draw()
+        assert len(rp.rgb_buffer()) == 3 * 12
+        assert rp.get_rgb_pixels() == [rp.BLACK] * 12
+
+    def test_rgb_buffer(self) -> None:
+        rp = RawPixmap(2, 1)
+        rp.setPixel(1, 0, (1, 2, 3))
+        view = rp.rgb_buffer()
+        assert bytes(view) == b"\x00\x00\x00\x01\x02\x03"
+        if sys.version_info >= (3, 8):
+            assert view.readonly
+
+        rp.clear(rp.WHITE)
+        assert set(rp.get_rgb_pixels()) == {rp.WHITE}
+
+    def test_rgb_pixels(self) -> None:
+        rp = RawPixmap(2, 2)
+        pixels = [(1, 2, 3), (4, 5, 6), (7, 8, 9), (10, 11, 12)]
+        rp.set_rgb_pixels(pixels)
+        assert rp.get_rgb_pixels() == pixels
+        assert bytes(rp.rgb_buffer()) == bytes(range(1, 13))
+        assert rp.getPixel(0, 1) == (7, 8, 9)
+
+        with self.assertRaises(ValueError):
+            rp.set_rgb_pixels(pixels[:3])
+        with self.assertRaises(TypeError):
+            rp.rgb_buffer()[0] = 1
+
+    def test_line(self) -> None:
+        rp = RawPixmap(5, 5)
+        rp.line(0, 0, 4, 4, rp.WHITE)
+        rp.line(4, 0, 4, 2, rp.WHITE)
+        assert self.rows(rp) == ["#...#", ".#..#", "..#.#", "...#.", "....#"]
+
+    def test_fill_rect(self) -> None:
+        rp = RawPixmap(5, 4)
+        rp.fill_rect(1, 1, 3, 2, rp.RED)
+        assert self.rows(rp) == [".....", ".###.", ".###.", "....."]
+
+        # clipped, not wrapped
+        rp.clear()
+        rp.fill_rect(-2, 3, 4, 5, rp.RED)
+        rp.fill_rect(0, 0, 5, 1, rp.RED)
+        rp.fill_rect(9, 9, 2, 2, rp.RED)
+        assert self.rows(rp) == ["#####", ".....", ".....", "##..."]
+
+    def test_lines(self) -> None:
+        rp = RawPixmap(5, 4)
+        rp.hline(1, 0, 10, rp.GRAY)
+        rp.vline(0, 1, 2, rp.GRAY)
+        assert self.rows(rp) == [".####", "#....", "#....", "....."]
+        assert rp.getPixel(4, 0) == rp.GRAY
+
+    def test_blit(self) -> None:
+        sprite = RawPixmap(2, 2)
+        sprite.set_rgb_pixels([(1, 1, 1), (2, 2, 2), (3, 3, 3), (4, 4, 4)])
+
+        rp = RawPixmap(4, 3)
+        rp.blit(sprite, 1, 1)
+        assert rp.getPixel(1, 1) == (1, 1, 1)
+        assert rp.getPixel(2, 2) == (4, 4, 4)
+
+        rp.clear()
+        rp.blit(sprite, -1, 2)
+        assert self.rows(rp) == ["....", "....", "#..."]
+        assert rp.getPixel(0, 2) == (2, 2, 2)
+
+    def test_crop_rgb(self) -> None:
+        rp = RawPixmap(4, 3)
+        rp.setPixel(1, 1, (1, 2, 3))
+        rp.setPixel(2, 2, (4, 5, 6))
+
+        assert rp.crop_rgb(1, 1, 2, 2) == bytes([1, 2, 3, 0, 0, 0, 0, 0, 0, 4, 5, 6])
+        assert rp.crop_rgb(0, 0, 4, 3) == bytes(rp.rgb_buffer())
+        with self.assertRaises(ValueError):
+            rp.crop_rgb(3, 0, 2, 1)
+
+    def test_scroll(self) -> None:
+        rp = RawPixmap(4, 3)
+        rp.hline(0, 0, 2, rp.WHITE)
+        rp.setPixel(3, 2, rp.WHITE)
+
+        rp.scroll(1, 1)
+        assert self.rows(rp) == ["....", ".##.", "...."]
+
+        rp.scroll(3, 1, wrap=True)
+        assert self.rows(rp) == ["....", "....", "##.."]
+
+        rp.scroll(-1, -2, color=rp.RED)
+        assert rp.getPixel(0, 0) == rp.WHITE
+        assert rp.getPixel(3, 0) == rp.RED
+        assert rp.getPixel(0, 2) == rp.RED
+
+    def test_scroll_all_offsets(self) -> None:
+        w, h = 5, 4
+        pixels = [(i, 0, 0) for i in range(1, w * h + 1)]
+        for dx in range(-w - 1, w + 2):
+            for dy in range(-h - 1, h + 2):
+                rp = RawPixmap(w, h)
+                rp.set_rgb_pixels(pixels)
+                rp.scroll(dx, dy, color=rp.WHITE)
+                for y in range(h):
+                    for x in range(w):
+                        sx, sy = x - dx, y - dy
+                        exp = pixels[sy * w + sx] if 0 <= sx < w and 0 <= sy < h else rp.WHITE
+                        assert rp.getPixel(x, y) == exp, (dx, dy, x, y)
+
+                rp.set_rgb_pixels(pixels)
+                rp.scroll(dx, dy, wrap=True)
+                assert rp.getPixel(dx, dy) == pixels[0]
+
+    def test_set_image(self) -> None:
+        rp = RawPixmap(16, 16)
+        image = noise((40, 40))
+        rp.set_image(image)
+        assert rp.get_rgb_pixels() == rp.decode_image(image)
+
+    def test_view(self) -> None:
+        out = io.StringIO()
+        renderer = TerminalRenderer(out)
+        rp = RawPixmap(4, 4)
+        rp.setPixel(1, 2, RawPixmap.RED)
+        rp.view(renderer)
+        assert out.getvalue().count(TerminalRenderer.HALF_BLOCK) == 8
+        # black pixels are shown dark gray
+        assert renderer.cells[0] == ((20, 20, 20), (20, 20, 20))
+        assert renderer.cells[5] == (RawPixmap.RED, (20, 20, 20))
+
+        rp.setPixel(3, 3, RawPixmap.WHITE)
+        drawn = len(out.getvalue())
+        rp.view(renderer)
+        # only the changed cell is redrawn
+        assert out.getvalue()[drawn:].count(TerminalRenderer.HALF_BLOCK) == 1
@@ -0,0 +1,136 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+import unittest
+
+from divo.command import Command
+from divo.evo_encoder import EvoEncoder
+from divo.frame_cache import FrameCache
+from divo.packet import Packet
+
+
+def packet(n, size=0):
+    return Packet.build(Command.SET_SLEEP_COLOR, bytes([n]) * (size or 3))
+
+
+class TestFrameCache(unittest.TestCase):
+    def test_lru_entries(self) -> None:
+        cache = FrameCache(max_entries=2)
+        cache.put("a", packet(1))
+        cache.put("b", packet(2))
+        assert cache.get("a") == packet(1)
+        cache.put("c", packet(3))
+
+        # b was used least recently
+        assert cache.get("b") is None
+        assert cache.get("a") == packet(1)
+        assert cache.get("c") == packet(3)
+        assert (cache.hits, cache.misses, cache.evictions) == (3, 1, 1)
+
+    def test_lru_bytes(self) -> None:
+        p = packet(1, 100)
+        cache = FrameCache(max_bytes=2 * len(p) + 1)
+        for key in "abc":
+            cache.put(key, p)
+        assert list(cache.entries) == ["b", "c"]
+        assert cache.size == 2 * len(p)
+
+        # replacing an entry doesn't count twice
+        cache.put("c", packet(2, 100))
+        assert cache.size == 2 * len(p)
+
+        # too big to cache at all
+        cache.put("d", packet(3, 300))
+        assert cache.get("d") is None
+        assert list(cache.entries) == ["b", "c"]
+
+        cache.clear()
+        assert cache.size == 0
+        assert cache.get("b") is None
+
+    def test_get_or_build(self) -> None:
+        cache = FrameCache()
+        built = []
+
+        def build():
+            built.append(1)
+            return packet(1)
+
+        for _ in range(3):
+            assert cache.get_or_build("a", build) == packet(1)
+        assert len(built) == 1
+
+    def test_file_key(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "image.png")
+            with open(path, "wb") as f:
+                f.write(b"1234")
+
+            key = FrameCache.file_key(path)
+            assert FrameCache.file_key(path) == key
+            assert FrameCache.file_key(path, "32x32") != key
+
+            with open(path, "wb") as f:
+                f.write(b"12345")
+            assert FrameCache.file_key(path) != key
+
+            with self.assertRaises(OSError):
+                FrameCache.file_key(os.path.join(tmp, "missing.png"))
+
+    def test_buffer_key(self) -> None:
+        key = FrameCache.buffer_key(b"\x00" * 768)
+        assert FrameCache.buffer_key(memoryview(bytearray(768))) == key
+        assert FrameCache.buffer_key(b"\x00" * 768, "dim") != key
+        assert FrameCache.buffer_key(b"\x00" * 767 + b"\x01") != key
+
+    def test_disk(self) -> None:
+        image = EvoEncoder.image_bytes([0xFF0000] * 256)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FrameCache(cache_dir=tmp)
+            cache.put("ab12", image)
+
+            # a new process finds it on disk
+            cache = FrameCache(cache_dir=tmp)
+            assert cache.get("ab12") == image
+            assert cache.get("ab12") == image
+            assert (cache.disk_hits, cache.hits) == (1, 1)
+            assert cache.get("cd34") is None
+
+            # broken entries are removed
+            path = os.path.join(tmp, "ef", "ef56")
+            os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as f:
+                f.write(image[:-1])
+            assert FrameCache(cache_dir=tmp).get("ef56") is None
+            assert not os.path.exists(path)
+
+            assert sorted(os.listdir(tmp)) == ["ab", "ef"]
+            assert os.listdir(os.path.join(tmp, "ab")) == ["ab12"]
+
+    def test_default_cache_dir(self) -> None:
+        old = os.environ.get("XDG_CACHE_HOME")
+        try:
+            os.environ["XDG_CACHE_HOME"] = "/tmp/xdg"
+            assert FrameCache.default_cache_dir() == "/tmp/xdg/divo/frames"
+            del os.environ["XDG_CACHE_HOME"]
+            assert FrameCache.default_cache_dir() == os.path.expanduser("~/.cache/divo/frames")
+        finally:
+            if old is not None:
+                os.environ["XDG_CACHE_HOME"] = old
@@ -0,0 +1,106 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from typing import List
+
+from divo.evo_encoder import EvoEncoder
+from divo.evo_pixmap import RawPixmap
+from divo.frame_scheduler import FrameScheduler
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        assert seconds > 0
+        self.now += seconds
+
+
+class SlowPixoo:
+    """takes latency seconds for every frame, records when each one was sent"""
+
+    def __init__(self, clock: FakeClock, latency: float) -> None:
+        self.clock = clock
+        self.latency = latency
+        self.sent: List[float] = []
+        self.packets: List[bytes] = []
+
+    def transceive(self, data: bytes) -> None:
+        self.sent.append(self.clock.now)
+        self.packets.append(data)
+        self.clock.now += self.latency
+
+
+class TestFrameScheduler(unittest.TestCase):
+    def make(self, latency: float, fps: float = 10.0) -> FrameScheduler:
+        self.clock = FakeClock()
+        self.pixoo = SlowPixoo(self.clock, latency)
+        return FrameScheduler(self.pixoo, fps=fps, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_on_time(self) -> None:
+        s = self.make(latency=0.03)
+        stats = s.run([b"frame"] * 5)
+
+        # no drift although every send takes time
+        assert [round(t, 6) for t in self.pixoo.sent] == [0.0, 0.1, 0.2, 0.3, 0.4]
+        assert stats.sent == 5
+        assert stats.dropped == 0
+        assert round(stats.elapsed, 6) == 0.5
+        assert round(stats.fps, 6) == 10.0
+        assert round(stats.p50_ms, 6) == 30.0
+
+    def test_drop_stale(self) -> None:
+        s = self.make(latency=0.25)
+        stats = s.run(list(range(10)))
+
+        # frames are sent right away when they are late but still due, the others are dropped
+        assert self.pixoo.packets == [0, 2, 5, 7]
+        assert [round(t, 6) for t in self.pixoo.sent] == [0.0, 0.25, 0.5, 0.75]
+        assert stats.sent == 4
+        assert stats.dropped == 6
+        assert round(stats.p99_ms, 6) == 250.0
+
+    def test_durations(self) -> None:
+        s = self.make(latency=0.01)
+        stats = s.run([b"a", b"b", b"c", b"d"], durations=[0.1, 0.3, 0.05])
+
+        # the last frame has no duration, it gets the default of 1 / fps
+        assert [round(t, 6) for t in self.pixoo.sent] == [0.0, 0.1, 0.4, 0.45]
+        assert round(stats.elapsed, 6) == 0.55
+
+    def test_pixmap(self) -> None:
+        s = self.make(latency=0.0)
+        rp = RawPixmap(16, 16)
+        rp.fill_rect(0, 0, 8, 8, (255, 0, 0))
+        s.run([rp])
+        assert self.pixoo.packets == [EvoEncoder.image_bytes_rgb(rp.rgb_buffer())]
+
+    def test_bad_fps(self) -> None:
+        with self.assertRaises(ValueError):
+            self.make(latency=0.0, fps=0)
+
+    def test_no_frames(self) -> None:
+        stats = self.make(latency=0.0).run([])
+        assert stats.sent == 0
+        assert stats.fps == 0.0
+        assert stats.p50_ms == 0.0
@@ -19,7 +19,7 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import binascii
 import unittest
 
-from divo.helpers import chunks, clean_unhexlify
+from divo.helpers import byte_sum, chunks, clean_unhexlify
 
 
 class TestHelpers(unittest.TestCase):
@@ -44,3 +44,9 @@ class TestHelpers(unittest.TestCase):
         assert chunks("abc", 2) == ["ab", "c"]
         assert chunks("abc", 3) == ["abc"]
         assert chunks("abc", 4) == ["abc"]
+
+    def test_byte_sum(self) -> None:
+        assert byte_sum(b"") == 0
+        for data in (bytes(range(256)) * 3, b"\xff" * 1000, b"\xff" * 256 + b"\x01", b"\x17" * 100):
+            assert byte_sum(data) == sum(data)
+            assert byte_sum(memoryview(data)[1:]) == sum(data[1:])
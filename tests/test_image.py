@@ -0,0 +1,180 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import random
+import re
+import unittest
+
+from divo.image import Color, ImageBuffer, Screen, TerminalRenderer
+
+ESCAPE = re.compile(r"\x1b\[([0-9;]*)([A-Za-z])|(.)", re.DOTALL)
+
+
+class FakeTerminal:
+    """just enough of a terminal to replay what TerminalRenderer writes"""
+
+    def __init__(self):
+        self.cells = {}
+        self.line = self.column = 0
+        self.colour = None
+
+    def feed(self, data):
+        for args, op, char in ESCAPE.findall(data):
+            if char == "\n":
+                self.line += 1
+                self.column = 0
+            elif char:
+                self.cells[self.line, self.column] = (char, self.colour)
+                self.column += 1
+            elif op == "m":
+                values = [int(v) for v in args.split(";")]
+                self.colour = None if values == [0] else (tuple(values[2:5]), tuple(values[7:10]))
+            elif op == "F":
+                self.line -= int(args)
+                self.column = 0
+            elif op == "E":
+                self.line += int(args)
+                self.column = 0
+            elif op == "G":
+                self.column = int(args) - 1
+
+    def pixels(self, width, height):
+        out = []
+        for y in range(height):
+            colours = [self.cells[y // 2, x][1] for x in range(width)]
+            out.extend(c[y % 2] for c in colours)
+        return out
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def random_frame(rng, width, height, colours=4):
+    palette = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(colours)]
+    return [rng.choice(palette) for _ in range(width * height)]
+
+
+class TestTerminalRenderer(unittest.TestCase):
+    def test_full_frame(self) -> None:
+        r = TerminalRenderer(io.StringIO())
+        pixels = [(0, 0, 0)] * 8 + [(255, 0, 0)] * 8
+        frame = r.render(pixels, 4)
+
+        assert frame.count("\n") == 2
+        assert frame.count(TerminalRenderer.HALF_BLOCK) == 8
+        # one colour change per line only
+        assert frame.count("\x1b[38") == 2
+
+        t = FakeTerminal()
+        t.feed(frame)
+        assert t.pixels(4, 4) == pixels
+        assert (t.line, t.column) == (2, 0)
+
+    def test_odd_height(self) -> None:
+        r = TerminalRenderer(io.StringIO())
+        pixels = [(1, 2, 3)] * 6
+        t = FakeTerminal()
+        t.feed(r.render(pixels, 2))
+        assert t.pixels(2, 4) == pixels + [(0, 0, 0)] * 2
+
+    def test_unchanged(self) -> None:
+        r = TerminalRenderer(io.StringIO())
+        pixels = [(1, 2, 3)] * 16
+        r.render(pixels, 4)
+        assert r.render(pixels, 4) == ""
+
+    def test_changes(self) -> None:
+        rng = random.Random(12)
+        r = TerminalRenderer(io.StringIO())
+        t = FakeTerminal()
+
+        pixels = random_frame(rng, 16, 16)
+        full = r.render(pixels, 16)
+        t.feed(full)
+        for _ in range(20):
+            for _ in range(rng.randrange(10)):
+                pixels[rng.randrange(256)] = (rng.randrange(256), 0, 0)
+            frame = r.render(pixels, 16)
+            assert len(frame) < len(full)
+
+            t.feed(frame)
+            assert t.pixels(16, 16) == pixels
+            # cursor is back below the image
+            assert (t.line, t.column) == (8, 0)
+
+    def test_size_change(self) -> None:
+        r = TerminalRenderer(io.StringIO())
+        r.render([(1, 1, 1)] * 16, 4)
+        assert r.render([(1, 1, 1)] * 16, 8).count("\n") == 1
+
+        r.reset()
+        assert r.render([(1, 1, 1)] * 16, 8).count("\n") == 1
+
+    def test_draw(self) -> None:
+        out = CountingStream()
+        r = TerminalRenderer(out)
+
+        image = ImageBuffer(4, 2)
+        r.draw_image(image)
+        image.set(1, 1, Color(9, 9, 9))
+        r.draw_image(image)
+        r.draw_image(image)
+
+        assert out.writes == 2
+        assert r.frames == 3
+        assert r.bytes_written == len(out.getvalue())
+        assert r.fps > 0
+
+        t = FakeTerminal()
+        t.feed(out.getvalue())
+        assert t.pixels(4, 2) == image.rgb_pixels()
+
+
+class TestScreen(unittest.TestCase):
+    def test_print_image(self) -> None:
+        out = CountingStream()
+        screen = Screen(out=out)
+        image = ImageBuffer(4, 4)
+        image.set(2, 3, Color(1, 2, 3))
+
+        image.print_to(screen)
+        assert out.writes == 1
+        t = FakeTerminal()
+        t.feed(out.getvalue())
+        assert t.pixels(4, 4) == image.rgb_pixels()
+
+        # every image is drawn completely below the previous one
+        image.print_to(screen)
+        assert out.writes == 2
+        assert out.getvalue().count("\n") == 4
+        assert screen.renderer.frames == 2
+
+    def test_print_palette(self) -> None:
+        out = CountingStream()
+        Screen(out=out).print_palette([Color(1, 2, 3), Color(4, 5, 6)])
+        assert out.writes == 1
+        assert out.getvalue().startswith("Palette (2):\n0 \x1b[38;2;1;2;3m")
+        assert "\n1 \x1b[38;2;4;5;6m" in out.getvalue()
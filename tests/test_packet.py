@@ -17,10 +17,12 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
 import unittest
+from unittest import mock
 
-from divo.command import Command, CommandParser
+from divo.command import Command, CommandParser, SetBoxColor
+from divo.evo_encoder import EvoEncoder
 from divo.exceptions import PacketChecksumError, PacketParsingError
-from divo.packet import Packet, ResponsePacket
+from divo.packet import BuiltPacket, Packet, ResponsePacket
 
 
 class TestPacket(unittest.TestCase):
@@ -34,6 +36,22 @@ class TestPacket(unittest.TestCase):
         exp = b"\x01\x04\x00t\x17\x8f\x00\x02"
         assert p == exp
 
+    def test_build_returns_built_packet(self) -> None:
+        p = Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)
+        assert isinstance(p, BuiltPacket)
+        assert not isinstance(p[:4], BuiltPacket)
+        assert not isinstance(p + b"\x00", BuiltPacket)
+        assert isinstance(EvoEncoder.image_bytes([0] * 256), BuiltPacket)
+
+    def test_build_buffer_payload(self) -> None:
+        payload = bytes(range(200))
+        expected = Packet.build(Command.SET_BOX_COLOR, payload)
+        for buffer in (bytearray(payload), memoryview(payload)):
+            p = Packet.build(Command.SET_BOX_COLOR, buffer)
+            assert isinstance(p, BuiltPacket)
+            assert p == expected
+        assert len(expected) == Packet.size_for(200)
+
     def test_build_no_payload(self) -> None:
         p = Packet.build(Command.SET_SYSTEM_BRIGHTNESS)
         exp = b"\x01\x03\x00tw\x00\x02"
@@ -73,11 +91,103 @@ class TestPacket(unittest.TestCase):
         assert Packet.is_valid(CommandParser, raw_good) is True
         assert Packet.is_valid(CommandParser, raw_bad) is False
 
+    def test_size_for(self) -> None:
+        assert Packet.size_for(0) == len(Packet.build(Command.SET_SYSTEM_BRIGHTNESS))
+        assert Packet.size_for(1) == len(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23))
+
+    def test_build_into(self) -> None:
+        buf = bytearray(b"\xff" * 12)
+        end = Packet.build_into(memoryview(buf), Command.SET_SYSTEM_BRIGHTNESS, 23, offset=2)
+        assert end == 10
+        assert buf == b"\xff\xff\x01\x04\x00t\x17\x8f\x00\x02\xff\xff"
+
+    def test_build_into_large_payload(self) -> None:
+        payload = bytes(range(256)) * 2
+        buf = bytearray(Packet.size_for(len(payload)))
+        Packet.build_into(buf, Command.SET_BOX_COLOR, payload)
+        assert buf[1:3] == (len(payload) + 3).to_bytes(2, "little")
+        assert Packet.is_valid(CommandParser, bytes(buf)) is True
+
+    def test_build_into_too_small(self) -> None:
+        buf = bytearray(8)
+        with self.assertRaises(ValueError):
+            Packet.build_into(buf, Command.SET_SYSTEM_BRIGHTNESS, 23, offset=1)
+        assert buf == bytearray(8)
+
+    def test_build_many(self) -> None:
+        commands = [
+            (Command.SET_SYSTEM_BRIGHTNESS, 23),
+            (Command.SET_SYSTEM_BRIGHTNESS, None),
+            (Command.SET_BOX_COLOR, b"\x00\x0a\x0a\x04"),
+        ]
+        buf = Packet.build_many(commands)
+        assert buf == b"".join(Packet.build(cmd, payload) for cmd, payload in commands)
+        assert Packet.build_many([]) == b""
+
+    def test_parse_zero_copy(self) -> None:
+        raw = EvoEncoder.image_bytes([(i * 0x010203) & 0xFFFFFF for i in range(16)] * 16)
+        copied = Packet.parse(CommandParser, raw)
+        cmd = Packet.parse(CommandParser, raw, zero_copy=True)
+        assert isinstance(cmd, SetBoxColor)
+        assert isinstance(cmd.palette, memoryview)
+        assert isinstance(cmd.image, memoryview)
+        assert cmd.palette.obj is raw
+        assert cmd.palette == copied.palette
+        assert cmd.image == copied.image
+
+        cmd.materialize()
+        assert type(cmd.raw) is bytes
+        assert cmd.palette == copied.palette
+        assert cmd.image == copied.image
+
+    def test_unpack(self) -> None:
+        raw = b"\x01\x04\x00t\x17\x8f\x00\x02"
+        assert Packet.unpack(raw) == (Command.SET_SYSTEM_BRIGHTNESS, b"\x17")
+        cmd_type, data = Packet.unpack(raw, zero_copy=True)
+        assert isinstance(data, memoryview)
+        assert data == b"\x17"
+
+    def test_validating_parses_command(self) -> None:
+        parser = mock.Mock()
+        packet = EvoEncoder.image_bytes([0] * 256)
+        assert Packet.is_valid(parser, packet) is True
+        parser.parse.assert_called_once()
+
+        parser.parse.side_effect = PacketParsingError("payload broken")
+        assert Packet.is_valid(parser, packet) is False
+
+    def test_validating_framing_only(self) -> None:
+        parser = mock.Mock()
+        parser.parse.side_effect = PacketParsingError("payload broken")
+        assert Packet.is_valid(parser, EvoEncoder.image_bytes([0] * 256), framing_only=True) is True
+        parser.parse.assert_not_called()
+        assert Packet.is_valid(parser, b"\x01\x04\x00t\x17\x8f\x01\x02", framing_only=True) is False
+
+    def test_views(self) -> None:
+        packets = [Packet.build(Command.SET_SYSTEM_BRIGHTNESS, i) for i in range(3)]
+        packets.append(EvoEncoder.image_bytes([0] * 256))
+        capture = b"".join(packets)
+
+        views = list(Packet.views(capture))
+        assert views == packets
+        assert all(v.obj is capture for v in views)
+
+        # the incomplete last packet is left out
+        assert list(Packet.views(capture[:-1])) == packets[:-1]
+
 
 class TestResponsePacket(unittest.TestCase):
-    def test_build_not_impl(self) -> None:
-        with self.assertRaises(NotImplementedError):
-            ResponsePacket.build(Command.SET_BOX_MODE, 123)
+    def test_build(self) -> None:
+        p = ResponsePacket.build(Command.SET_SYSTEM_BRIGHTNESS)
+        exp = b"\x01\x03\x00\x04t\x55\x02"
+        assert p == exp
+
+    def test_build_payload(self) -> None:
+        p = ResponsePacket.build(Command.SET_BOX_MODE, 123)
+        exp = b"\x01\x04\x00\x04E\x55{\x02"
+        assert p == exp
+        assert ResponsePacket.build(Command.SET_BOX_MODE, b"{") == exp
+        assert ResponsePacket.is_valid(CommandParser, p)
 
     def test_parse_success(self) -> None:
         raw = b"\x01\x03\x00\x04\x17\x55\x02"
@@ -114,6 +224,13 @@ class TestResponsePacket(unittest.TestCase):
             ResponsePacket.parse(CommandParser, raw)
         assert str(ctx.exception).startswith("MAGIC_UNK1 value wrong")
 
+    def test_parse_zero_copy(self) -> None:
+        raw = ResponsePacket.build(Command.GET_BOX_MODE, bytes(range(16)))
+        p = ResponsePacket.parse(CommandParser, raw, zero_copy=True)
+        assert isinstance(p._raw, memoryview)
+        assert p._raw == bytes(range(16))
+        assert p.time_type == 9
+
     def test_validating(self) -> None:
         raw_good = b"\x01\x03\x00\x04\x17\x55\x02"
         raw_bad = b"\x01\x23\x00\x04\x17\x55\x02"
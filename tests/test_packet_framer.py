@@ -0,0 +1,92 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from divo.packet_framer import PacketFramer
+
+
+class TestPacketFramer(unittest.TestCase):
+    request = b"\x01\x04\x00t\x17\x8f\x00\x02"
+    response = b"\x01\x03\x00\x04\x17\x55\x02"
+
+    def test_single(self) -> None:
+        f = PacketFramer()
+        assert list(f.feed(self.request)) == [self.request]
+        assert f.buffer == b""
+        assert f.discarded == 0
+
+    def test_multiple(self) -> None:
+        f = PacketFramer()
+        assert list(f.feed(self.request + self.response + self.request)) == [
+            self.request,
+            self.response,
+            self.request,
+        ]
+
+    def test_fragmented(self) -> None:
+        f = PacketFramer()
+        data = self.response + self.request
+        frames = []
+        for i in range(len(data)):
+            frames += f.feed(data[i : i + 1])
+        assert frames == [self.response, self.request]
+
+    def test_wanted(self) -> None:
+        f = PacketFramer()
+        assert f.wanted() == 3
+        assert list(f.feed(self.response[:1])) == []
+        assert f.wanted() == 2
+        assert list(f.feed(self.response[1:4])) == []
+        assert f.wanted() == 3
+        assert list(f.feed(self.response[4:])) == [self.response]
+        assert f.wanted() == 3
+
+    def test_lazy(self) -> None:
+        f = PacketFramer()
+        frames = f.feed(self.request + self.response)
+        assert next(frames) == self.request
+        assert f.next_frame() == self.response
+        assert f.next_frame() is None
+
+    def test_resync_garbage(self) -> None:
+        f = PacketFramer()
+        assert list(f.feed(b"\x23\x42" + self.response)) == [self.response]
+        assert f.discarded == 2
+
+        assert list(f.feed(b"\x99" * 10)) == []
+        assert f.buffer == b""
+        assert f.discarded == 12
+
+    def test_resync_bad_end(self) -> None:
+        # a start marker inside garbage whose size points to the wrong end marker
+        f = PacketFramer()
+        assert list(f.feed(b"\x01\x03\x00\x00\x00\x00\x00" + self.request)) == [self.request]
+        assert f.discarded == 7
+
+    def test_resync_bad_size(self) -> None:
+        f = PacketFramer(max_size=16)
+        assert list(f.feed(b"\x01\x02\x00" + self.response)) == [self.response]
+        assert list(f.feed(b"\x01\xff\x00" + self.response)) == [self.response]
+        assert f.discarded == 6
+
+    def test_reset(self) -> None:
+        f = PacketFramer()
+        assert list(f.feed(self.request[:5])) == []
+        f.reset()
+        assert list(f.feed(self.response)) == [self.response]
@@ -0,0 +1,71 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+from divo.image import Color, Palette
+from divo.packet_stream import PacketStreamDecoder
+
+
+class TestPacketStreamDecoder(unittest.TestCase):
+    def test_unpack_indices(self) -> None:
+        assert PacketStreamDecoder.unpack_indices(b"", 2) == []
+        assert PacketStreamDecoder.unpack_indices(b"\x05", 1) == [1, 0, 1, 0, 0, 0, 0, 0]
+        assert PacketStreamDecoder.unpack_indices(b"\xe4", 2) == [0, 1, 2, 3]
+        assert PacketStreamDecoder.unpack_indices(b"\x21\x43", 4) == [1, 2, 3, 4]
+        assert PacketStreamDecoder.unpack_indices(b"\x17\x42", 8) == [0x17, 0x42]
+
+    def test_unpack_indices_odd_depth(self) -> None:
+        # 3 bits per pixel: 0b 01 110 101 | 0b 0000 100 0 -> 5, 6, 1, 4, 0 and a zero-padded partial index
+        assert PacketStreamDecoder.unpack_indices(b"\x75\x08", 3) == [5, 6, 1, 4, 0, 0]
+        assert PacketStreamDecoder.unpack_indices(b"\xff\xff", 5) == [31, 31, 31, 1]
+
+    def test_unpack_indices_range(self) -> None:
+        with self.assertRaises(ValueError):
+            PacketStreamDecoder.unpack_indices(b"\x00", 0)
+        with self.assertRaises(ValueError):
+            PacketStreamDecoder.unpack_indices(b"\x00", 9)
+
+    def test_parse_image(self) -> None:
+        palette = Palette()
+        palette.palette = [Color(0, 0, 0), Color(255, 0, 0)]
+        # first row red, rest black
+        psd_image = PacketStreamDecoder.parse_image(b"\xff\xff" + b"\x00" * 30, palette)
+        assert all(pixel is palette[1] for pixel in psd_image.buf[0])
+        assert all(pixel is palette[0] for row in psd_image.buf[1:-1] for pixel in row)
+        # the decoder never starts a pixel in the last two bits of the payload
+        assert psd_image.buf[-1][-2] is psd_image.default_value
+
+    def test_parse_image_single_colour(self) -> None:
+        palette = Palette()
+        palette.palette = [Color(1, 2, 3)]
+        psd_image = PacketStreamDecoder.parse_image(b"\x00" * 32, palette)
+        assert all(pixel is palette[0] for row in psd_image.buf[:-1] for pixel in row)
+
+    def test_parse_image_bad_index(self) -> None:
+        palette = Palette()
+        palette.palette = [Color(0, 0, 0), Color(1, 1, 1), Color(2, 2, 2)]
+        # index 3 doesn't exist and leaves the default colour in place
+        psd_image = PacketStreamDecoder.parse_image(b"\x39" + b"\x00" * 63, palette)
+        assert [repr(pixel) for pixel in psd_image.buf[0][:4]] == [
+            "Color(1, 1, 1)",
+            "Color(2, 2, 2)",
+            "Color(0, 0, 0)",
+            "Color(0, 0, 0)",
+        ]
+        assert psd_image.buf[0][2] is psd_image.default_value
@@ -0,0 +1,105 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+from typing import Any, List, Optional, Tuple, Union
+
+from divo.command import ActivatedModes, BoxMode, Command, TimeType
+from divo.command_base import CommandBase
+from divo.packet import BuiltPacket, Packet
+from divo.packet_template import PacketTable, PacketTemplate
+from divo.pixoo_base import PixooBase
+
+
+class RecordingPixoo(PixooBase):
+    """records payloads like a PixooBase that doesn't handle packets itself"""
+
+    def __init__(self) -> None:
+        self.written: List[Tuple[int, Any]] = []
+
+    def write_command(
+        self,
+        cmd: CommandBase,
+        cmd_data: Optional[Union[bytes, int]] = None,
+        need_response: bool = False,
+        force: bool = False,
+    ) -> Any:
+        self.written.append((cmd.value, cmd_data))
+
+    def get_box_mode(self) -> Any:
+        return None
+
+
+class TestPacketTemplate(unittest.TestCase):
+    def test_build(self) -> None:
+        rng = random.Random(23)
+        payload = bytes([1, 0, 0, 0, 0x14, 0, 0, 0, 0, 0])
+        t = PacketTemplate(Command.SET_BOX_MODE, payload, (1, 2, 3, 9))
+        for _ in range(100):
+            values = [rng.randrange(256) for _ in range(4)]
+            exp = bytearray(payload)
+            exp[1:4] = bytes(values[:3])
+            exp[9] = values[3]
+
+            packet = t.build(*values)
+            assert isinstance(packet, BuiltPacket)
+            assert packet == Packet.build(Command.SET_BOX_MODE, bytes(exp))
+
+        # the template itself is unchanged
+        assert t.packet == Packet.build(Command.SET_BOX_MODE, payload)
+
+    def test_build_bad_values(self) -> None:
+        t = PacketTemplate(Command.SET_SYSTEM_COLOR, bytes(3), (0, 1, 2))
+        with self.assertRaises(ValueError):
+            t.build(1, 2)
+        with self.assertRaises(ValueError):
+            t.build(1, 2, 256)
+
+    def test_table(self) -> None:
+        table = PacketTable(Command.SET_SYSTEM_BRIGHTNESS, 101)
+        assert table.get(23) == Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)
+        assert table.get(101) is None
+        assert table.get(-1) is None
+
+
+class TestPixooBasePackets(unittest.TestCase):
+    def test_same_payloads(self) -> None:
+        d = RecordingPixoo()
+        modes = ActivatedModes(clock=True, weather=False, temperature=True, date=False)
+        d.set_score(0x1234, 0x5678)
+        d.set_music_visualizer(3)
+        d.set_system_color(1, 2, 0x103)
+        d.set_sleep_color(4, 5, 6)
+        d.set_light_mode_clock(TimeType.ANALOG, 7, 8, 9, modes)
+        d.set_light_mode_light(10, 11, 12, modes)
+
+        assert d.written == [
+            (Command.SET_BOX_MODE, bytes([BoxMode.WATCH, 0, 0x78, 0x56, 0x34, 0x12, 0, 0, 0, 0])),
+            (Command.SET_BOX_MODE, bytes([BoxMode.MUSIC, 3, 0, 0, 0, 0, 0, 0, 0, 0])),
+            (Command.SET_SYSTEM_COLOR, bytes([1, 2, 3])),
+            (Command.SET_SLEEP_COLOR, bytes([4, 5, 6])),
+            (Command.SET_BOX_MODE, bytes([BoxMode.ENV, 1, TimeType.ANALOG, 1, 0, 1, 0, 7, 8, 9])),
+            (Command.SET_BOX_MODE, bytes([BoxMode.LIGHT, 10, 11, 12, 0x14, 0, 1, 0, 1, 0])),
+        ]
+
+    def test_build_packet(self) -> None:
+        d = RecordingPixoo()
+        assert d.build_packet(Command.SET_SYSTEM_BRIGHTNESS, 42) is d.build_packet(Command.SET_SYSTEM_BRIGHTNESS, 42)
+        assert d.build_packet(Command.SET_SYSTEM_BRIGHTNESS, 200) == Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 200)
+        assert d.build_packet(Command.SET_GAME, b"\x01\x02") == Packet.build(Command.SET_GAME, b"\x01\x02")
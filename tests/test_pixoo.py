@@ -0,0 +1,322 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from concurrent.futures import Future
+from typing import Any, List
+from unittest import mock
+
+from divo.bluetooth_base import BluetoothBase
+from divo.command import Command, CommandParser
+from divo.exceptions import CommandNoReplyException, PacketParsingError, PacketWriteException
+from divo.packet import Packet
+from divo.pixoo import Pixoo
+
+
+class FakeBluetooth(BluetoothBase):
+    """returns prepared chunks on read, at most one per call"""
+
+    def __init__(self, chunks: List[bytes]) -> None:
+        self.chunks = list(chunks)
+        self.written: List[bytes] = []
+
+    def connect(self) -> None:
+        pass
+
+    def flush(self) -> None:
+        pass
+
+    def get_in_waiting(self) -> int:
+        return 0
+
+    def write(self, data: bytes) -> int:
+        self.written.append(bytes(data))
+        return len(data)
+
+    def read(self, count: int) -> bytes:
+        if not self.chunks:
+            return b""
+        chunk = self.chunks.pop(0)
+        if len(chunk) > count:
+            self.chunks.insert(0, chunk[count:])
+        return chunk[:count]
+
+
+class TestPixoo(unittest.TestCase):
+    response = b"\x01\x03\x00\x04\x74\x55\x02"
+
+    def test_write_command(self) -> None:
+        bt = FakeBluetooth([self.response])
+        d = Pixoo(bt)
+        assert d.set_brightness(23) is None  # no parser for this response
+        assert bt.written == [Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)]
+
+    def test_fragmented_response(self) -> None:
+        bt = FakeBluetooth([b"\x01", b"\x03\x00", b"\x04\x74", b"\x55", b"\x02"])
+        d = Pixoo(bt)
+        assert d.transceive(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)) == self.response
+        assert bt.chunks == []
+
+    def test_garbage_before_response(self) -> None:
+        bt = FakeBluetooth([b"\x00\x23", b"\x42", self.response])
+        d = Pixoo(bt)
+        assert d.transceive(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)) == self.response
+        assert d.framer.discarded == 3
+
+    def test_no_response(self) -> None:
+        bt = FakeBluetooth([self.response[:4]])
+        d = Pixoo(bt)
+        with self.assertRaises(CommandNoReplyException):
+            d.set_brightness(23)
+
+    def test_without_response(self) -> None:
+        bt = FakeBluetooth([])
+        d = Pixoo(bt)
+        assert d.set_sleep_color(1, 2, 3) is None
+        assert len(bt.written) == 1
+
+    def test_invalid_packet(self) -> None:
+        d = Pixoo(FakeBluetooth([]))
+        with self.assertRaises(PacketWriteException):
+            d.write(b"\x01\x23\x00t\x17\x8f\x00\x02")
+
+    def test_built_packet_not_validated(self) -> None:
+        bt = FakeBluetooth([self.response, self.response])
+        d = Pixoo(bt)
+        packet = Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)
+        with mock.patch.object(Packet, "is_valid", return_value=True) as is_valid:
+            d.transceive(packet)
+            is_valid.assert_not_called()
+
+            # the same data as plain bytes is checked
+            d.transceive(bytes(packet))
+            is_valid.assert_called_once()
+
+    def test_get_box_mode(self) -> None:
+        data = bytes(range(16))
+        size = 3 + len(data)
+        response = bytes([1, size & 0xFF, size >> 8, 4, Command.GET_BOX_MODE, 0x55]) + data + b"\x02"
+        d = Pixoo(FakeBluetooth([response[:10], response[10:]]))
+        box_mode = d.get_box_mode()
+        assert box_mode.mode == 0
+        assert box_mode.temp_b == 15
+
+    def test_broken_response(self) -> None:
+        size = 3 + 4
+        response = bytes([1, size & 0xFF, size >> 8, 4, Command.GET_BOX_MODE, 0x55]) + bytes(4) + b"\x02"
+        d = Pixoo(FakeBluetooth([response]))
+        future = d.submit(Packet.build(Command.GET_BOX_MODE))
+        d.receive_response()
+
+        with self.assertRaises(PacketParsingError):
+            future.result(timeout=0)
+        assert d.in_flight == 0
+        assert not d.pending[Command.GET_BOX_MODE]
+
+    def test_parser_bug(self) -> None:
+        d = Pixoo(FakeBluetooth([self.response]))
+        with mock.patch.dict(CommandParser.response_parsers):
+            CommandParser.register(Command.SET_SYSTEM_BRIGHTNESS, mock.Mock(side_effect=TypeError), response=True)
+            future = d.submit(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 1))
+            d.receive_response()
+
+        with self.assertRaises(TypeError):
+            future.result(timeout=0)
+
+
+class TestPixooPipeline(unittest.TestCase):
+    brightness_response = b"\x01\x03\x00\x04\x74\x55\x02"
+    color_response = b"\x01\x03\x00\x04\x24\x55\x02"
+
+    def test_out_of_order(self) -> None:
+        bt = FakeBluetooth([self.color_response, self.brightness_response, self.brightness_response])
+        d = Pixoo(bt, max_in_flight=3)
+
+        f1 = d.submit(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23), parse=False)
+        f2 = d.submit(Packet.build(Command.SET_SYSTEM_COLOR, b"\x01\x02\x03"), parse=False)
+        f3 = d.submit(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 42), parse=False)
+        assert len(bt.written) == 3
+        assert d.in_flight == 3
+        assert not f1.done()
+
+        d.receive_response()
+        assert f2.result() == self.color_response
+        assert not f1.done()
+
+        d.drain()
+        assert f1.result() == self.brightness_response
+        assert f3.result() == self.brightness_response
+        assert d.in_flight == 0
+
+    def test_max_in_flight(self) -> None:
+        bt = FakeBluetooth([self.brightness_response, self.brightness_response])
+        d = Pixoo(bt, max_in_flight=1)
+
+        f1 = d.submit(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23))
+        assert not f1.done()
+        # the second command can only go out after the first one got its answer
+        d.submit(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 42))
+        assert f1.done()
+        assert d.in_flight == 1
+
+    def test_invalid_max_in_flight(self) -> None:
+        for value in (0, -1):
+            with self.assertRaises(ValueError):
+                Pixoo(FakeBluetooth([]), max_in_flight=value)
+
+        d = Pixoo(FakeBluetooth([]))
+        with self.assertRaises(ValueError):
+            with d.pipeline(max_in_flight=0):
+                pass
+        assert d.max_in_flight == 1
+
+    def test_without_response(self) -> None:
+        d = Pixoo(FakeBluetooth([]), max_in_flight=1)
+        f1 = d.submit(Packet.build(Command.SET_SLEEP_COLOR, b"\x01\x02\x03"))
+        f2 = d.submit(Packet.build(Command.SET_SLEEP_COLOR, b"\x01\x02\x03"))
+        assert f1.result() is None
+        assert f2.result() is None
+        assert d.in_flight == 0
+
+    def test_callback(self) -> None:
+        results: List[Any] = []
+        d = Pixoo(FakeBluetooth([self.brightness_response]), max_in_flight=2)
+        d.submit(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23), callback=lambda f: results.append(f.result()))
+        assert results == []
+        d.drain()
+        assert results == [None]  # no parser for this response
+
+    def test_no_reply(self) -> None:
+        d = Pixoo(FakeBluetooth([self.brightness_response]), max_in_flight=2)
+        f1 = d.submit(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23))
+        f2 = d.submit(Packet.build(Command.SET_SYSTEM_COLOR, b"\x01\x02\x03"))
+        d.drain()
+        assert f1.result() is None
+        with self.assertRaises(CommandNoReplyException):
+            f2.result()
+
+    def test_unexpected_response(self) -> None:
+        d = Pixoo(FakeBluetooth([self.color_response, self.brightness_response]))
+        assert d.transceive(Packet.build(Command.SET_SYSTEM_BRIGHTNESS, 23)) == self.brightness_response
+
+    def test_pipeline_context(self) -> None:
+        bt = FakeBluetooth([self.brightness_response] * 3)
+        d = Pixoo(bt)
+        with d.pipeline(max_in_flight=3):
+            futures = [d.set_brightness(i) for i in range(3)]
+            assert all(isinstance(f, Future) for f in futures)
+            assert d.in_flight == 3
+
+        assert all(f.done() for f in futures)
+        assert d.in_flight == 0
+        assert d.max_in_flight == 1
+        assert not d.pipelined
+
+
+class TestPixooSkipRedundant(unittest.TestCase):
+    brightness_response = b"\x01\x03\x00\x04\x74\x55\x02"
+    box_mode_response = b"\x01\x03\x00\x04\x45\x55\x02"
+
+    def test_skip(self) -> None:
+        bt = FakeBluetooth([self.brightness_response] * 3)
+        d = Pixoo(bt)
+        d.set_brightness(23)
+        assert d.set_brightness(23) is None
+        assert len(bt.written) == 1
+        assert d.state.skipped[Command.SET_SYSTEM_BRIGHTNESS] == 1
+
+        d.set_brightness(42)
+        d.set_brightness(23, force=True)
+        assert len(bt.written) == 3
+        assert d.state.skipped_total == 1
+
+    def test_not_acknowledged(self) -> None:
+        bt = FakeBluetooth([])
+        d = Pixoo(bt)
+        with self.assertRaises(CommandNoReplyException):
+            d.set_brightness(23)
+        with self.assertRaises(CommandNoReplyException):
+            d.set_brightness(23)
+        assert len(bt.written) == 2
+
+    def test_other_commands_reset_box_mode(self) -> None:
+        bt = FakeBluetooth([self.box_mode_response, self.box_mode_response, self.brightness_response])
+        d = Pixoo(bt)
+        d.set_light_mode_light(1, 2, 3)
+        d.set_light_mode_light(1, 2, 3)
+        assert len(bt.written) == 1
+
+        # other commands may switch the screen away from the box mode
+        d.set_sleep_color(1, 2, 3)
+        d.set_light_mode_light(1, 2, 3)
+        assert len(bt.written) == 3
+
+        # but doesn't touch the brightness
+        d.set_brightness(23)
+        d.set_brightness(23)
+        assert len(bt.written) == 4
+
+    def test_disabled(self) -> None:
+        bt = FakeBluetooth([self.brightness_response] * 2)
+        d = Pixoo(bt, skip_redundant=False)
+        d.set_brightness(23)
+        d.set_brightness(23)
+        assert len(bt.written) == 2
+
+    def test_pipelined(self) -> None:
+        bt = FakeBluetooth([self.brightness_response] * 2)
+        d = Pixoo(bt)
+        with d.pipeline():
+            f1 = d.set_brightness(23)
+            # not acknowledged yet, so this is sent again
+            f2 = d.set_brightness(23)
+        assert len(bt.written) == 2
+
+        with d.pipeline():
+            f3 = d.set_brightness(23)
+        assert f3.done() and f3.result() is None
+        assert len(bt.written) == 2
+        assert f1.done() and f2.done()
+
+    def test_pipelined_late_ack(self) -> None:
+        bt = FakeBluetooth([self.box_mode_response] * 2 + [self.brightness_response, self.box_mode_response])
+        d = Pixoo(bt)
+        with d.pipeline(max_in_flight=2):
+            d.set_light_mode_light(255, 0, 0)
+            d.set_light_mode_light(0, 255, 0)
+            # receives the acknowledgement of red while green is still in flight
+            d.set_brightness(23)
+            d.set_light_mode_light(255, 0, 0)
+        assert len(bt.written) == 4
+        assert bt.written[3] == bt.written[0]
+
+        # red was sent last and acknowledged
+        assert d.state.is_current(Command.SET_BOX_MODE, bt.written[0][4:-3])
+
+    def test_seed(self) -> None:
+        data = bytes([0] * 8 + [23] + [0] * 7)
+        size = 3 + len(data)
+        response = bytes([1, size & 0xFF, size >> 8, 4, Command.GET_BOX_MODE, 0x55]) + data + b"\x02"
+        bt = FakeBluetooth([response])
+        d = Pixoo(bt)
+        d.get_box_mode()
+        d.set_brightness(23)
+        assert len(bt.written) == 1
+
+        d.state.invalidate()
+        assert not d.state.is_current(Command.SET_SYSTEM_BRIGHTNESS, b"\x17")
@@ -0,0 +1,99 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from unittest import mock
+
+from divo.emulator import LoopbackTransport
+from divo.evo_encoder import EvoEncoder
+from divo.evo_pixmap import RawPixmap
+from divo.exceptions import NotConnectedException, PacketWriteException
+from divo.pixoo import Pixoo
+from divo.pixoo_group import PixooGroup
+
+
+def make_group(count: int = 3) -> PixooGroup:
+    return PixooGroup({f"pixoo{i}": Pixoo(LoopbackTransport()) for i in range(count)})
+
+
+class TestPixooGroup(unittest.TestCase):
+    def test_commands(self) -> None:
+        with make_group() as g:
+            results = g.set_brightness(42)
+            assert [r.name for r in results] == ["pixoo0", "pixoo1", "pixoo2"]
+            assert all(r.error is None for r in results)
+
+            for r in g.get_box_mode():
+                assert r.result.sys_light == 42
+            for d in g.members.values():
+                assert d.comm.emulator.box_mode[8] == 42
+
+    def test_send_image(self) -> None:
+        rp = RawPixmap(16, 16)
+        rp.setPixel(3, 4, (255, 0, 0))
+
+        with make_group() as g, mock.patch.object(
+            EvoEncoder, "image_bytes_rgb", wraps=EvoEncoder.image_bytes_rgb
+        ) as encode:
+            results = g.send_image(rp)
+            assert encode.call_count == 1
+            assert len(results) == 3
+            for d in g.members.values():
+                fb = d.comm.emulator.framebuffer
+                assert repr(fb.buf[4][3]) == "Color(255, 0, 0)"
+                assert repr(fb.buf[0][0]) == "Color(0, 0, 0)"
+
+    def test_failing_member(self) -> None:
+        with make_group(4) as g:
+            # the connection of one member dropped
+            g.members["pixoo3"].comm.connected = False
+            results = {r.name: r for r in g.set_brightness(10)}
+            assert isinstance(results["pixoo3"].error, NotConnectedException)
+            assert results["pixoo3"].result is None
+            for name in ("pixoo0", "pixoo1", "pixoo2"):
+                assert results[name].error is None
+                assert results[name].latency >= 0
+
+    def test_unexpected_error(self) -> None:
+        def fn(d: Pixoo) -> int:
+            if d is g.members["pixoo1"]:
+                raise ValueError("bug")
+            return 23
+
+        with make_group() as g:
+            results = g.broadcast(fn)
+            assert isinstance(results[1].error, ValueError)
+            assert [r.result for r in results] == [23, None, 23]
+
+    def test_invalid_packet(self) -> None:
+        with make_group() as g:
+            with self.assertRaises(PacketWriteException):
+                g.write(b"\x01\x02")
+
+    def test_connect(self) -> None:
+        def connect(mac: str) -> Pixoo:
+            if mac == "bad":
+                raise NotConnectedException("no route to host")
+            return Pixoo(LoopbackTransport())
+
+        with PixooGroup.connect(["a", "bad", "b"], connect=connect) as g:
+            assert list(g.members) == ["a", "b"]
+
+
+if __name__ == "__main__":
+    unittest.main()
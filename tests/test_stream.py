@@ -0,0 +1,117 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import io
+import struct
+import unittest
+from typing import List
+
+from PIL import Image
+
+from divo.stream import FrameStream, play_stream
+
+
+class ChunkedReader(io.RawIOBase):
+    """returns at most chunk bytes per read, like a pipe"""
+
+    def __init__(self, data: bytes, chunk: int) -> None:
+        self.data = data
+        self.pos = 0
+        self.chunk = chunk
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        n = min(len(b), self.chunk, len(self.data) - self.pos)
+        b[:n] = self.data[self.pos : self.pos + n]
+        self.pos += n
+        return n
+
+
+def png(color, size=32) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (size, size), color).save(out, "PNG")
+    data = out.getvalue()
+    return struct.pack(">I", len(data)) + data
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class TestFrameStream(unittest.TestCase):
+    def test_raw(self) -> None:
+        frames = [bytes([i]) * 768 for i in range(3)]
+        stream = FrameStream(ChunkedReader(b"".join(frames) + b"\x17" * 100, 100))
+
+        views = []
+        for frame in stream.frames():
+            views.append(bytes(frame))
+            # the same buffer is reused
+            assert frame.obj is stream.buf
+        assert views == frames
+
+    def test_png(self) -> None:
+        # the second image is bigger, the buffer has to grow
+        data = png((255, 0, 0), 16) + png((0, 0, 255), 64)
+        stream = FrameStream(ChunkedReader(data, 50), "png")
+        frames = [bytes(f) for f in stream.frames()]
+        assert frames == [b"\xff\x00\x00" * 256, b"\x00\x00\xff" * 256]
+
+    def test_png_too_large(self) -> None:
+        # a misaligned or garbage length prefix
+        stream = FrameStream(io.BytesIO(b"\xff\xff\xff\xf0" + bytes(100)), "png")
+        with self.assertRaises(ValueError):
+            next(stream.frames())
+        assert len(stream.buf) == 4
+
+        data = png((255, 0, 0), 16)
+        with self.assertRaises(ValueError):
+            list(FrameStream(io.BytesIO(data), "png", max_png_size=len(data) - 5).frames())
+
+    def test_bad_format(self) -> None:
+        with self.assertRaises(ValueError):
+            FrameStream(io.BytesIO(), "gif")
+
+
+class TestPlayStream(unittest.TestCase):
+    def test_play(self) -> None:
+        clock = FakeClock()
+        shown: List[bytes] = []
+        shown_at: List[float] = []
+
+        def show(rgb) -> None:
+            shown.append(bytes(rgb))
+            shown_at.append(clock.now)
+
+        a, b = b"\x01" * 768, b"\x02" * 768
+        stats = play_stream([a, a, b, b, a], show, fps=4, clock=clock, sleep=clock.sleep)
+
+        assert shown == [a, b, a]
+        assert shown_at == [0.0, 0.25, 0.5]
+        assert stats.read == 5
+        assert stats.sent == 3
+        assert stats.unchanged == 2
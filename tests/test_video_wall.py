@@ -0,0 +1,109 @@
+# type: ignore
+"""
+This file is part of divo (https://github.com/spezifisch/divo).
+Copyright (c) 2022 spezifisch (https://github.com/spezifisch)
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3 of the License.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+from typing import Dict
+
+from PIL import Image
+
+from divo.emulator import LoopbackTransport
+from divo.evo_encoder import EvoEncoder
+from divo.evo_pixmap import RawPixmap
+from divo.exceptions import NotConnectedException
+from divo.pixoo import Pixoo
+from divo.pixoo_group import PixooGroup
+from divo.video_wall import VideoWall, encode_tile
+
+LAYOUT = [["a", "b"], ["c", "d"]]
+
+
+def make_wall(processes: int = 0) -> VideoWall:
+    members: Dict[str, Pixoo] = {name: Pixoo(LoopbackTransport()) for name in "abcd"}
+    return VideoWall(PixooGroup(members), LAYOUT, processes=processes)
+
+
+def pixel(wall: VideoWall, name: str, x: int = 0, y: int = 0) -> str:
+    return repr(wall.group.members[name].comm.emulator.framebuffer.buf[y][x])
+
+
+class TestVideoWall(unittest.TestCase):
+    def test_tiles(self) -> None:
+        with make_wall() as wall:
+            assert (wall.width, wall.height) == (32, 32)
+            wall.canvas.setPixel(17, 16, (1, 2, 3))
+            tiles = wall.tiles(wall.canvas)
+            assert tiles["d"][3:6] == bytes([1, 2, 3])
+            assert set(tiles["a"]) == {0}
+
+            with self.assertRaises(ValueError):
+                wall.tiles(RawPixmap(16, 16))
+
+    def test_layout(self) -> None:
+        group = PixooGroup({"a": Pixoo(LoopbackTransport())})
+        with self.assertRaises(ValueError):
+            VideoWall(group, [["a", "b"]], processes=0)
+        with self.assertRaises(ValueError):
+            VideoWall(group, [["a"], []], processes=0)
+
+    def test_show(self) -> None:
+        with make_wall() as wall:
+            wall.canvas.fill_rect(16, 0, 16, 16, (255, 0, 0))
+            assert [r.name for r in wall.show()] == ["a", "b", "c", "d"]
+            assert pixel(wall, "b") == "Color(255, 0, 0)"
+            assert pixel(wall, "c") == "Color(0, 0, 0)"
+
+            # unchanged tiles aren't sent again
+            assert wall.show() == []
+            wall.canvas.setPixel(0, 31, (0, 0, 255))
+            assert [r.name for r in wall.show()] == ["c"]
+            assert [r.name for r in wall.show(force=True)] == ["a", "b", "c", "d"]
+
+    def test_failed_tile_is_resent(self) -> None:
+        with make_wall() as wall:
+            wall.canvas.fill_rect(0, 16, 16, 16, (255, 0, 0))
+            transport = wall.group.members["c"].comm
+            transport.connected = False
+            results = {r.name: r for r in wall.show()}
+            assert isinstance(results["c"].error, NotConnectedException)
+            assert results["a"].error is None
+
+            transport.connected = True
+            assert [r.name for r in wall.show()] == ["c"]
+            assert pixel(wall, "c") == "Color(255, 0, 0)"
+
+    def test_show_image(self) -> None:
+        image = Image.new("RGB", (64, 64), (0, 0, 0))
+        image.paste((0, 255, 0), (0, 32, 32, 64))
+        with make_wall() as wall:
+            wall.show_image(image)
+            # away from the edges, resampling blurs those
+            assert pixel(wall, "c", 8, 8) == "Color(0, 255, 0)"
+            assert pixel(wall, "a", 8, 8) == "Color(0, 0, 0)"
+
+    def test_process_pool(self) -> None:
+        rgb = bytes(range(256)) * 3
+        assert encode_tile(rgb) == EvoEncoder.image_bytes_rgb(rgb)
+
+        with make_wall(processes=2) as wall:
+            wall.canvas.fill_rect(0, 16, 32, 16, (0, 0, 255))
+            assert len(wall.show()) == 4
+            assert pixel(wall, "d") == "Color(0, 0, 255)"
+
+
+if __name__ == "__main__":
+    unittest.main()